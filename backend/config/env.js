@@ -1,5 +1,25 @@
+const os = require('os');
+
+// Default concurrent matcher.py processes when there is no warm server (one model copy each)
+const SPAWN_CONCURRENCY = 2;
 
 module.exports = {
     PORT: process.env.PORT || 5000,
-    JWT_SECRET: process.env.JWT_SECRET || 'your_super_secret_key_change_in_production'
+    JWT_SECRET: process.env.JWT_SECRET || 'your_super_secret_key_change_in_production',
+    PYTHON_PATH: process.env.PYTHON_PATH || 'python',
+    // Warm matcher server (ml/server.py). Leave both unset to spawn matcher.py per request.
+    MATCHER_HOST: process.env.MATCHER_HOST || '127.0.0.1',
+    MATCHER_PORT: process.env.MATCHER_PORT || '',
+    MATCHER_SOCKET: process.env.MATCHER_SOCKET || '',
+    // Ask the matcher for per-stage timings of every shortlist and log them
+    MATCHER_TRACE: process.env.MATCHER_TRACE === '1',
+    // Matcher jobs that may run at once; the rest queue. Each spawned matcher.py loads its own
+    // model, so without a warm server only SPAWN_CONCURRENCY run; the server bounds its own work
+    // with --workers, so with one this only caps requests in flight
+    MATCHER_CONCURRENCY: parseInt(process.env.MATCHER_CONCURRENCY, 10)
+        || (process.env.MATCHER_PORT || process.env.MATCHER_SOCKET ? os.cpus().length : SPAWN_CONCURRENCY),
+    // Jobs allowed to wait before new requests get 429
+    MATCHER_QUEUE_LIMIT: parseInt(process.env.MATCHER_QUEUE_LIMIT, 10) || 50,
+    // Uploads up to this many files are queued ahead of larger (bulk) ones
+    MATCHER_INTERACTIVE_FILES: parseInt(process.env.MATCHER_INTERACTIVE_FILES, 10) || 3
 };
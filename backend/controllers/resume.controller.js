@@ -1,11 +1,47 @@
-const path = require('path');
 const mlService = require('../services/ml.service');
 const jobService = require('../services/job.service');
-const { spawn } = require('child_process'); // Added this line as it's used in the new code
+const progressService = require('../services/progress.service');
+const { matcherQueue, priorityFor, sendQueueFull } = require('../services/queue.service');
+
+// Score the uploads and save the job; runs as a matcher queue task
+const runShortlist = async ({ jobDescription, filePaths, uploadId, topK, userId, indexPool }) => {
+    // Scored resumes stream in and are exposed for polling under uploadId
+    progressService.start(uploadId, userId, filePaths.length);
+    // The job id is fixed up front so the matcher can keep the job's state for later appends
+    const jobId = jobService.newJobId();
+    let results;
+    try {
+        results = await mlService.processResumes(jobDescription, filePaths, {
+            onProgress: (record) => progressService.addResult(uploadId, record),
+            topK,
+            jobId,
+            indexPool
+        });
+        progressService.finish(uploadId);
+    } catch (mlError) {
+        progressService.finish(uploadId, 'failed');
+        console.error('Python Error:', mlError.message);
+        mlError.isMatcherError = true;
+        throw mlError;
+    }
+
+    // Persist job and candidates (re-integrated from original logic)
+    const job = await jobService.createJob({
+        id: jobId,
+        jobDescription,
+        uploadedBy: userId, // From auth middleware
+        candidates: results // Assuming results structure is compatible
+    });
+    return { jobId: job.id, data: results };
+};
 
 const shortlistResumes = async (req, res) => {
     try {
-        const { jobDescription } = req.body;
+        const { jobDescription, uploadId } = req.body;
+        // Optional: only fully score the best topK resumes (cascade mode)
+        const topK = parseInt(req.body.topK, 10) || 0;
+        // async=1: answer 202 with a queue job id right away and poll /shortlist/status/:id
+        const runAsync = String(req.query.async || req.body.async) === '1';
         const files = req.files;
 
         // Validation
@@ -19,65 +55,46 @@ const shortlistResumes = async (req, res) => {
         // Prepare file paths
         const filePaths = files.map(file => file.path);
 
-        // Resolve absolute path to python script
-        const scriptPath = path.join(__dirname, '../../ml/matcher.py');
-
-        // Run Python Script
-        const pythonProcess = spawn('python', [scriptPath]);
-
-        const inputData = JSON.stringify({
-            job_description: jobDescription,
-            file_paths: filePaths
-        });
-
-        let resultString = '';
-        let errorString = '';
-
-        pythonProcess.stdout.on('data', (data) => {
-            resultString += data.toString();
-        });
+        // Run the matcher (warm server if configured, otherwise a one-off python process)
+        // once a queue slot is free; small uploads go ahead of bulk ones
+        const queued = matcherQueue.enqueue(
+            // Students' self-analysis uploads never go into the HR-searchable talent pool
+            () => runShortlist({
+                jobDescription, filePaths, uploadId, topK, userId: req.user.id,
+                indexPool: req.user.role === 'student' ? false : undefined
+            }),
+            { priority: priorityFor(filePaths.length), owner: req.user.id }
+        );
 
-        pythonProcess.stderr.on('data', (data) => {
-            errorString += data.toString();
-        });
-
-        pythonProcess.on('close', async (code) => {
-            if (code !== 0) {
-                console.error('Python Error:', errorString);
-                // Return the actual error from Python to help debugging
-                return res.status(500).json({ 
-                    error: 'AI Engine Error', 
-                    details: errorString || 'Unknown Python script error',
-                    code: code
-                });
-            }
-
-            try {
-                const results = JSON.parse(resultString);
-                
-                // Persist job and candidates (re-integrated from original logic)
-                const job = await jobService.createJob({
-                    jobDescription,
-                    uploadedBy: req.user.id, // From auth middleware
-                    candidates: results // Assuming results structure is compatible
-                });
+        if (runAsync) {
+            const { status, position } = matcherQueue.get(queued.id);
+            return res.status(202).json({
+                success: true,
+                queueJobId: queued.id,
+                status,
+                position,
+                statusUrl: `/api/shortlist/status/${queued.id}`
+            });
+        }
 
-                res.json({
-                    success: true,
-                    jobId: job.id,
-                    data: results
-                });
-            } catch (e) {
-                console.error('JSON Parse Error:', e);
-                res.status(500).json({ error: 'Invalid response from AI engine' });
-            }
+        const { jobId, data } = await queued.promise;
+        res.json({
+            success: true,
+            jobId,
+            data
         });
 
-        // Send data to python script
-        pythonProcess.stdin.write(inputData);
-        pythonProcess.stdin.end();
-
     } catch (error) {
+        if (error.code === 'QUEUE_FULL') {
+            return sendQueueFull(res, error);
+        }
+        if (error.isMatcherError) {
+            // Return the actual error from Python to help debugging
+            return res.status(500).json({
+                error: 'AI Engine Error',
+                details: error.message || 'Unknown Python script error'
+            });
+        }
         console.error('Error in shortlistResumes:', error); // Kept original error logging
         res.status(500).json({ 
             success: false, 
@@ -86,6 +103,43 @@ const shortlistResumes = async (req, res) => {
     }
 };
 
+// Status of a queued shortlist (async=1); carries the results once done
+const getShortlistStatus = (req, res) => {
+    const job = matcherQueue.get(req.params.queueJobId);
+    if (!job || job.owner !== req.user.id) {
+        return res.status(404).json({ success: false, error: 'No queued shortlist with this id' });
+    }
+    const { owner, result, ...data } = job;
+    res.json({ success: true, data: { ...data, ...(result || {}) } });
+};
+
+// Poll progress of a running shortlist request
+const getShortlistProgress = (req, res) => {
+    const progress = progressService.get(req.params.uploadId);
+    if (!progress || progress.userId !== req.user.id) {
+        return res.status(404).json({ success: false, error: 'No shortlist in progress with this id' });
+    }
+    const { userId, updatedAt, ...data } = progress;
+    res.json({ success: true, data });
+};
+
+const getMatcherHealth = async (req, res) => {
+    const health = await mlService.getMatcherHealth();
+    res.status(health.ready ? 200 : 503).json({ ...health, queue: matcherQueue.stats() });
+};
+
+const getMatcherMetrics = async (req, res) => {
+    try {
+        res.json({ success: true, data: await mlService.getMatcherMetrics() });
+    } catch (error) {
+        res.status(503).json({ success: false, error: error.message });
+    }
+};
+
 module.exports = {
-    shortlistResumes
+    shortlistResumes,
+    getShortlistProgress,
+    getShortlistStatus,
+    getMatcherHealth,
+    getMatcherMetrics
 };
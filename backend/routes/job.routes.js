@@ -1,6 +1,9 @@
 const express = require('express');
 const router = express.Router();
 const jobService = require('../services/job.service');
+const mlService = require('../services/ml.service');
+const { matcherQueue, priorityFor, sendQueueFull } = require('../services/queue.service');
+const upload = require('../middleware/upload.middleware');
 const { protect, authorize } = require('../middleware/auth.middleware');
 
 // Get all jobs
@@ -34,6 +37,30 @@ router.get('/jobs/:id', protect, authorize('hr'), async (req, res) => {
     }
 });
 
+// Add resumes to an existing job: only the new ones are scored, then merged into the ranking
+router.post('/jobs/:id/candidates', protect, authorize('hr'), upload.array('resumes', 10), async (req, res) => {
+    try {
+        if (!req.files || req.files.length === 0) {
+            return res.status(400).json({ success: false, error: 'No resumes uploaded' });
+        }
+        const job = await jobService.getJobById(req.params.id);
+        if (!job) {
+            return res.status(404).json({ success: false, error: 'Job not found' });
+        }
+
+        const filePaths = req.files.map(file => file.path);
+        const { added, ranking, duplicates } = await matcherQueue.run(
+            () => mlService.appendCandidates(job.id, filePaths),
+            { priority: priorityFor(filePaths.length), owner: req.user.id }
+        );
+        const updatedJob = await jobService.appendCandidates(job.id, added, ranking, duplicates);
+        res.json({ success: true, data: updatedJob, added });
+    } catch (error) {
+        if (error.code === 'QUEUE_FULL') return sendQueueFull(res, error);
+        res.status(500).json({ success: false, error: error.message });
+    }
+});
+
 // Update candidate status
 router.patch('/jobs/:id/candidates/:fileName/status', protect, authorize('hr'), async (req, res) => {
     try {
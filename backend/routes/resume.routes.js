@@ -3,7 +3,7 @@ const router = express.Router();
 const upload = require('../middleware/upload.middleware');
 const resumeController = require('../controllers/resume.controller');
 
-const { protect } = require('../middleware/auth.middleware');
+const { protect, authorize } = require('../middleware/auth.middleware');
 
 // Middleware to validate strict upload limits based on role
 const validateUploads = (req, res, next) => {
@@ -24,6 +24,18 @@ const validateUploads = (req, res, next) => {
 // Protect the shortlist route so only logged-in users can upload
 router.post('/shortlist', protect, upload.array('resumes', 10), validateUploads, resumeController.shortlistResumes);
 
+// Partial results and progress of a running shortlist
+router.get('/shortlist/progress/:uploadId', protect, resumeController.getShortlistProgress);
+
+// Queue status and results of a shortlist submitted with async=1
+router.get('/shortlist/status/:queueJobId', protect, resumeController.getShortlistStatus);
+
+// Matcher health/readiness
+router.get('/ml/health', resumeController.getMatcherHealth);
+
+// Per-stage matcher timings and cache hit counts (server mode)
+router.get('/ml/metrics', protect, authorize('hr'), resumeController.getMatcherMetrics);
+
 // Test route
 router.get('/ping', (req, res) => {
     res.json({ message: 'Pong' });
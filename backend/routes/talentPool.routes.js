@@ -0,0 +1,34 @@
+const express = require('express');
+const router = express.Router();
+const mlService = require('../services/ml.service');
+const { matcherQueue, sendQueueFull } = require('../services/queue.service');
+const { protect, authorize } = require('../middleware/auth.middleware');
+
+const MAX_TOP_K = 100;
+
+// Search every resume indexed so far for the best matches to a job description
+router.post('/talent-pool/search', protect, authorize('hr'), async (req, res) => {
+    try {
+        const { jobDescription } = req.body;
+        if (!jobDescription) {
+            return res.status(400).json({ success: false, error: 'Job description is required' });
+        }
+        const topK = Math.min(parseInt(req.body.topK, 10) || 10, MAX_TOP_K);
+
+        const result = await matcherQueue.run(
+            () => mlService.searchTalentPool(jobDescription, topK),
+            { owner: req.user.id }
+        );
+        res.json({
+            success: true,
+            data: result.results,
+            poolSize: result.poolSize,
+            seconds: result.seconds
+        });
+    } catch (error) {
+        if (error.code === 'QUEUE_FULL') return sendQueueFull(res, error);
+        res.status(500).json({ success: false, error: error.message });
+    }
+});
+
+module.exports = router;
@@ -6,6 +6,7 @@ const cookieParser = require('cookie-parser');
 const resumeRoutes = require('./routes/resume.routes');
 const authRoutes = require('./routes/auth.routes');
 const jobRoutes = require('./routes/job.routes');
+const talentPoolRoutes = require('./routes/talentPool.routes');
 const firebaseConfig = require('./config/firebase.config');
 
 const app = express();
@@ -33,6 +34,7 @@ app.use('/uploads', express.static(path.join(__dirname, 'uploads')));
 app.use('/api/auth', authRoutes);
 app.use('/api', resumeRoutes);
 app.use('/api', jobRoutes);
+app.use('/api', talentPoolRoutes);
 
 // Fallback for frontend
 app.get('*', (req, res) => {
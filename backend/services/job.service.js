@@ -2,8 +2,11 @@ const { db } = require('../config/firebase');
 
 const COLLECTION = 'jobs';
 
+// Id for a job that is created after its matcher run (the matcher saves its state under it)
+const newJobId = () => db.collection(COLLECTION).doc().id;
+
 const createJob = async (jobData) => {
-    const docRef = db.collection(COLLECTION).doc();
+    const docRef = jobData.id ? db.collection(COLLECTION).doc(jobData.id) : db.collection(COLLECTION).doc();
     const newJob = {
         id: docRef.id,
         jobDescription: jobData.jobDescription,
@@ -65,8 +68,32 @@ const addCandidateNote = async (jobId, candidateFileName, note) => {
     return { ...job, updatedAt };
 };
 
+// Merge newly scored candidates into a job, ordered by the matcher's merged ranking (file names).
+// `duplicates` lists new uploads of resumes the job already holds, by the existing candidate's file name.
+const appendCandidates = async (jobId, newCandidates, ranking, duplicates = {}) => {
+    const docRef = db.collection(COLLECTION).doc(jobId);
+    const doc = await docRef.get();
+    if (!doc.exists) throw new Error('Job not found');
+
+    const job = doc.data();
+    for (const candidate of job.candidates) {
+        if (duplicates[candidate.fileName]) candidate.duplicates = duplicates[candidate.fileName];
+    }
+    // Existing candidates keep their HR status changes and notes
+    const byFileName = new Map([...job.candidates, ...newCandidates].map(c => [c.fileName, c]));
+    const candidates = ranking.filter(fileName => byFileName.has(fileName)).map(fileName => byFileName.get(fileName));
+    const ranked = new Set(ranking);
+    candidates.push(...job.candidates.filter(c => !ranked.has(c.fileName)));
+    const updatedAt = new Date().toISOString();
+
+    await docRef.update({ candidates, updatedAt });
+    return { ...job, candidates, updatedAt };
+};
+
 module.exports = {
+    newJobId,
     createJob,
+    appendCandidates,
     getAllJobs,
     getJobById,
     updateCandidateStatus,
@@ -1,28 +1,168 @@
 const { spawn } = require('child_process');
+const net = require('net');
 const path = require('path');
+const readline = require('readline');
 const env = require('../config/env');
 
-const processResumes = (jobDescription, filePaths) => {
+const HEADER_BYTES = 4;
+
+// Errors that mean the warm matcher server isn't running. Spawning instead is only
+// safe if they happen before the request was sent (see requestMatcherServer).
+const SERVER_UNAVAILABLE = ['ECONNREFUSED', 'ENOENT', 'ECONNRESET'];
+
+const useMatcherServer = () => Boolean(env.MATCHER_SOCKET || env.MATCHER_PORT);
+
+/**
+ * Collects streamed matcher records ({type: 'result' | 'summary' | 'error'})
+ * into the final ranked results, reporting each scored resume to onProgress.
+ * handle() returns true once the stream is complete.
+ */
+const createStreamCollector = (onProgress) => {
+    const byIndex = new Map();
+    let results = null;
+    let error = null;
+
+    return {
+        handle(record) {
+            if (record.type === 'result') {
+                byIndex.set(record.index, record.result);
+                if (onProgress) onProgress(record);
+                return false;
+            }
+            if (record.type === 'summary') {
+                if (record.trace) console.log('Matcher trace:', JSON.stringify(record.trace));
+                results = record.ranking.map(index => byIndex.get(index));
+                // Duplicate uploads are left out of the ranking and listed on the copy that was scored
+                for (const [index, fileNames] of Object.entries(record.duplicates || {})) {
+                    byIndex.get(Number(index)).duplicates = fileNames;
+                }
+                return true;
+            }
+            error = new Error(`ML processing failed: ${record.error || 'unexpected output'}`);
+            return true;
+        },
+        get results() {
+            return results;
+        },
+        get error() {
+            return error;
+        }
+    };
+};
+
+// Collects the single JSON reply of a non-streaming matcher op (pool_search, ...)
+const createReplyCollector = () => {
+    let results = null;
+    let error = null;
+
+    return {
+        handle(record) {
+            if (record && record.error) {
+                error = new Error(`ML processing failed: ${record.error}`);
+            } else {
+                results = record;
+            }
+            return true;
+        },
+        get results() {
+            return results;
+        },
+        get error() {
+            return error;
+        }
+    };
+};
+
+/**
+ * Send one length-prefixed JSON request to ml/server.py. Every reply message
+ * is passed to onMessage until it returns true; the promise then resolves.
+ * Errors from before the request was written are flagged with
+ * err.beforeRequest, since only then is it certain the server did nothing.
+ */
+const requestMatcherServer = (payload, onMessage) => {
     return new Promise((resolve, reject) => {
-        const scriptPath = path.join(__dirname, '../../ml/matcher.py');
-        
-        // Prepare data to pass to python script
-        const inputData = JSON.stringify({
-            job_description: jobDescription,
-            file_paths: filePaths
+        const socket = env.MATCHER_SOCKET
+            ? net.createConnection(env.MATCHER_SOCKET)
+            : net.createConnection(Number(env.MATCHER_PORT), env.MATCHER_HOST);
+
+        let buffer = Buffer.alloc(0);
+        let settled = false;
+        let requestSent = false;
+
+        const finish = (err, result) => {
+            if (settled) return;
+            settled = true;
+            socket.end();
+            if (err) reject(err);
+            else resolve(result);
+        };
+
+        socket.on('connect', () => {
+            const body = Buffer.from(JSON.stringify(payload), 'utf8');
+            const header = Buffer.alloc(HEADER_BYTES);
+            header.writeUInt32BE(body.length, 0);
+            requestSent = true;
+            socket.write(Buffer.concat([header, body]));
+        });
+
+        socket.on('data', (chunk) => {
+            buffer = Buffer.concat([buffer, chunk]);
+            while (buffer.length >= HEADER_BYTES) {
+                const length = buffer.readUInt32BE(0);
+                if (buffer.length < HEADER_BYTES + length) return;
+
+                let reply;
+                try {
+                    reply = JSON.parse(buffer.slice(HEADER_BYTES, HEADER_BYTES + length).toString('utf8'));
+                } catch (err) {
+                    return finish(new Error('Invalid output from ML service'));
+                }
+                buffer = buffer.slice(HEADER_BYTES + length);
+
+                if (reply && !Array.isArray(reply) && reply.error && !reply.type) {
+                    return finish(new Error(`ML processing failed: ${reply.error}`));
+                }
+                if (onMessage(reply)) return finish(null);
+            }
+        });
+
+        socket.on('error', (err) => {
+            err.beforeRequest = !requestSent;
+            finish(err);
         });
+        socket.on('close', () => finish(new Error('ML server closed the connection')));
+    });
+};
+
+// Run matcher.py as a one-off process (cold start on every call), reading NDJSON records
+const spawnMatcher = (payload, collector) => {
+    return new Promise((resolve, reject) => {
+        const scriptPath = path.join(__dirname, '../../ml/matcher.py');
+        const pythonProcess = spawn(env.PYTHON_PATH, [scriptPath, '--stream']);
 
-        const pythonProcess = spawn(env.PYTHON_PATH, [scriptPath]);
-        
-        let dataString = '';
         let errorString = '';
 
+        pythonProcess.on('error', (err) => {
+            reject(new Error(`Failed to start ML process: ${err.message}`));
+        });
+
         // Write data to stdin of python process
-        pythonProcess.stdin.write(inputData);
+        pythonProcess.stdin.write(JSON.stringify(payload));
         pythonProcess.stdin.end();
 
-        pythonProcess.stdout.on('data', (data) => {
-            dataString += data.toString();
+        // One JSON record per line, handled as it arrives
+        const lines = readline.createInterface({ input: pythonProcess.stdout });
+        lines.on('line', (line) => {
+            if (!line.trim()) return;
+            let record;
+            try {
+                record = JSON.parse(line);
+            } catch (err) {
+                // Stray prints from libraries; the summary record decides success
+                console.warn('Ignoring non-JSON matcher output:', line);
+                return;
+            }
+            collector.handle(record);
         });
 
         pythonProcess.stderr.on('data', (data) => {
@@ -35,19 +175,114 @@ const processResumes = (jobDescription, filePaths) => {
                 console.error(`Python stderr: ${errorString}`);
                 return reject(new Error(`ML processing failed: ${errorString}`));
             }
-            
-            try {
-                // Determine if we have valid JSON
-                const results = JSON.parse(dataString);
-                resolve(results);
-            } catch (err) {
-                console.error('Failed to parse Python output:', dataString);
-                reject(new Error('Invalid output from ML service'));
+            if (collector.error) return reject(collector.error);
+            if (!collector.results) {
+                return reject(new Error('Invalid output from ML service'));
             }
+            resolve(collector.results);
+        });
+    });
+};
+
+// Send a request to the warm server if configured (and up), else to a one-off matcher.py
+const runMatcher = async (payload, createCollector) => {
+    if (useMatcherServer()) {
+        const collector = createCollector();
+        try {
+            await requestMatcherServer(payload, (record) => collector.handle(record));
+            if (collector.error) throw collector.error;
+            return collector.results;
+        } catch (err) {
+            // A reset mid-request may come after progress was reported or a write
+            // (append, pool_add) was committed, so running the job again isn't safe
+            if (!err.beforeRequest || !SERVER_UNAVAILABLE.includes(err.code)) throw err;
+            console.warn(`Matcher server unavailable (${err.code}), falling back to spawning matcher.py`);
+        }
+    }
+    return spawnMatcher(payload, createCollector());
+};
+
+/**
+ * Score resumes against a job description. Results stream back from the
+ * matcher one resume at a time; onProgress({ index, completed, total, result })
+ * is called for each before the promise resolves with the ranked list.
+ * With topK set, the matcher runs in cascade mode and only fully scores the best topK.
+ * With jobId set, the matcher keeps the job's state so appendCandidates can add to it later.
+ * indexPool: false keeps the resumes out of the talent pool whatever MATCHER_POOL_INDEX says.
+ */
+const processResumes = async (jobDescription, filePaths, { onProgress, topK, jobId, indexPool } = {}) => {
+    // Prepare data to pass to python script
+    const payload = {
+        job_description: jobDescription,
+        file_paths: filePaths,
+        stream: true
+    };
+    if (topK > 0) {
+        payload.cascade = { top_k: topK };
+    }
+    if (jobId) {
+        payload.job_id = jobId;
+    }
+    if (env.MATCHER_TRACE) {
+        payload.trace = true;
+    }
+    if (indexPool === false) {
+        payload.index_pool = false;
+    }
+    return runMatcher(payload, () => createStreamCollector(onProgress));
+};
+
+// Score new resumes for a job processed with a jobId, without rescoring its other resumes.
+// Resolves with { added: [results], ranking: [file names, best first], duplicates: { stored file name: [file names] } }
+const appendCandidates = (jobId, filePaths) => {
+    return runMatcher(
+        { op: 'append', job_id: jobId, file_paths: filePaths },
+        createReplyCollector
+    );
+};
+
+// Top-K resumes from the talent pool (every resume indexed so far) for a job description
+const searchTalentPool = (jobDescription, topK = 10) => {
+    return runMatcher(
+        { op: 'pool_search', job_description: jobDescription, top_k: topK },
+        createReplyCollector
+    );
+};
+
+// Health/readiness of the warm matcher server
+const getMatcherHealth = async () => {
+    if (!useMatcherServer()) {
+        return { status: 'ok', mode: 'spawn', ready: true };
+    }
+    try {
+        let health;
+        await requestMatcherServer({ op: 'health' }, (reply) => {
+            health = reply;
+            return true;
         });
+        return { mode: 'server', ...health };
+    } catch (err) {
+        return { status: 'unavailable', mode: 'server', ready: false, error: err.message };
+    }
+};
+
+// Per-stage timings, cache counters and memory of the warm matcher server
+const getMatcherMetrics = async () => {
+    if (!useMatcherServer()) {
+        throw new Error('Metrics are only available from the matcher server (set MATCHER_PORT or MATCHER_SOCKET)');
+    }
+    let metrics;
+    await requestMatcherServer({ op: 'metrics' }, (reply) => {
+        metrics = reply;
+        return true;
     });
+    return metrics;
 };
 
 module.exports = {
-    processResumes
+    processResumes,
+    appendCandidates,
+    searchTalentPool,
+    getMatcherHealth,
+    getMatcherMetrics
 };
@@ -0,0 +1,58 @@
+// In-memory progress of running shortlist requests, keyed by a client-chosen uploadId
+const PROGRESS_TTL_MS = 10 * 60 * 1000;
+
+const entries = new Map();
+
+const prune = () => {
+    const cutoff = Date.now() - PROGRESS_TTL_MS;
+    for (const [id, entry] of entries) {
+        if (entry.updatedAt < cutoff) entries.delete(id);
+    }
+};
+
+const start = (uploadId, userId, total) => {
+    if (!uploadId) return;
+    prune();
+    entries.set(uploadId, {
+        uploadId,
+        userId,
+        status: 'processing',
+        completed: 0,
+        total,
+        results: [],
+        updatedAt: Date.now()
+    });
+};
+
+// Record one scored resume; partial results are kept sorted best first
+const addResult = (uploadId, { completed, total, result }) => {
+    const entry = entries.get(uploadId);
+    if (!entry) return;
+    entry.completed = completed;
+    entry.total = total;
+    if (result.duplicateOf) {
+        // Counted as processed, but folded into the copy that was scored
+        const original = entry.results.find(r => r.fileName === result.duplicateOf);
+        if (original) original.duplicates = [...(original.duplicates || []), result.fileName];
+    } else {
+        entry.results.push(result);
+        entry.results.sort((a, b) => (!!a.prefiltered - !!b.prefiltered) || (b.matchPercentage - a.matchPercentage) || ((b.prefilterScore || 0) - (a.prefilterScore || 0)));
+    }
+    entry.updatedAt = Date.now();
+};
+
+const finish = (uploadId, status = 'done') => {
+    const entry = entries.get(uploadId);
+    if (!entry) return;
+    entry.status = status;
+    entry.updatedAt = Date.now();
+};
+
+const get = (uploadId) => entries.get(uploadId) || null;
+
+module.exports = {
+    start,
+    addResult,
+    finish,
+    get
+};
@@ -0,0 +1,165 @@
+const crypto = require('crypto');
+const env = require('../config/env');
+
+// Finished jobs stay pollable this long
+const JOB_TTL_MS = 10 * 60 * 1000;
+
+// Lower runs first; bulk jobs still run once they've waited BULK_MAX_WAIT_MS
+const PRIORITIES = { interactive: 0, bulk: 1 };
+const BULK_MAX_WAIT_MS = 60 * 1000;
+
+class QueueFullError extends Error {
+    constructor(retryAfterSeconds) {
+        super('Matcher queue is full, please retry shortly');
+        this.code = 'QUEUE_FULL';
+        this.retryAfter = retryAfterSeconds;
+    }
+}
+
+/**
+ * In-process job queue: at most `concurrency` tasks run at once, at most
+ * `maxQueued` wait, and enqueue() throws QueueFullError beyond that. A task
+ * is an async function; its job can be polled by id until JOB_TTL_MS after
+ * it finishes.
+ */
+const createQueue = ({ concurrency, maxQueued }) => {
+    const jobs = new Map();
+    const waiting = { interactive: [], bulk: [] };
+    let running = 0;
+    // Recent task durations, for the Retry-After estimate
+    let averageSeconds = 5;
+
+    const prune = () => {
+        const cutoff = Date.now() - JOB_TTL_MS;
+        for (const [id, job] of jobs) {
+            if (job.finishedAt && job.finishedAt < cutoff) jobs.delete(id);
+        }
+    };
+
+    const queuedCount = () => waiting.interactive.length + waiting.bulk.length;
+
+    const nextJob = () => {
+        const bulk = waiting.bulk[0];
+        if (bulk && (!waiting.interactive.length || Date.now() - bulk.createdAt > BULK_MAX_WAIT_MS)) {
+            return waiting.bulk.shift();
+        }
+        return waiting.interactive.shift();
+    };
+
+    const drain = () => {
+        while (running < concurrency && queuedCount() > 0) {
+            const job = nextJob();
+            running++;
+            job.status = 'running';
+            job.startedAt = Date.now();
+            Promise.resolve()
+                .then(job.task)
+                .then(
+                    (result) => {
+                        job.status = 'done';
+                        job.result = result;
+                        job.resolve(result);
+                    },
+                    (err) => {
+                        job.status = 'failed';
+                        job.error = err.message;
+                        job.reject(err);
+                    }
+                )
+                .finally(() => {
+                    job.finishedAt = Date.now();
+                    job.task = null;
+                    averageSeconds = 0.8 * averageSeconds + 0.2 * (job.finishedAt - job.startedAt) / 1000;
+                    running--;
+                    drain();
+                });
+        }
+    };
+
+    // Jobs ahead of this one in the order they'll be picked (ignoring bulk aging)
+    const position = (job) => {
+        if (job.status !== 'queued') return 0;
+        const ahead = job.priority === 'bulk' ? waiting.interactive.length : 0;
+        return ahead + waiting[job.priority].indexOf(job) + 1;
+    };
+
+    /**
+     * Queue task(). Resolves job.promise with its result. Throws
+     * QueueFullError (without queueing) when maxQueued jobs are already waiting.
+     */
+    const enqueue = (task, { priority = 'interactive', owner = null } = {}) => {
+        if (!(priority in PRIORITIES)) throw new Error(`Unknown priority: ${priority}`);
+        if (running >= concurrency && queuedCount() >= maxQueued) {
+            throw new QueueFullError(Math.ceil(averageSeconds * (queuedCount() / concurrency + 1)));
+        }
+        prune();
+
+        const job = {
+            id: crypto.randomUUID(),
+            status: 'queued',
+            priority,
+            owner,
+            task,
+            result: null,
+            error: null,
+            createdAt: Date.now(),
+            startedAt: null,
+            finishedAt: null
+        };
+        job.promise = new Promise((resolve, reject) => {
+            job.resolve = resolve;
+            job.reject = reject;
+        });
+        // Callers polling by id may never await it
+        job.promise.catch(() => {});
+
+        jobs.set(job.id, job);
+        waiting[priority].push(job);
+        drain();
+        return job;
+    };
+
+    const run = (task, options) => enqueue(task, options).promise;
+
+    // Public view of a job for status polling
+    const get = (id) => {
+        const job = jobs.get(id);
+        if (!job) return null;
+        const { task, resolve, reject, promise, ...data } = job;
+        return { ...data, position: position(job) };
+    };
+
+    const stats = () => ({
+        concurrency,
+        maxQueued,
+        running,
+        queued: queuedCount(),
+        queuedInteractive: waiting.interactive.length,
+        queuedBulk: waiting.bulk.length
+    });
+
+    return { enqueue, run, get, stats };
+};
+
+// Scoring and search calls to the matcher (spawned or warm server) run through this queue
+const matcherQueue = createQueue({
+    concurrency: env.MATCHER_CONCURRENCY,
+    maxQueued: env.MATCHER_QUEUE_LIMIT
+});
+
+// Small uploads are someone waiting on the page; larger ones are bulk screens
+const priorityFor = (fileCount) => (fileCount <= env.MATCHER_INTERACTIVE_FILES ? 'interactive' : 'bulk');
+
+// 429 with a Retry-After estimate for a QueueFullError
+const sendQueueFull = (res, error) => {
+    res.set('Retry-After', String(error.retryAfter));
+    return res.status(429).json({ success: false, error: error.message, retryAfter: error.retryAfter });
+};
+
+module.exports = {
+    QueueFullError,
+    createQueue,
+    matcherQueue,
+    priorityFor,
+    sendQueueFull
+};
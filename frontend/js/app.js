@@ -620,12 +620,35 @@ const App = (function() {
                 if (loading) loading.style.display = 'flex';
 
                 // Prepare FormData
+                const uploadId = `${Date.now()}-${Math.random().toString(36).slice(2)}`;
                 const formData = new FormData();
                 formData.append('jobDescription', jd);
+                formData.append('uploadId', uploadId);
                 uploadedFiles.forEach(file => {
                     formData.append('resumes', file);
                 });
 
+                // Poll how many resumes have been scored so far
+                const progressBar = document.getElementById('progressBar');
+                const progressText = document.getElementById('progressText');
+                if (progressBar) progressBar.style.width = '0%';
+                if (progressText) progressText.textContent = 'Uploading resumes...';
+                const progressTimer = setInterval(async () => {
+                    try {
+                        const progressRes = await fetch(`http://localhost:5000/api/shortlist/progress/${uploadId}`, { credentials: 'include' });
+                        if (!progressRes.ok) return;
+                        const { data: progress } = await progressRes.json();
+                        if (progressBar && progress.total) {
+                            progressBar.style.width = `${Math.round((progress.completed / progress.total) * 100)}%`;
+                        }
+                        if (progressText && progress.total) {
+                            progressText.textContent = `${progress.completed} of ${progress.total} resumes scored`;
+                        }
+                    } catch (e) {
+                        // Progress is best effort; the main request reports errors
+                    }
+                }, 1000);
+
                 try {
                     const res = await fetch('http://localhost:5000/api/shortlist', {
                         method: 'POST',
@@ -639,6 +662,12 @@ const App = (function() {
                          return;
                     }
 
+                    if (res.status === 429) {
+                         const busy = await res.json();
+                         alert(`The matcher is busy right now. Please try again in about ${busy.retryAfter} seconds.`);
+                         return;
+                    }
+
                     if (!res.ok) throw new Error('Processing failed');
 
                     const data = await res.json();
@@ -665,6 +694,7 @@ const App = (function() {
                     console.error(error);
                     alert('An error occurred while processing resumes. Check console.');
                 } finally {
+                    clearInterval(progressTimer);
                     if (loading) loading.style.display = 'none';
                 }
             });
@@ -694,8 +724,8 @@ const App = (function() {
         let allCandidates = [];
         try {
             allCandidates = JSON.parse(resultsJson);
-            // Sort by match score desc
-            allCandidates.sort((a, b) => b.matchPercentage - a.matchPercentage);
+            // Sort by match score desc (resumes cut by the cascade prefilter go last)
+            allCandidates.sort((a, b) => (!!a.prefiltered - !!b.prefiltered) || (b.matchPercentage - a.matchPercentage) || ((b.prefilterScore || 0) - (a.prefilterScore || 0)));
         } catch (e) {
             console.error('Failed to parse results JSON', e);
         }
@@ -761,6 +791,8 @@ const App = (function() {
                     <td>
                         <div style="font-weight: 600; color: var(--text-main);">${c.fileName}</div>
                         ${c.experienceYears ? `<div style="font-size: 0.75rem; color: var(--text-muted); margin-top: 0.25rem;">📅 ${c.experienceYears} years exp</div>` : ''}
+                        ${c.duplicates && c.duplicates.length ? `<div style="font-size: 0.75rem; color: var(--text-muted); margin-top: 0.25rem;" title="${c.duplicates.join(', ')}">📎 +${c.duplicates.length} duplicate upload${c.duplicates.length > 1 ? 's' : ''}</div>` : ''}
+                        ${c.prefiltered ? `<div style="font-size: 0.75rem; color: var(--text-muted); margin-top: 0.25rem;">Cut by prefilter (keyword score ${c.prefilterScore})</div>` : ''}
                     </td>
                     <td>
                         <div style="display: flex; align-items: center;">
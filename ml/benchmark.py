@@ -0,0 +1,460 @@
+"""
+End-to-end benchmark for the ML pipeline.
+
+Generates a synthetic PDF corpus (content from train_model.generate_synthetic_data)
+in four layouts:
+    text        - one page, single column text layer
+    multicolumn - one page, two text columns
+    scanned     - one page rendered to an image, no text layer (OCR path)
+    long        - several pages of text
+then times every stage per resume (extraction per extractor, clean_text,
+extract_skills, extract_experience, embedding) and a full matcher run, and
+writes one JSON report with resumes/sec, p50/p95/p99 and peak RSS. The
+"startup" section has `python -X importtime` figures for matcher.py and the
+wall time of fresh `matcher.py` processes for requests that shouldn't need the
+model (no input, an invalid op, a repeat of a cached match). Compare a report
+against one from another commit with --compare.
+
+"extraction_quality" records, per layout, which extractor won and how many
+resumes came back empty or failed (scanned ones without easyocr, say). Only
+resumes with text are timed, and --compare leaves out extraction figures when
+the two reports didn't extract the same resumes.
+
+Usage:
+    python benchmark.py --count 40 --kinds text,multicolumn,long --output bench.json
+    python benchmark.py --count 40 --compare bench_main.json
+    python benchmark.py --count 200 --skip-embedding   # no model needed
+"""
+import os
+import re
+import sys
+import json
+import time
+import random
+import platform
+import tempfile
+import argparse
+import contextlib
+import subprocess
+
+import numpy as np
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+ML_DIR = os.path.dirname(os.path.abspath(__file__))
+KINDS = ('text', 'multicolumn', 'scanned', 'long')
+# Imports that should only happen on first use; listed when matcher.py pulls them in at import
+HEAVY_MODULES = ('torch', 'sentence_transformers', 'sklearn', 'pandas', 'pdfplumber', 'pypdf', 'fitz', 'pymupdf')
+LONG_PAGES = 6
+PAGE_WIDTH, PAGE_HEIGHT = 595, 842  # A4 in points
+MARGIN = 50
+JOB_DESCRIPTION = (
+    "We are looking for a Software Engineer with 3+ years of experience in Python, "
+    "JavaScript, React, Node.js, SQL, AWS and Docker. Machine Learning is a plus."
+)
+
+_FIRST_NAMES = ["Asha", "Ben", "Chen", "Divya", "Elena", "Farid", "Grace", "Hiro", "Isha", "Jonas"]
+_LAST_NAMES = ["Rao", "Smith", "Li", "Gupta", "Novak", "Khan", "Okafor", "Tanaka", "Das", "Berg"]
+_COMPANIES = ["Acme Corp", "Globex", "Initech", "Umbrella Labs", "Stark Industries", "Wayne Tech"]
+_BULLETS = [
+    "Built and maintained REST APIs serving {n}k requests per day using {skill}.",
+    "Led a team of {n} engineers delivering features with {skill}.",
+    "Cut infrastructure cost by {n}% by migrating services to {skill}.",
+    "Designed data pipelines in {skill} processing {n} million records.",
+    "Mentored {n} junior developers on {skill} best practices."
+]
+
+# Extractions with less text than this are counted as empty, not timed
+MIN_TEXT_CHARS = 20
+
+def resume_paragraphs(row, rng, sections=1):
+    """
+    Resume text for one synthetic_data row as a list of paragraphs. The row's
+    resume_text is the summary; header, experience and skills are filled in
+    around it. `sections` repeats the experience section (long resumes).
+    """
+    name = f"{rng.choice(_FIRST_NAMES)} {rng.choice(_LAST_NAMES)}"
+    listed = re.search(r'(?:skilled in|expertise in) ([^.]*)', row['resume_text'])
+    skills = [s.strip() for s in listed.group(1).split(',') if s.strip()] if listed else ["Communication"]
+    years = rng.randint(0, 9)
+    paragraphs = [
+        name,
+        f"{name.split()[0].lower()}@example.com | +1 555 {rng.randint(1000, 9999)}",
+        "SUMMARY",
+        f"{row['resume_text']} {years} years of experience.",
+        "EXPERIENCE"
+    ]
+    for _ in range(sections):
+        for company in rng.sample(_COMPANIES, k=2):
+            start = rng.randint(2010, 2021)
+            paragraphs.append(f"Software Engineer, {company} ({start} - {start + rng.randint(1, 3)})")
+            paragraphs.extend(
+                bullet.format(n=rng.randint(2, 40), skill=rng.choice(skills))
+                for bullet in rng.sample(_BULLETS, k=3)
+            )
+    paragraphs.extend(["SKILLS", ", ".join(skills), "EDUCATION", "B.Tech in Computer Science"])
+    return paragraphs
+
+def _flow_text(fitz, paragraphs, fontsize=10):
+    """New document with `paragraphs` as text, continuing on a new page whenever the next one doesn't fit."""
+    doc = fitz.open()
+    rect = fitz.Rect(MARGIN, MARGIN, PAGE_WIDTH - MARGIN, PAGE_HEIGHT - MARGIN)
+    page = doc.new_page(width=PAGE_WIDTH, height=PAGE_HEIGHT)
+    top = rect.y0
+    for paragraph in paragraphs:
+        # insert_textbox writes nothing and returns < 0 when the text overflows, else the unused height
+        spare = page.insert_textbox(fitz.Rect(rect.x0, top, rect.x1, rect.y1), paragraph, fontsize=fontsize)
+        if spare < 0 and top > rect.y0:
+            page = doc.new_page(width=PAGE_WIDTH, height=PAGE_HEIGHT)
+            spare = page.insert_textbox(rect, paragraph, fontsize=fontsize)
+        if spare < 0:
+            raise ValueError("Paragraph too long for one page")
+        top = rect.y1 - spare
+    return doc
+
+def render_pdf(path, paragraphs, kind='text'):
+    """
+    Write `paragraphs` to a PDF at `path` in one of KINDS' layouts. Text and
+    scanned resumes take as many pages as their text needs.
+    """
+    try:
+        import pymupdf as fitz
+    except ImportError:
+        import fitz
+
+    doc = fitz.open()
+    text = "\n".join(paragraphs)
+    if kind == 'long':
+        per_page = max(1, -(-len(paragraphs) // LONG_PAGES))
+        for i in range(0, len(paragraphs), per_page):
+            page = doc.new_page(width=PAGE_WIDTH, height=PAGE_HEIGHT)
+            page.insert_textbox(fitz.Rect(MARGIN, MARGIN, PAGE_WIDTH - MARGIN, PAGE_HEIGHT - MARGIN),
+                                "\n".join(paragraphs[i:i + per_page]), fontsize=10)
+    elif kind == 'multicolumn':
+        page = doc.new_page(width=PAGE_WIDTH, height=PAGE_HEIGHT)
+        middle = len(paragraphs) // 2
+        column = (PAGE_WIDTH - 3 * MARGIN / 2) / 2
+        page.insert_textbox(fitz.Rect(MARGIN / 2, MARGIN, MARGIN / 2 + column, PAGE_HEIGHT - MARGIN),
+                            "\n".join(paragraphs[:middle]), fontsize=9)
+        page.insert_textbox(fitz.Rect(MARGIN + column, MARGIN, PAGE_WIDTH - MARGIN / 2, PAGE_HEIGHT - MARGIN),
+                            "\n".join(paragraphs[middle:]), fontsize=9)
+    elif kind == 'scanned':
+        # Render text pages to pixels and keep only the images
+        source = _flow_text(fitz, paragraphs)
+        for source_page in source:
+            pixmap = source_page.get_pixmap(dpi=150)
+            page = doc.new_page(width=PAGE_WIDTH, height=PAGE_HEIGHT)
+            page.insert_image(page.rect, pixmap=pixmap)
+        source.close()
+    elif kind == 'text':
+        doc.close()
+        doc = _flow_text(fitz, paragraphs)
+    else:
+        raise ValueError(f"Unknown PDF kind: {kind} (expected one of {', '.join(KINDS)})")
+    doc.save(path, garbage=3, deflate=True)
+    doc.close()
+
+def generate_corpus(out_dir, count, kinds=KINDS, seed=0):
+    """Write `count` resumes to out_dir, cycling through `kinds`. Returns [(path, kind)]."""
+    from train_model import generate_synthetic_data
+    random.seed(seed)
+    rng = random.Random(seed)
+    # generate_synthetic_data prints progress; keep stdout for the report
+    with contextlib.redirect_stdout(sys.stderr):
+        rows = generate_synthetic_data(count).to_dict('records')
+    os.makedirs(out_dir, exist_ok=True)
+    corpus = []
+    for i, row in enumerate(rows):
+        kind = kinds[i % len(kinds)]
+        path = os.path.join(out_dir, f"resume_{i:05d}_{kind}.pdf")
+        render_pdf(path, resume_paragraphs(row, rng, LONG_PAGES if kind == 'long' else 1), kind)
+        corpus.append((path, kind))
+    return corpus
+
+def summarize(seconds, items=None):
+    """count/total/mean/p50/p95/p99 (milliseconds) and items per second for a list of durations."""
+    if not seconds:
+        return {"count": 0}
+    values = np.asarray(seconds, dtype=np.float64)
+    total = float(values.sum())
+    p50, p95, p99 = np.percentile(values, [50, 95, 99]) * 1000
+    return {
+        "count": len(values),
+        "total_seconds": round(total, 4),
+        "mean_ms": round(float(values.mean()) * 1000, 3),
+        "p50_ms": round(float(p50), 3),
+        "p95_ms": round(float(p95), 3),
+        "p99_ms": round(float(p99), 3),
+        "per_second": round((items if items is not None else len(values)) / max(total, 1e-9), 2)
+    }
+
+def peak_rss_mb():
+    """Peak resident set size of this process and of its finished children (extraction workers)."""
+    if resource is None:
+        return None
+    # ru_maxrss is KiB on Linux, bytes on macOS
+    scale = 1 / (1024 * 1024) if sys.platform == 'darwin' else 1 / 1024
+    return {
+        "self": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * scale, 1),
+        "children": round(resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss * scale, 1)
+    }
+
+def _timed(function, *args):
+    start = time.perf_counter()
+    value = function(*args)
+    return value, time.perf_counter() - start
+
+def run_stages(corpus, model=None, batch_size=32):
+    """Time each pipeline stage per resume, in this process and without caches."""
+    from utils import extract_pdf, clean_text, extract_experience
+    from skills import extract_skills
+    import chunking
+
+    extractor_seconds = {}
+    kind_seconds = {}
+    quality = {}
+    stage_seconds = {"extract": [], "clean_text": [], "extract_skills": [], "extract_experience": []}
+    texts = []
+    for path, kind in corpus:
+        kind_quality = quality.setdefault(kind, {"count": 0, "timed": 0, "failed": 0, "empty_text": 0, "methods": {}, "chars": 0})
+        kind_quality["count"] += 1
+        try:
+            extraction, seconds = _timed(extract_pdf, path, False)
+        except Exception as e:
+            sys.stderr.write(f"Warning: Extraction failed for {path}: {e}\n")
+            kind_quality["failed"] += 1
+            continue
+        method = extraction.get("method") or "none"
+        kind_quality["methods"][method] = kind_quality["methods"].get(method, 0) + 1
+        kind_quality["chars"] += len(extraction["text"])
+        # Finding no text (e.g. scanned pages without easyocr) is fast but isn't extraction; timing it
+        # would make this kind look faster than it is
+        if len(extraction["text"].strip()) < MIN_TEXT_CHARS:
+            kind_quality["empty_text"] += 1
+            continue
+        kind_quality["timed"] += 1
+        stage_seconds["extract"].append(seconds)
+        kind_seconds.setdefault(kind, []).append(seconds)
+        for name, timing in extraction["timings"].items():
+            extractor_seconds.setdefault(name, []).append(timing["seconds"])
+        cleaned, seconds = _timed(clean_text, extraction["text"])
+        stage_seconds["clean_text"].append(seconds)
+        _, seconds = _timed(extract_skills, cleaned)
+        stage_seconds["extract_skills"].append(seconds)
+        _, seconds = _timed(extract_experience, extraction["text"])
+        stage_seconds["extract_experience"].append(seconds)
+        texts.append(cleaned)
+
+    for kind, kind_quality in quality.items():
+        kind_quality["mean_chars"] = round(kind_quality.pop("chars") / max(kind_quality["count"] - kind_quality["failed"], 1))
+        if not kind_quality["timed"]:
+            sys.stderr.write(f"Warning: No text extracted from any '{kind}' resume; left out of the timings\n")
+
+    report = {name: summarize(values) for name, values in stage_seconds.items()}
+    report["extract_by_extractor"] = {name: summarize(values) for name, values in extractor_seconds.items()}
+    report["extract_by_kind"] = {kind: summarize(values) for kind, values in kind_seconds.items()}
+    report["extraction_quality"] = quality
+
+    if model is not None:
+        chunks = [chunk for text in texts if text for chunk in chunking.chunk_text(text)]
+        batch_seconds = []
+        model.encode(chunks[:1])  # warm-up
+        for i in range(0, len(chunks), batch_size):
+            _, seconds = _timed(model.encode, chunks[i:i + batch_size])
+            batch_seconds.append(seconds)
+        # Percentiles are per batch, per_second is chunks per second
+        report["embedding"] = dict(summarize(batch_seconds, items=len(chunks)), chunks=len(chunks), batch_size=batch_size)
+    return report
+
+def run_pipeline(corpus, matcher, repeats=2):
+    """Wall time of full matcher runs over the corpus: cold caches first, then warm."""
+    file_paths = [path for path, _ in corpus]
+    runs = []
+    for i in range(repeats):
+        start = time.perf_counter()
+        results = matcher.process_request({"job_description": JOB_DESCRIPTION, "file_paths": file_paths, "index_pool": False})
+        seconds = time.perf_counter() - start
+        runs.append({
+            "run": "cold" if i == 0 else "warm",
+            "seconds": round(seconds, 4),
+            "resumes_per_second": round(len(file_paths) / max(seconds, 1e-9), 2),
+            "results": len(results)
+        })
+    return runs
+
+def import_times(module='matcher', top=10):
+    """
+    Import `module` in a fresh interpreter under -X importtime: its total
+    import seconds, its heaviest direct imports and any HEAVY_MODULES loaded.
+    """
+    completed = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', f'import {module}'],
+        cwd=ML_DIR, capture_output=True, text=True
+    )
+    # "import time: self [us] | cumulative | imported package", children before their parent
+    children, direct, total, loaded = [], [], None, set()
+    for line in completed.stderr.splitlines():
+        match = re.match(r'import time:\s+(\d+) \|\s+(\d+) \|( +)(\S+)', line)
+        if not match:
+            continue
+        depth = (len(match.group(3)) - 1) // 2
+        name, cumulative = match.group(4), int(match.group(2))
+        loaded.add(name.split('.')[0])
+        if depth == 1:
+            children.append((name, cumulative))
+        elif depth == 0:
+            if name == module:
+                direct, total = children, cumulative
+            children = []
+    if total is None:
+        return {"module": module, "error": completed.stderr.strip().splitlines()[-1:] or "import failed"}
+    return {
+        "module": module,
+        "seconds": round(total / 1e6, 4),
+        "heaviest": [{"module": name, "ms": round(us / 1000, 1)} for name, us in sorted(direct, key=lambda d: -d[1])[:top]],
+        "heavy_imports": [name for name in HEAVY_MODULES if name in loaded]
+    }
+
+def cold_start(corpus, cached_match=True):
+    """Wall seconds of fresh `python matcher.py` processes for requests that shouldn't load the model."""
+    def run(payload):
+        start = time.perf_counter()
+        subprocess.run([sys.executable, os.path.join(ML_DIR, 'matcher.py')], input=payload, cwd=ML_DIR, capture_output=True, text=True)
+        return round(time.perf_counter() - start, 4)
+
+    report = {"empty_input": run(""), "invalid_request": run(json.dumps({"op": "unknown"}))}
+    if cached_match:
+        request = json.dumps({"job_description": JOB_DESCRIPTION, "file_paths": [path for path, _ in corpus], "index_pool": False})
+        run(request)  # fills the extraction and embedding caches if they are still cold
+        report["cached_match"] = run(request)
+    return report
+
+def git_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=os.path.dirname(os.path.abspath(__file__)),
+            capture_output=True, text=True, timeout=5
+        ).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+def _timed_kinds(report):
+    quality = report.get("stages", {}).get("extraction_quality")
+    if quality is None:
+        return None
+    return {kind: (q["count"], q["timed"]) for kind, q in quality.items()}
+
+def compare(report, baseline):
+    """
+    Per-stage p50 and throughput ratios of `report` against `baseline` (>1 =
+    slower / faster). When the two reports didn't extract text from the same
+    resumes (say OCR ran in one only), the extraction-dependent figures aren't
+    comparable and are listed under "skipped" instead.
+    """
+    rows = {}
+    skipped = []
+    coverage_differs = _timed_kinds(report) != _timed_kinds(baseline)
+    for name, stage in report["stages"].items():
+        old = baseline.get("stages", {}).get(name)
+        if not isinstance(stage, dict) or not old or "p50_ms" not in stage or not old.get("p50_ms"):
+            continue
+        if coverage_differs and name != "embedding":
+            skipped.append(name)
+            continue
+        rows[name] = {
+            "p50_ratio": round(stage["p50_ms"] / old["p50_ms"], 3),
+            "throughput_ratio": round(stage["per_second"] / max(old["per_second"], 1e-9), 3)
+        }
+    for new_run, old_run in zip(report.get("pipeline", []), baseline.get("pipeline", [])):
+        if coverage_differs:
+            skipped.append(f"pipeline_{new_run['run']}")
+            continue
+        rows[f"pipeline_{new_run['run']}"] = {
+            "throughput_ratio": round(new_run["resumes_per_second"] / max(old_run["resumes_per_second"], 1e-9), 3)
+        }
+    new_startup, old_startup = report.get("startup", {}), baseline.get("startup", {})
+    if new_startup.get("import", {}).get("seconds") and old_startup.get("import", {}).get("seconds"):
+        rows["startup_import"] = {"seconds_ratio": round(new_startup["import"]["seconds"] / old_startup["import"]["seconds"], 3)}
+    for name, seconds in new_startup.get("cold_start", {}).items():
+        old = old_startup.get("cold_start", {}).get(name)
+        if old:
+            rows[f"startup_{name}"] = {"seconds_ratio": round(seconds / old, 3)}
+    comparison = {"baseline_commit": baseline.get("meta", {}).get("commit"), "stages": rows}
+    if skipped:
+        comparison["skipped"] = {
+            "reason": "extraction coverage differs (see stages.extraction_quality)",
+            "stages": skipped
+        }
+    return comparison
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the resume matching pipeline")
+    parser.add_argument('--count', type=int, default=40, help="Resumes to generate")
+    parser.add_argument('--kinds', default=','.join(KINDS), help=f"Comma-separated subset of {', '.join(KINDS)}")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--corpus-dir', help="Keep the generated PDFs here (default: a temp dir)")
+    parser.add_argument('--batch-size', type=int, default=32)
+    parser.add_argument('--skip-embedding', action='store_true', help="Extraction stages only; no model load")
+    parser.add_argument('--skip-startup', action='store_true', help="Leave out the import-time and cold-start figures")
+    parser.add_argument('--output', help="Write the JSON report here as well as to stdout")
+    parser.add_argument('--compare', help="Baseline report to compare against")
+    args = parser.parse_args(argv)
+
+    kinds = tuple(k.strip() for k in args.kinds.split(',') if k.strip())
+    unknown = set(kinds) - set(KINDS)
+    if unknown or not kinds:
+        parser.error(f"unknown kinds: {', '.join(sorted(unknown)) or '(none given)'}")
+
+    with tempfile.TemporaryDirectory(prefix='matcher-bench-') as tmp:
+        # Fresh caches, so the first pipeline run is cold
+        os.environ['MATCHER_CACHE_DIR'] = os.path.join(tmp, 'cache')
+        corpus_dir = args.corpus_dir or os.path.join(tmp, 'corpus')
+        start = time.perf_counter()
+        corpus = generate_corpus(corpus_dir, args.count, kinds, args.seed)
+        generate_seconds = time.perf_counter() - start
+
+        matcher = model = None
+        if not args.skip_embedding:
+            with contextlib.redirect_stdout(sys.stderr):
+                import matcher
+                model = matcher.get_model()
+        report = {
+            "meta": {
+                "commit": git_commit(),
+                "timestamp": round(time.time()),
+                "python": platform.python_version(),
+                "platform": platform.platform(),
+                "cpus": os.cpu_count(),
+                "encoder": None if matcher is None else matcher.ENCODER_BACKEND
+            },
+            "corpus": {
+                "count": len(corpus),
+                "kinds": {kind: sum(1 for _, k in corpus if k == kind) for kind in kinds},
+                "seed": args.seed,
+                "generate_seconds": round(generate_seconds, 3)
+            },
+            "stages": run_stages(corpus, model, args.batch_size)
+        }
+        if matcher is not None:
+            report["pipeline"] = run_pipeline(corpus, matcher)
+        if not args.skip_startup:
+            report["startup"] = {
+                "import": import_times('matcher'),
+                "cold_start": cold_start(corpus, cached_match=matcher is not None)
+            }
+        report["peak_rss_mb"] = peak_rss_mb()
+
+    if args.compare:
+        with open(args.compare, 'r', encoding='utf-8') as f:
+            report["comparison"] = compare(report, json.load(f))
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(output + "\n")
+    print(output)
+
+if __name__ == "__main__":
+    main()
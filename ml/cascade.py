@@ -0,0 +1,44 @@
+"""
+Cascade ranking: a cheap first stage in front of the sentence encoder.
+
+When HR only wants the best K of a large pool, every resume is still extracted
+(skills and experience come from that), but stage one ranks them with a TF-IDF
+similarity to the JD in place of the semantic score. Only the top K plus a
+safety margin are embedded and reranked, and only the final K get insights,
+so embedding and insight cost follows K instead of the pool size.
+"""
+import os
+import math
+
+import numpy as np
+
+import tfidf_model
+
+# Extra candidates reranked on top of K, as a fraction of K (at least MIN_MARGIN)
+CASCADE_MARGIN = float(os.environ.get('MATCHER_CASCADE_MARGIN', 0.5))
+MIN_MARGIN = 5
+
+def cascade_options(value):
+    """
+    Normalise a request's "cascade" field, either K or {"top_k": K, "margin": M}.
+    Returns {"top_k", "margin"}, or None when the cascade is off.
+    """
+    if not value:
+        return None
+    if isinstance(value, dict):
+        top_k = int(value.get('top_k') or 0)
+        margin = value.get('margin')
+    else:
+        top_k = int(value)
+        margin = None
+    if top_k <= 0:
+        raise ValueError(f"cascade top_k must be positive, got {top_k}")
+    if margin is None:
+        margin = max(MIN_MARGIN, math.ceil(top_k * CASCADE_MARGIN))
+    return {"top_k": top_k, "margin": max(0, int(margin))}
+
+def tfidf_similarities(cleaned_jd, texts):
+    """Cosine similarity (0-1) of each text to the JD under the stable TF-IDF model."""
+    if not texts:
+        return np.zeros(0)
+    return tfidf_model.similarities(cleaned_jd, texts)
@@ -0,0 +1,150 @@
+"""
+Consistency checks for the matcher ops on real resumes:
+  - stream: a streamed summary's ranking is a permutation of the scored
+    (non-duplicate) upload indexes in rank order, and matches
+    process_request's ranking; with and without the cascade
+  - append: the job state a streamed request saves under its "job_id" holds
+    that ranking, and append_candidates merges new resumes into it without
+    losing or repeating any; a renamed copy of a stored resume comes back
+    under that resume's "duplicates", not as a new row
+
+    python ml/check_matcher.py backend/uploads
+    python ml/check_matcher.py backend/uploads --limit 20 --jd "Senior Python developer ..."
+
+Runs against the configured encoder and caches. Exits with status 1 if a
+check fails.
+"""
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+
+import job_state
+import matcher
+
+DEFAULT_JD = (
+    "We are looking for a Software Engineer with 2+ years of experience in Python, JavaScript, "
+    "React, Node.js, SQL and Docker, comfortable with REST APIs, Git and agile teams."
+)
+
+def pdf_paths(paths, limit):
+    found = []
+    for path in paths:
+        if os.path.isdir(path):
+            found.extend(sorted(os.path.join(path, f) for f in os.listdir(path) if f.lower().endswith('.pdf')))
+        else:
+            found.append(path)
+    return found[:limit]
+
+def streamed(request):
+    """(results by upload index, summary record) of a streamed request."""
+    records = []
+    matcher.stream_request(request, records.append)
+    results = {record['index']: record['result'] for record in records if record['type'] == 'result'}
+    summaries = [record for record in records if record['type'] == 'summary']
+    if len(summaries) != 1:
+        raise AssertionError(f"expected one summary record, got {len(summaries)}")
+    return results, summaries[0]
+
+def check_stream(request):
+    """Problems with the streamed ranking of `request`, as a list of strings."""
+    problems = []
+    results, summary = streamed(request)
+    ranking = summary['ranking']
+    scored = [index for index, result in results.items() if 'duplicateOf' not in result]
+    if sorted(ranking) != sorted(scored):
+        problems.append(f"ranking {ranking} is not a permutation of the scored indexes {sorted(scored)}")
+        return problems
+    expected = sorted(scored, key=lambda index: matcher.rank_key(index, results[index]))
+    if ranking != expected:
+        problems.append(f"ranking {ranking} is not in score order {expected}")
+    names = [results[index]['fileName'] for index in ranking]
+    processed = [result['fileName'] for result in matcher.process_request(dict(request, stream=False))]
+    if names != processed:
+        problems.append(f"streamed ranking {names} differs from process_request {processed}")
+    return problems
+
+def check_append(request, new_paths):
+    """Problems with saving `request` as a job and appending `new_paths` to it."""
+    problems = []
+    job_id = f"check-matcher-{os.getpid()}"
+    copy_dir = tempfile.mkdtemp()
+    try:
+        results, summary = streamed(dict(request, job_id=job_id))
+        names = [results[index]['fileName'] for index in summary['ranking']]
+        saved = job_state.load(job_id)
+        if saved is None:
+            return ["no job state saved"]
+        stored = [result['fileName'] for result in saved[0]['results']]
+        if stored != names:
+            problems.append(f"saved ranking {stored} differs from the streamed ranking {names}")
+
+        appended = matcher.append_candidates({"job_id": job_id, "file_paths": new_paths, "index_pool": False})
+        added = [result['fileName'] for result in appended['added']]
+        ranking = appended['ranking']
+        if len(set(ranking)) != len(ranking) or set(ranking) != set(stored) | set(added):
+            problems.append(f"appended ranking {ranking} is not the saved {stored} plus the added {added}")
+        merged = job_state.load(job_id)[0]['results']
+        if [result['fileName'] for result in merged] != ranking:
+            problems.append("saved state after append differs from the returned ranking")
+        if merged != sorted(merged, key=lambda result: matcher.rank_key(0, result)):
+            problems.append("saved state after append is not in score order")
+
+        # The best resume has text, so a copy of it is an exact duplicate
+        original = merged[0]['fileName']
+        source = next(path for path in request['file_paths'] + new_paths if os.path.basename(path) == original)
+        copy = os.path.join(copy_dir, f"copy-{original}")
+        shutil.copyfile(source, copy)
+        appended = matcher.append_candidates({"job_id": job_id, "file_paths": [copy], "index_pool": False})
+        copy_name = os.path.basename(copy)
+        if appended['added'] or copy_name in appended['ranking']:
+            problems.append(f"copy of {original} was ranked as a new resume")
+        if copy_name not in appended['duplicates'].get(original, []):
+            problems.append(f"copy of {original} is not among its duplicates: {appended['duplicates']}")
+        saved_original = next(result for result in job_state.load(job_id)[0]['results'] if result['fileName'] == original)
+        if copy_name not in saved_original.get('duplicates', []):
+            problems.append(f"saved state doesn't list the copy under {original}")
+    finally:
+        shutil.rmtree(job_state._job_dir(job_id), ignore_errors=True)
+        shutil.rmtree(copy_dir, ignore_errors=True)
+    return problems
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Check matcher ops against each other on real resumes")
+    parser.add_argument('paths', nargs='+', help="PDFs or directories of PDFs")
+    parser.add_argument('--limit', type=int, default=12, help="Resumes to use")
+    parser.add_argument('--jd', default=DEFAULT_JD, help="Job description to score against")
+    args = parser.parse_args(argv)
+
+    file_paths = pdf_paths(args.paths, args.limit)
+    if not file_paths:
+        print("No resumes found")
+        return 1
+    request = {"job_description": args.jd, "file_paths": file_paths, "index_pool": False}
+    top_k = max(1, len(file_paths) // 3)
+    # Appends add the last resumes to a job holding the others
+    first = dict(request, file_paths=file_paths[:-2])
+    checks = [
+        ("stream", lambda: check_stream(request)),
+        ("stream (cascade)", lambda: check_stream(dict(request, cascade={"top_k": top_k, "margin": 1}))),
+        ("append", lambda: check_append(first, file_paths[-2:])),
+        ("append (cascade)", lambda: check_append(dict(first, cascade={"top_k": top_k, "margin": 1}), file_paths[-2:])),
+    ]
+
+    failed = 0
+    for name, check in checks:
+        try:
+            problems = check()
+        except Exception as e:
+            problems = [f"{type(e).__name__}: {e}"]
+        for problem in problems:
+            print(f"{name}: {problem}")
+        if problems:
+            failed += 1
+        else:
+            print(f"{name}: OK")
+    return 1 if failed else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -14,8 +14,9 @@ try:
 except ImportError:
     print("OpenCV missing")
     
-pdf_path = r"d:\ResumeShortlist\backend\uploads\1768162275819-14556043-ritaban_guchait_resume.pdf"
-if os.path.exists(pdf_path):
-    print(f"Target PDF exists: {pdf_path}")
+upload_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'backend', 'uploads')
+pdf_files = [os.path.join(upload_dir, f) for f in os.listdir(upload_dir) if f.endswith('.pdf')] if os.path.isdir(upload_dir) else []
+if pdf_files:
+    print(f"Target PDF exists: {max(pdf_files, key=os.path.getctime)}")
 else:
-    print("Target PDF not found")
+    print(f"Target PDF not found in {upload_dir}")
@@ -0,0 +1,144 @@
+"""
+Regression check for textnorm: clean_text, extract_experience and
+NormalizedText must give exactly what the old regex chain in utils.py gave,
+since cached embeddings, job state and dedup keys are keyed by the cleaned
+text. Compares both on fuzzed strings and on real text (CSV resume_text /
+job_description columns, or PDFs and directories of them).
+
+    python ml/check_textnorm.py
+    python ml/check_textnorm.py backend/uploads ml/dataset/synthetic_data.csv --fuzz 200000
+
+Exits with status 1 on the first mismatches.
+"""
+import argparse
+import csv
+import os
+import random
+import re
+import sys
+
+import textnorm
+
+DEFAULT_CSV = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'dataset', 'synthetic_data.csv')
+
+# Pieces the fuzzer strings together: the cases each rule has to get right
+FUZZ_PIECES = [
+    'jane.doe@mail.com', 'a@b', '@', '@@', 'x@', '@y', '.@-', 'user_1@host-2.io.', 'mail me@', 'é@é',
+    'http://example.com/x', 'https', 'http', 'see http:', 'ahttpb', 'HTTP://X.ORG',
+    '|', '/', '•', ' ', ' ', ' ', '\x1c', '\x1f', '\t', '\n', '\r\n', '  ',
+    'C++', 'C#', 'Node.JS', '.NET', 'JavaDeveloper', 'e-mail', 'R&D', '(remote)', 'naïve', 'İstanbul', 'straße',
+    '５', '١٢', 'Ⅻ', '²', '😀', '​',
+    '5+ years of experience', '5 years experience', 'experience of 12 yrs', 'Experience 3+ year',
+    'worked for 3 years', 'worked  for 10yrs', '10 yrs in', '7 years in', '2yr in', '4+years of  experience',
+    '0 years', 'experience', 'years', 'yrs', 'of', 'in', '+', '12', '3', ' ', 'a', 'Z',
+]
+FUZZ_CHARS = 'aZ09 .+#-_@/|:\t\n•éß  '
+
+def old_clean_text(text):
+    """clean_text as it was in utils.py before textnorm."""
+    if not text:
+        return ""
+    text = text.lower()
+    text = re.sub(r'[\w\.-]+@[\w\.-]+', '', text)
+    text = re.sub(r'http\S+', '', text)
+    text = re.sub(r'([a-z])([A-Z])', r'\1 \2', text)
+    text = text.replace('|', ' ')
+    text = text.replace('/', ' ')
+    text = text.replace('•', ' ')
+    text = re.sub(r'[^a-z0-9\s+#\.]', '', text)
+    text = re.sub(r'\s+', ' ', text).strip()
+    return text
+
+def old_extract_experience(text):
+    """extract_experience as it was in utils.py before textnorm."""
+    if not text:
+        return 0
+    patterns = [
+        r'(\d+)\+?\s*(?:years?|yrs?)\s+(?:of\s+)?experience',
+        r'experience\s+(?:of\s+)?(\d+)\+?\s*(?:years?|yrs?)',
+        r'(\d+)\+?\s*(?:years?|yrs?)\s+in',
+        r'worked\s+for\s+(\d+)\+?\s*(?:years?|yrs?)',
+    ]
+    years_found = []
+    text_lower = text.lower()
+    for pattern in patterns:
+        for match in re.findall(pattern, text_lower):
+            try:
+                years_found.append(int(match))
+            except ValueError:
+                continue
+    return max(years_found) if years_found else 0
+
+def mismatch(text):
+    """Description of how textnorm differs from the old implementation on `text`, or None."""
+    expected = (old_clean_text(text), old_extract_experience(text))
+    got = (textnorm.clean_text(text), textnorm.extract_experience(text))
+    normalized = textnorm.NormalizedText(text)
+    if got != expected:
+        return f"expected {expected!r}, got {got!r}"
+    if (normalized.cleaned, normalized.experience_years) != expected:
+        return f"NormalizedText: expected {expected!r}, got {(normalized.cleaned, normalized.experience_years)!r}"
+    return None
+
+def fuzz_texts(count, seed):
+    rng = random.Random(seed)
+    for _ in range(count):
+        parts = []
+        for _ in range(rng.randint(0, 12)):
+            if rng.random() < 0.7:
+                parts.append(rng.choice(FUZZ_PIECES))
+            else:
+                parts.append(''.join(rng.choice(FUZZ_CHARS) for _ in range(rng.randint(1, 6))))
+        yield ''.join(parts)
+
+def csv_texts(path):
+    with open(path, newline='', encoding='utf-8') as f:
+        for row in csv.DictReader(f):
+            for column in ('resume_text', 'job_description'):
+                if row.get(column):
+                    yield row[column]
+
+def pdf_texts(paths):
+    from utils import extract_text_from_pdf
+    for path in paths:
+        try:
+            yield extract_text_from_pdf(path)
+        except Exception as e:
+            sys.stderr.write(f"Warning: Could not extract {path}: {e}\n")
+
+def texts_from(path):
+    if os.path.isdir(path):
+        return pdf_texts(sorted(os.path.join(path, f) for f in os.listdir(path) if f.lower().endswith('.pdf')))
+    if path.lower().endswith('.csv'):
+        return csv_texts(path)
+    return pdf_texts([path])
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Check textnorm against the old regex implementation")
+    parser.add_argument('paths', nargs='*', help="CSV files, PDFs or directories of PDFs (default: the bundled synthetic CSV)")
+    parser.add_argument('--fuzz', type=int, default=20000, help="Fuzzed strings to check")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--max-failures', type=int, default=5)
+    args = parser.parse_args(argv)
+
+    paths = args.paths or ([DEFAULT_CSV] if os.path.exists(DEFAULT_CSV) else [])
+    sources = [('fuzz', fuzz_texts(args.fuzz, args.seed))] + [(path, texts_from(path)) for path in paths]
+    failures = 0
+    for name, texts in sources:
+        checked = 0
+        for text in texts:
+            checked += 1
+            problem = mismatch(text)
+            if problem:
+                failures += 1
+                print(f"{name}: {text[:200]!r}: {problem}")
+                if failures >= args.max_failures:
+                    return 1
+        print(f"{name}: {checked} texts checked")
+    if failures:
+        return 1
+    print("OK")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,74 @@
+"""
+Chunked semantic scoring for long resumes.
+
+all-MiniLM-L6-v2 truncates its input at 256 word pieces, so embedding a whole
+multi-page resume only scores its first half page. Instead each resume is split
+into overlapping word windows, every window is embedded (in the same batches as
+the other resumes' windows), and the window similarities are pooled into one
+document score.
+"""
+import os
+
+import numpy as np
+
+# ~160 words stays under the 256 word-piece limit for typical resume text
+CHUNK_WORDS = int(os.environ.get('MATCHER_CHUNK_WORDS', 160))
+CHUNK_OVERLAP = int(os.environ.get('MATCHER_CHUNK_OVERLAP', 40))
+# Chunks encoded per job, shared out evenly between its resumes
+MAX_CHUNKS_PER_JOB = int(os.environ.get('MATCHER_MAX_CHUNKS', 1024))
+POOLING = os.environ.get('MATCHER_POOLING', 'topk')
+POOLING_TOP_K = int(os.environ.get('MATCHER_POOLING_TOP_K', 3))
+
+POOLING_METHODS = ('max', 'mean', 'topk')
+
+def chunk_text(text, words=CHUNK_WORDS, overlap=CHUNK_OVERLAP, max_chunks=None):
+    """
+    Split text into windows of `words` words overlapping by `overlap` words.
+    Text that fits in one window is returned unchanged. With more than
+    `max_chunks` windows, evenly spaced ones are kept so the whole document
+    is still covered.
+    """
+    tokens = text.split()
+    if len(tokens) <= words:
+        return [text]
+
+    step = max(1, words - overlap)
+    last = len(tokens) - words
+    # The final window is pinned to the end so no window is short
+    starts = list(range(0, last, step)) + [last]
+
+    if max_chunks and len(starts) > max_chunks:
+        if max_chunks == 1:
+            starts = starts[:1]
+        else:
+            span = len(starts) - 1
+            starts = [starts[i * span // (max_chunks - 1)] for i in range(max_chunks)]
+
+    return [" ".join(tokens[start:start + words]) for start in starts]
+
+def chunks_per_resume(resume_count, max_chunks_per_job=MAX_CHUNKS_PER_JOB):
+    """Chunk budget for each resume of a job (at least one)."""
+    return max(1, max_chunks_per_job // max(1, resume_count))
+
+def document_vector(chunk_embeddings):
+    """One normalized vector for a resume: the mean of its chunk embeddings."""
+    vector = np.mean(chunk_embeddings, axis=0)
+    norm = np.linalg.norm(vector)
+    return vector / norm if norm else vector
+
+def pool_similarities(similarities, method=POOLING, top_k=POOLING_TOP_K):
+    """
+    Combine one resume's chunk similarities into a document similarity.
+    A (chunks x JDs) matrix is pooled per column and gives one value per JD.
+    """
+    similarities = np.asarray(similarities)
+    if method == 'max':
+        pooled = np.max(similarities, axis=0)
+    elif method == 'mean':
+        pooled = np.mean(similarities, axis=0)
+    elif method == 'topk':
+        k = max(1, min(top_k, len(similarities)))
+        pooled = np.mean(np.sort(similarities, axis=0)[-k:], axis=0)
+    else:
+        raise ValueError(f"Unknown pooling method: {method} (expected one of {', '.join(POOLING_METHODS)})")
+    return float(pooled) if np.ndim(pooled) == 0 else pooled
@@ -3,7 +3,7 @@ import fitz
 import sys
 import os
 
-upload_dir = r"d:\ResumeShortlist\backend\uploads"
+upload_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'backend', 'uploads')
 pdf_files = [os.path.join(upload_dir, f) for f in os.listdir(upload_dir) if f.endswith('.pdf')]
 if not pdf_files:
     sys.exit(1)
@@ -1,12 +1,12 @@
 
 import sys
 import os
-sys.path.append(os.getcwd())
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 from utils import extract_text_from_pdf, clean_text
 from skills import extract_skills
 
 # Find latest PDF
-upload_dir = r"d:\ResumeShortlist\backend\uploads"
+upload_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'backend', 'uploads')
 pdf_files = [os.path.join(upload_dir, f) for f in os.listdir(upload_dir) if f.endswith('.pdf')]
 if not pdf_files:
     print("No PDF found")
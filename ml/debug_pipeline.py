@@ -3,7 +3,7 @@ import sys
 import os
 import json
 # Add current directory to sys.path
-sys.path.append(os.getcwd())
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
 from matcher import main as matcher_main
 from utils import extract_text_from_pdf, clean_text
@@ -17,7 +17,7 @@ Skills: Java, SQL, Hibernate, Maven, Git.
 """
 
 # Find a resume to test
-upload_dir = r"d:\ResumeShortlist\backend\uploads"
+upload_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'backend', 'uploads')
 pdf_files = [f for f in os.listdir(upload_dir) if f.endswith('.pdf')]
 if not pdf_files:
     print("No PDF found for debugging.")
@@ -0,0 +1,78 @@
+"""
+Duplicate resume detection within a job.
+
+The same resume often arrives several times under different file names.
+Exact copies are found by the hash of their cleaned text. Near-duplicates
+(re-exports, a changed phone number) are found with MinHash signatures over
+word shingles and LSH banding: resumes sharing a band are compared, and
+count as duplicates when their estimated Jaccard similarity reaches
+DEDUP_THRESHOLD. Only the first resume of each group is embedded and scored.
+"""
+import os
+import zlib
+
+import numpy as np
+
+from embedding_store import text_key
+
+DEDUP = os.environ.get('MATCHER_DEDUP', '1') != '0'
+# Estimated shingle Jaccard similarity at which two resumes are one submission
+DEDUP_THRESHOLD = float(os.environ.get('MATCHER_DEDUP_THRESHOLD', 0.9))
+SHINGLE_WORDS = 5
+NUM_PERM = 128
+# 32 bands of 4 rows: pairs above ~0.5 similarity almost always share a band
+LSH_BANDS = 32
+
+# Universal hashing (a*x + b) mod p over 32-bit shingle hashes; fits in uint64
+_PRIME = np.uint64((1 << 31) - 1)
+_rng = np.random.default_rng(1)
+_A = _rng.integers(1, (1 << 31) - 1, NUM_PERM, dtype=np.uint64)
+_B = _rng.integers(0, (1 << 31) - 1, NUM_PERM, dtype=np.uint64)
+
+def minhash(text, shingle_words=SHINGLE_WORDS):
+    """NUM_PERM-long MinHash signature of the text's word shingles."""
+    words = text.split()
+    shingles = {' '.join(words[i:i + shingle_words]) for i in range(max(1, len(words) - shingle_words + 1))}
+    hashes = np.fromiter((zlib.crc32(s.encode('utf-8')) for s in shingles), dtype=np.uint64, count=len(shingles))
+    return ((np.outer(_A, hashes) + _B[:, None]) % _PRIME).min(axis=1)
+
+def fingerprint(text):
+    """(exact text key, MinHash signature) of a cleaned text, what DuplicateIndex compares."""
+    return text_key(text), minhash(text)
+
+class DuplicateIndex:
+    """
+    Resumes seen so far in a job. add() returns (representative, similarity)
+    when a text duplicates an earlier representative, else registers the
+    text as a new representative and returns None. add_fingerprint() does the
+    same for a precomputed fingerprint, e.g. one kept in a job's saved state.
+    """
+    def __init__(self, threshold=DEDUP_THRESHOLD):
+        self.threshold = threshold
+        self.exact = {}
+        self.signatures = {}
+        self.buckets = {}
+
+    def add(self, key, text):
+        return self.add_fingerprint(key, *fingerprint(text))
+
+    def add_fingerprint(self, key, digest, signature):
+        if digest in self.exact:
+            return self.exact[digest], 1.0
+
+        signature = np.asarray(signature, dtype=np.uint64)
+        bands = [(b, signature[b::LSH_BANDS].tobytes()) for b in range(LSH_BANDS)]
+        best, best_similarity = None, 0.0
+        for band in bands:
+            for other in self.buckets.get(band, ()):
+                similarity = float(np.mean(signature == self.signatures[other]))
+                if similarity > best_similarity:
+                    best, best_similarity = other, similarity
+        if best is not None and best_similarity >= self.threshold:
+            return best, best_similarity
+
+        self.exact[digest] = key
+        self.signatures[key] = signature
+        for band in bands:
+            self.buckets.setdefault(band, []).append(key)
+        return None
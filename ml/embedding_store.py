@@ -0,0 +1,216 @@
+"""
+Persistent embedding cache for resumes and job descriptions.
+
+Embeddings are keyed by (model name, SHA-256 of the cleaned text), so re-running
+an already-seen pool against a tweaked JD only encodes what is new. Each model
+gets its own directory holding:
+    matrix.npy  - memory-mapped (rows x dim) float32/float16 matrix
+    clock.npy   - memory-mapped last-used time (ns) of every row, for LRU
+    index.json  - {key: row} plus the capacity and the next unused row
+The matrix grows by doubling up to a byte budget; after that the least recently
+used rows are overwritten. Lookups take a shared lock and only touch the clock
+array; index.json is re-read only when a writer has replaced it. Writers take
+the lock exclusively.
+"""
+import os
+import re
+import sys
+import json
+import hashlib
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+
+import numpy as np
+
+try:
+    import fcntl
+except ImportError:  # Windows: in-process locking only
+    fcntl = None
+
+from extract_cache import CACHE_DIR
+
+EMBED_CACHE_DIR = os.path.join(CACHE_DIR, 'embeddings')
+EMBED_CACHE_MAX_BYTES = int(os.environ.get('MATCHER_EMBED_CACHE_MB', 256)) * 1024 * 1024
+EMBED_CACHE_DTYPE = os.environ.get('MATCHER_EMBED_CACHE_DTYPE', 'float32')
+EMBED_CACHE_ENABLED = os.environ.get('MATCHER_EMBED_CACHE', '1') != '0'
+INITIAL_ROWS = 1024
+INDEX_VERSION = 2
+
+def text_key(text):
+    return hashlib.sha256(text.encode('utf-8')).hexdigest()
+
+class EmbeddingStore:
+    def __init__(self, model_name, dim, cache_dir=EMBED_CACHE_DIR, max_bytes=EMBED_CACHE_MAX_BYTES, dtype=EMBED_CACHE_DTYPE):
+        safe_name = re.sub(r'[^A-Za-z0-9_.-]+', '_', model_name)
+        self.dir = os.path.join(cache_dir, safe_name)
+        self.dim = dim
+        self.dtype = np.dtype(dtype)
+        self.max_rows = max(1, max_bytes // (dim * self.dtype.itemsize))
+        self.matrix_path = os.path.join(self.dir, 'matrix.npy')
+        self.index_path = os.path.join(self.dir, 'index.json')
+        self.clock_path = os.path.join(self.dir, 'clock.npy')
+        self.lock_path = os.path.join(self.dir, '.lock')
+        # flock is per open file, so threads only need their own lock without fcntl
+        self._thread_lock = threading.Lock()
+        # Last index.json read and the (inode, mtime, size) it was read at
+        self._index = None
+        self._index_stamp = None
+        os.makedirs(self.dir, exist_ok=True)
+
+    @contextmanager
+    def _locked(self, shared=False):
+        if not fcntl:
+            with self._thread_lock:
+                yield
+            return
+        with open(self.lock_path, 'a') as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_SH if shared else fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def _empty_index(self):
+        return {"version": INDEX_VERSION, "dim": self.dim, "dtype": self.dtype.name,
+                "capacity": 0, "next_row": 0, "entries": {}}
+
+    def _load_index(self):
+        """index.json, parsed again only when it was replaced since the last read. Callers hold the lock."""
+        try:
+            st = os.stat(self.index_path)
+            stamp = (st.st_ino, st.st_mtime_ns, st.st_size)
+            if stamp == self._index_stamp:
+                return self._index
+            with open(self.index_path, 'r') as f:
+                index = json.load(f)
+            if (index.get('version') == INDEX_VERSION and index.get('dim') == self.dim
+                    and index.get('dtype') == self.dtype.name
+                    and os.path.exists(self.matrix_path) and os.path.exists(self.clock_path)):
+                self._index, self._index_stamp = index, stamp
+                return index
+        except (OSError, ValueError):
+            pass
+        # Missing, corrupt, an older layout or written with another dim/dtype: start over
+        return self._empty_index()
+
+    def _save_index(self, index):
+        fd, tmp_path = tempfile.mkstemp(dir=self.dir, suffix='.tmp')
+        with os.fdopen(fd, 'w') as f:
+            json.dump(index, f)
+        os.replace(tmp_path, self.index_path)
+        st = os.stat(self.index_path)
+        self._index, self._index_stamp = index, (st.st_ino, st.st_mtime_ns, st.st_size)
+
+    def _grow(self, path, capacity, new_capacity, shape, dtype):
+        tmp_path = path + '.grow'
+        grown = np.lib.format.open_memmap(tmp_path, mode='w+', dtype=dtype, shape=(new_capacity,) + shape)
+        if capacity:
+            old = np.load(path, mmap_mode='r')
+            grown[:capacity] = old[:capacity]
+            del old
+        grown.flush()
+        del grown
+        os.replace(tmp_path, path)
+
+    def _open(self, index, min_rows=0, mode='r+'):
+        """Open the matrix and clock memmaps, growing them (by doubling) to hold min_rows if allowed."""
+        capacity = index['capacity']
+        if min_rows > capacity and capacity < self.max_rows:
+            new_capacity = min(self.max_rows, max(INITIAL_ROWS, capacity * 2, min_rows))
+            self._grow(self.matrix_path, capacity, new_capacity, (self.dim,), self.dtype)
+            self._grow(self.clock_path, capacity, new_capacity, (), np.int64)
+            index['capacity'] = new_capacity
+        if not index['capacity']:
+            return None, None
+        return np.load(self.matrix_path, mmap_mode=mode), np.load(self.clock_path, mmap_mode='r+')
+
+    def get_many(self, texts):
+        """Return {text: float32 vector} for every text already in the store."""
+        keys = {text_key(t): t for t in texts}
+        found = {}
+        with self._locked(shared=True):
+            index = self._load_index()
+            entries = index['entries']
+            hits = [(k, entries[k]) for k in keys if k in entries]
+            if not hits:
+                return found
+            matrix, clock = self._open(index, mode='r')
+            rows = np.fromiter((row for _, row in hits), dtype=np.int64, count=len(hits))
+            vectors = np.asarray(matrix[rows], dtype=np.float32)
+            # Concurrent readers may race on a clock value; either timestamp is fine for LRU
+            clock[rows] = time.time_ns()
+            del matrix, clock
+        for (key, _), vector in zip(hits, vectors):
+            found[keys[key]] = vector
+        return found
+
+    def put_many(self, texts, vectors):
+        """Store one vector per text, evicting least recently used rows when full."""
+        if not len(texts):
+            return
+        with self._locked():
+            try:
+                self._put_locked(texts, vectors)
+            except BaseException:
+                # The cached index may be half updated; read the file again next time
+                self._index = self._index_stamp = None
+                raise
+
+    def _put_locked(self, texts, vectors):
+        index = self._load_index()
+        entries = index['entries']
+        new_items = {}
+        for t, v in zip(texts, vectors):
+            key = text_key(t)
+            if key not in entries:
+                new_items[key] = v
+        if not new_items:
+            return
+        # Never try to keep more rows than the budget allows
+        new_items = list(new_items.items())[-self.max_rows:]
+
+        matrix, clock = self._open(index, len(entries) + len(new_items))
+        # Rows are handed out in order and evicted rows are reused at once, so
+        # the free rows are always next_row .. capacity - 1
+        take = min(len(new_items), index['capacity'] - index['next_row'])
+        rows = list(range(index['next_row'], index['next_row'] + take))
+        index['next_row'] += take
+        now = time.time_ns()
+        # Stamp the rows just taken so eviction below can't pick them again
+        clock[rows] = now
+
+        shortfall = len(new_items) - len(rows)
+        if shortfall > 0:
+            # Full: reuse the least recently used rows
+            oldest = np.argpartition(clock[:index['capacity']], shortfall - 1)[:shortfall]
+            evicted = set(int(r) for r in oldest)
+            for key in [k for k, row in entries.items() if row in evicted]:
+                del entries[key]
+            rows.extend(evicted)
+
+        for (key, vector), row in zip(new_items, rows):
+            matrix[row] = vector
+            entries[key] = row
+        clock[rows] = now
+        matrix.flush()
+        clock.flush()
+        del matrix, clock
+        self._save_index(index)
+
+_stores = {}
+_stores_lock = threading.Lock()
+
+def get_store(model_name, dim):
+    """Shared store per model, or None when the cache is disabled or unusable."""
+    if not EMBED_CACHE_ENABLED:
+        return None
+    with _stores_lock:
+        if model_name not in _stores:
+            try:
+                _stores[model_name] = EmbeddingStore(model_name, dim)
+            except OSError as e:
+                sys.stderr.write(f"Warning: Embedding cache disabled: {e}\n")
+                _stores[model_name] = None
+        return _stores[model_name]
@@ -0,0 +1,175 @@
+"""
+Sentence encoder backends.
+
+MATCHER_ENCODER picks how the sentence encoder runs on CPU:
+    torch      - fp32 PyTorch (default)
+    torch-int8 - PyTorch with Linear layers dynamically quantized to int8
+    onnx       - ONNX Runtime, exported once to .cache/encoders/
+    onnx-int8  - ONNX Runtime on a dynamically quantized int8 export
+Every backend returns a SentenceTransformer-compatible object, so callers keep
+using encode(). Quantized backends give slightly different vectors, so the
+embedding store keeps separate entries per backend (see cache_name) and
+parity_report checks their scores against fp32.
+"""
+import os
+import re
+import sys
+import json
+import time
+import shutil
+import tempfile
+
+import numpy as np
+
+from extract_cache import CACHE_DIR
+
+ENCODER_BACKEND = os.environ.get('MATCHER_ENCODER', 'torch')
+# Intra-op threads per forward pass; 0 keeps the library default (all cores).
+# With several server workers, cores / MATCHER_WORKERS avoids oversubscription.
+ENCODER_THREADS = int(os.environ.get('MATCHER_ENCODER_THREADS', 0))
+# Instruction set the int8 ONNX export is tuned for: arm64, avx2, avx512, avx512_vnni
+ONNX_QUANTIZATION = os.environ.get('MATCHER_ONNX_QUANTIZATION', 'avx2')
+ENCODER_DIR = os.path.join(CACHE_DIR, 'encoders')
+# Output size per cache_name, so cache lookups don't have to load the model
+DIMENSIONS_FILE = os.path.join(ENCODER_DIR, 'dimensions.json')
+
+BACKENDS = ('torch', 'torch-int8', 'onnx', 'onnx-int8')
+
+def cache_name(model_name, backend=ENCODER_BACKEND):
+    """Embedding store name: fp32 torch keeps the plain model name."""
+    return model_name if backend == 'torch' else f"{model_name}@{backend}"
+
+def known_dimension(name):
+    """Embedding size recorded for the cache_name `name`, or None."""
+    try:
+        with open(DIMENSIONS_FILE, 'r', encoding='utf-8') as f:
+            return json.load(f).get(name)
+    except (OSError, ValueError):
+        return None
+
+def record_dimension(name, dim):
+    try:
+        with open(DIMENSIONS_FILE, 'r', encoding='utf-8') as f:
+            dims = json.load(f)
+    except (OSError, ValueError):
+        dims = {}
+    if dims.get(name) == dim:
+        return
+    dims[name] = dim
+    try:
+        os.makedirs(ENCODER_DIR, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=ENCODER_DIR, suffix='.tmp')
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            json.dump(dims, f)
+        os.replace(tmp_path, DIMENSIONS_FILE)
+    except OSError as e:
+        sys.stderr.write(f"Warning: Could not record encoder dimension: {e}\n")
+
+def _onnx_dir(model_name):
+    return os.path.join(ENCODER_DIR, re.sub(r'[^A-Za-z0-9_.-]+', '_', model_name) + '-onnx')
+
+def _onnx_file(path, quantized):
+    """Relative path of the export, or None if it hasn't been written yet."""
+    if not quantized:
+        return "onnx/model.onnx" if os.path.exists(os.path.join(path, "onnx", "model.onnx")) else None
+    # Named after the weight dtype too (model_qint8_avx512.onnx, model_quint8_avx2.onnx)
+    suffix = f"_{ONNX_QUANTIZATION}.onnx"
+    names = os.listdir(os.path.join(path, "onnx")) if os.path.isdir(os.path.join(path, "onnx")) else []
+    matches = sorted(n for n in names if n.startswith("model_") and n.endswith(suffix))
+    return f"onnx/{matches[0]}" if matches else None
+
+def export_onnx(model_name, quantized=False):
+    """
+    Export model_name to ONNX under ENCODER_DIR (plus an int8 copy when
+    `quantized`) unless it is already there. Returns the export directory.
+    Needs optimum[onnxruntime].
+    """
+    from sentence_transformers import SentenceTransformer
+    path = _onnx_dir(model_name)
+    if not _onnx_file(path, False):
+        sys.stderr.write(f"Debug: Exporting {model_name} to ONNX in {path}\n")
+        os.makedirs(ENCODER_DIR, exist_ok=True)
+        tmp_path = tempfile.mkdtemp(dir=ENCODER_DIR, suffix='.tmp')
+        try:
+            SentenceTransformer(model_name, device='cpu', backend='onnx').save(tmp_path)
+            # Another process may have finished the same export first
+            shutil.rmtree(path, ignore_errors=True)
+            os.replace(tmp_path, path)
+        finally:
+            shutil.rmtree(tmp_path, ignore_errors=True)
+
+    if quantized and not _onnx_file(path, True):
+        from sentence_transformers import export_dynamic_quantized_onnx_model
+        sys.stderr.write(f"Debug: Quantizing ONNX export for {ONNX_QUANTIZATION}\n")
+        model = SentenceTransformer(path, device='cpu', backend='onnx', model_kwargs={"file_name": "onnx/model.onnx"})
+        export_dynamic_quantized_onnx_model(model, ONNX_QUANTIZATION, path)
+    return path
+
+def load_encoder(model_name, backend=ENCODER_BACKEND, threads=ENCODER_THREADS):
+    """Load model_name on the given backend (see module docstring)."""
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown encoder backend: {backend} (expected one of {', '.join(BACKENDS)})")
+    # Imported here: sentence_transformers pulls in torch, which takes seconds
+    from sentence_transformers import SentenceTransformer
+
+    if backend in ('torch', 'torch-int8'):
+        import torch
+        if threads:
+            torch.set_num_threads(threads)
+        model = SentenceTransformer(model_name, device='cpu' if backend == 'torch-int8' else None)
+        if backend == 'torch-int8':
+            # Weights stored as int8, activations quantized on the fly
+            model = torch.ao.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+        return model
+
+    quantized = backend == 'onnx-int8'
+    path = export_onnx(model_name, quantized)
+    model_kwargs = {"file_name": _onnx_file(path, quantized), "provider": "CPUExecutionProvider"}
+    if threads:
+        import onnxruntime
+        options = onnxruntime.SessionOptions()
+        options.intra_op_num_threads = threads
+        model_kwargs["session_options"] = options
+    return SentenceTransformer(path, device='cpu', backend='onnx', model_kwargs=model_kwargs)
+
+def _timed_encode(model, texts, batch_size):
+    model.encode(texts[:1])  # warm-up, keeps one-off initialisation out of the timing
+    start = time.time()
+    embeddings = model.encode(texts, batch_size=batch_size, convert_to_numpy=True, normalize_embeddings=True)
+    return np.asarray(embeddings, dtype=np.float32), time.time() - start
+
+def parity_report(reference, candidate, pairs, batch_size=32, threshold=None):
+    """
+    Compare a candidate encoder with the fp32 reference on (query, document)
+    pairs. Reports the cosine score drift, how well the candidate preserves
+    the reference ranking and, with `threshold`, how many shortlist decisions
+    flip. Throughput covers encoding the unique texts of `pairs`.
+    """
+    texts = list(dict.fromkeys(t for pair in pairs for t in pair))
+    row = {t: i for i, t in enumerate(texts)}
+    queries = [row[q] for q, _ in pairs]
+    documents = [row[d] for _, d in pairs]
+
+    ref_emb, ref_seconds = _timed_encode(reference, texts, batch_size)
+    cand_emb, cand_seconds = _timed_encode(candidate, texts, batch_size)
+    ref_scores = np.sum(ref_emb[queries] * ref_emb[documents], axis=1)
+    cand_scores = np.sum(cand_emb[queries] * cand_emb[documents], axis=1)
+    drift = np.abs(ref_scores - cand_scores)
+
+    # Spearman correlation: Pearson on ranks (scores are continuous, ties are rare)
+    ref_ranks = np.argsort(np.argsort(ref_scores))
+    cand_ranks = np.argsort(np.argsort(cand_scores))
+    spearman = float(np.corrcoef(ref_ranks, cand_ranks)[0, 1]) if len(pairs) > 1 else 1.0
+
+    report = {
+        "pairs": len(pairs),
+        "max_abs_cosine_diff": float(drift.max()) if len(drift) else 0.0,
+        "mean_abs_cosine_diff": float(drift.mean()) if len(drift) else 0.0,
+        "spearman_rank_correlation": spearman,
+        "reference_texts_per_second": round(len(texts) / max(ref_seconds, 1e-9), 1),
+        "texts_per_second": round(len(texts) / max(cand_seconds, 1e-9), 1),
+        "speedup": round(ref_seconds / max(cand_seconds, 1e-9), 2)
+    }
+    if threshold is not None:
+        report["decision_agreement"] = float(np.mean((ref_scores > threshold) == (cand_scores > threshold)))
+    return report
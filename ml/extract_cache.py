@@ -0,0 +1,131 @@
+"""
+On-disk cache for PDF text extraction, keyed by the SHA-256 of the file content.
+
+The same resume is often uploaded many times under different timestamped names,
+so caching by content (not path) lets re-screens skip PDF parsing entirely.
+Each entry is a small JSON file holding the extracted text, the extractor that
+won and the page count. Entries written by another extractor version are
+treated as misses. The directory is kept under a size budget by evicting the
+least recently used entries (hits refresh the file's mtime). Each process keeps
+a running estimate of the cache size and only walks the directory when the
+estimate crosses the budget, or every EVICT_RESCAN_PUTS writes to pick up what
+other processes wrote.
+"""
+import os
+import sys
+import json
+import hashlib
+import tempfile
+import threading
+import time
+
+CACHE_DIR = os.environ.get('MATCHER_CACHE_DIR', os.path.join(os.path.dirname(os.path.abspath(__file__)), '.cache'))
+EXTRACT_CACHE_DIR = os.path.join(CACHE_DIR, 'extract')
+EXTRACT_CACHE_MAX_BYTES = int(os.environ.get('MATCHER_EXTRACT_CACHE_MB', 256)) * 1024 * 1024
+# Evict down to this fraction of the budget so we don't prune on every write
+EVICT_TARGET_RATIO = 0.9
+EVICT_RESCAN_PUTS = 500
+# Younger .tmp files may be another writer's entry in progress
+TMP_GRACE_SECONDS = 60
+
+# Size of the cache as of the last walk plus what this process wrote since
+_size_lock = threading.Lock()
+_estimated_bytes = None
+_puts_since_walk = 0
+
+def file_hash(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1024 * 1024), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+def _entry_path(content_hash):
+    return os.path.join(EXTRACT_CACHE_DIR, content_hash[:2], f"{content_hash}.json")
+
+def get(content_hash, version):
+    """Return the cached {"text", "method", "pages"} for this content, or None."""
+    path = _entry_path(content_hash)
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            entry = json.load(f)
+    except (OSError, ValueError):
+        return None
+
+    if entry.get('version') != version:
+        return None
+
+    try:
+        os.utime(path)  # mark as recently used
+    except OSError:
+        pass
+    return {"text": entry['text'], "method": entry['method'], "pages": entry['pages']}
+
+def put(content_hash, version, result):
+    path = _entry_path(content_hash)
+    entry = {
+        "version": version,
+        "text": result['text'],
+        "method": result['method'],
+        "pages": result['pages']
+    }
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # Write then rename so concurrent readers never see a partial entry
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            json.dump(entry, f)
+        os.replace(tmp_path, path)
+        size = os.path.getsize(path)
+    except OSError as e:
+        sys.stderr.write(f"Warning: Could not write extraction cache: {e}\n")
+        return
+
+    global _estimated_bytes, _puts_since_walk
+    with _size_lock:
+        _puts_since_walk += 1
+        if _estimated_bytes is not None:
+            _estimated_bytes += size
+        walk = (_estimated_bytes is None or _estimated_bytes > EXTRACT_CACHE_MAX_BYTES
+                or _puts_since_walk >= EVICT_RESCAN_PUTS)
+    if walk:
+        evict()
+
+def evict(max_bytes=EXTRACT_CACHE_MAX_BYTES):
+    """
+    Delete least recently used entries until the cache fits its size budget.
+    Returns the size of the cache afterwards.
+    """
+    global _estimated_bytes, _puts_since_walk
+    entries = []
+    total = 0
+    tmp_cutoff = time.time() - TMP_GRACE_SECONDS
+    for root, _, files in os.walk(EXTRACT_CACHE_DIR):
+        for name in files:
+            path = os.path.join(root, name)
+            try:
+                st = os.stat(path)
+            except OSError:
+                continue
+            total += st.st_size
+            # Counted, but never removed while a writer may still rename it into place
+            if name.endswith('.tmp') and st.st_mtime > tmp_cutoff:
+                continue
+            entries.append((st.st_mtime, st.st_size, path))
+
+    if total > max_bytes:
+        target = max_bytes * EVICT_TARGET_RATIO
+        entries.sort()
+        for _, size, path in entries:
+            if total <= target:
+                break
+            try:
+                os.remove(path)
+                total -= size
+            except OSError:
+                continue
+
+    with _size_lock:
+        _estimated_bytes = total
+        _puts_since_walk = 0
+    return total
@@ -0,0 +1,198 @@
+"""
+Parallel PDF extraction.
+
+Fans utils.extract_pdf out over a process pool so one slow scanned resume
+(pdfplumber -> pypdf -> pymupdf -> OCR) doesn't hold up the rest of the batch.
+Results are yielded as each file finishes. Every file gets its own timeout and
+its own error handling: a file that fails or times out comes back with an
+error instead of breaking the batch.
+"""
+import os
+import sys
+import math
+import time
+import queue
+import signal
+import threading
+import multiprocessing
+
+from utils import extract_pdf, record_extractor_timings
+
+EXTRACT_WORKERS = int(os.environ.get('MATCHER_EXTRACT_WORKERS', min(4, os.cpu_count() or 1)))
+EXTRACT_TIMEOUT = float(os.environ.get('MATCHER_EXTRACT_TIMEOUT', 60))
+# Extra time on top of the per-file budgets before a request gives up on its remaining files
+POOL_GRACE_SECONDS = 5
+
+# Workers are forked, and the per-file timeout relies on SIGALRM, so without
+# fork we extract in-process.
+CAN_FORK = 'fork' in multiprocessing.get_all_start_methods()
+
+
+# Workers live across requests so per-process state (the OCR reader) stays warm
+_pool = None
+_pool_lock = threading.Lock()
+
+
+class _SharedPool:
+    """
+    The process pool plus what concurrent requests need to share it: how
+    many requests are using it, how many tasks are queued or running on it,
+    and whether one of them gave up on a stuck worker.
+    """
+    def __init__(self, workers):
+        self.pool = multiprocessing.get_context('fork').Pool(processes=workers)
+        self.workers = workers
+        self.users = 0
+        self.outstanding = 0
+        self.stuck = False
+
+    def task_done(self):
+        with _pool_lock:
+            self.outstanding -= 1
+
+    def close(self, terminate=False):
+        if terminate:
+            self.pool.terminate()
+        else:
+            self.pool.close()
+        self.pool.join()
+
+
+class ExtractionTimeout(Exception):
+    pass
+
+
+def _raise_timeout(signum, frame):
+    raise ExtractionTimeout()
+
+
+def _extract_one(file_path, timeout):
+    """Worker entry point: extract one file under a SIGALRM timeout."""
+    signal.signal(signal.SIGALRM, _raise_timeout)
+    signal.setitimer(signal.ITIMER_REAL, timeout)
+    try:
+        return file_path, extract_pdf(file_path), None
+    except ExtractionTimeout:
+        return file_path, None, f"timed out after {timeout:g}s"
+    except Exception as e:
+        return file_path, None, f"{e.__class__.__name__}: {e}"
+    finally:
+        signal.setitimer(signal.ITIMER_REAL, 0)
+
+
+def _extract_serial(file_paths):
+    for file_path in file_paths:
+        try:
+            result = extract_pdf(file_path)
+        except Exception as e:
+            yield file_path, None, f"{e.__class__.__name__}: {e}"
+            continue
+        record_extractor_timings(result.get('timings', {}))
+        yield file_path, result, None
+
+
+def _acquire_pool(workers, tasks):
+    """
+    The shared pool with `tasks` more outstanding, and how many tasks were
+    queued or running on it before them. A pool with the wrong size or stuck
+    workers is only replaced once no other request is using it.
+    """
+    global _pool
+    with _pool_lock:
+        replace = _pool is not None and _pool.users == 0 and (_pool.stuck or _pool.workers != workers)
+        old = _pool if replace else None
+        if _pool is None or replace:
+            _pool = _SharedPool(workers)
+        shared = _pool
+        shared.users += 1
+        ahead = shared.outstanding
+        shared.outstanding += tasks
+    if old is not None:
+        old.close(terminate=old.stuck)
+    return shared, ahead
+
+
+def _release_pool(shared, stuck):
+    """Drop a request's use of the pool; a stuck pool is killed once nobody uses it."""
+    global _pool
+    with _pool_lock:
+        shared.users -= 1
+        shared.stuck = shared.stuck or stuck
+        discard = shared.stuck and shared.users == 0
+        if discard and _pool is shared:
+            _pool = None
+    if discard:
+        shared.close(terminate=True)
+
+
+def shutdown():
+    """Stop the worker pool, e.g. before a forked server child exits."""
+    global _pool
+    with _pool_lock:
+        shared, _pool = _pool, None
+    if shared is not None:
+        shared.close(terminate=True)
+
+
+def iter_extracted(file_paths, workers=EXTRACT_WORKERS, timeout=EXTRACT_TIMEOUT, idle=None):
+    """
+    Yield (file_path, result, error) for every path as soon as it is extracted.
+    With `idle` set, also yields None whenever no file finished for `idle`
+    seconds, so streaming callers can flush work they are holding.
+    `result` is utils.extract_pdf's {"text", "method", "pages", "timings"} or
+    None when `error` says why the file failed. Timings are added to
+    utils.EXTRACTOR_STATS.
+    """
+    file_paths = list(file_paths)
+    workers = max(1, min(workers, len(file_paths)))
+    if workers == 1 or not CAN_FORK:
+        yield from _extract_serial(file_paths)
+        return
+
+    done = queue.Queue()
+    shared, ahead = _acquire_pool(workers, len(file_paths))
+
+    def finished(index, item):
+        shared.task_done()
+        done.put((index, item))
+
+    # Tasks are tracked by index, so the same path given twice is extracted twice
+    for index, file_path in enumerate(file_paths):
+        shared.pool.apply_async(
+            _extract_one, (file_path, timeout),
+            callback=lambda item, i=index: finished(i, item),
+            error_callback=lambda e, i=index, p=file_path: finished(i, (p, None, f"{e.__class__.__name__}: {e}"))
+        )
+    pending = set(range(len(file_paths)))
+
+    # Safety net for workers stuck in C code where SIGALRM can't interrupt. Each
+    # task, including those other requests queued ahead of ours, ends within
+    # `timeout` unless a worker is stuck.
+    rounds = math.ceil((ahead + len(file_paths)) / shared.workers)
+    deadline = time.time() + timeout * rounds + POOL_GRACE_SECONDS
+    timed_out = False
+    try:
+        while pending:
+            remaining = deadline - time.time()
+            wait = remaining if idle is None else min(remaining, idle)
+            try:
+                index, (file_path, result, error) = done.get(timeout=max(0.0, wait))
+            except queue.Empty:
+                if idle is not None and time.time() < deadline:
+                    yield None
+                    continue
+                timed_out = True
+                break
+            pending.discard(index)
+            if result:
+                # Workers can't update our counters, so record their timings here
+                record_extractor_timings(result.get('timings', {}))
+            yield file_path, result, error
+    finally:
+        # Only this request's files are abandoned; the pool is recycled once
+        # no other request is using it
+        _release_pool(shared, stuck=timed_out)
+
+    for index in sorted(pending):
+        sys.stderr.write(f"Warning: Extraction abandoned for {file_paths[index]}\n")
+        yield file_paths[index], None, "timed out waiting for extraction pool"
@@ -0,0 +1,102 @@
+"""
+Per-job matcher state, so resumes added to an existing job can be scored
+without redoing the job's other resumes.
+
+A request with a "job_id" leaves behind .cache/jobs/<job_id>/:
+    state.json       - cleaned JD, JD skills, chunking options, encoder name,
+                       the current ranking (full result records) and the
+                       dedup fingerprints of its resumes
+    jd_embedding.npy - the JD's embedding
+    tfidf.npz        - fitted TF-IDF vocabulary and idf (resume_matcher.py)
+Writes are atomic and a per-job lock file serialises appends to the same job.
+"""
+import os
+import re
+import json
+import tempfile
+import threading
+from contextlib import contextmanager
+
+import numpy as np
+
+try:
+    import fcntl
+except ImportError:  # Windows: in-process locking only
+    fcntl = None
+
+from extract_cache import CACHE_DIR
+
+JOB_STATE_DIR = os.path.join(CACHE_DIR, 'jobs')
+# Bump when state.json changes shape so older states are ignored
+JOB_STATE_VERSION = 1
+
+_JOB_ID_RE = re.compile(r'^[A-Za-z0-9_-]{1,128}$')
+_thread_lock = threading.Lock()
+
+def _job_dir(job_id):
+    if not _JOB_ID_RE.match(str(job_id)):
+        raise ValueError(f"Invalid job id: {job_id!r}")
+    return os.path.join(JOB_STATE_DIR, job_id)
+
+def _write_atomic(directory, name, write):
+    fd, tmp_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+    with os.fdopen(fd, 'wb') as f:
+        write(f)
+    os.replace(tmp_path, os.path.join(directory, name))
+
+@contextmanager
+def locked(job_id):
+    """Hold the job's lock, e.g. across load -> score -> save of an append."""
+    directory = _job_dir(job_id)
+    os.makedirs(directory, exist_ok=True)
+    with _thread_lock:
+        with open(os.path.join(directory, '.lock'), 'a') as lock_file:
+            if fcntl:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                if fcntl:
+                    fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+def save(job_id, state, jd_embedding):
+    """Persist a job's state dict and JD embedding."""
+    directory = _job_dir(job_id)
+    os.makedirs(directory, exist_ok=True)
+    state = dict(state, version=JOB_STATE_VERSION)
+    _write_atomic(directory, 'jd_embedding.npy', lambda f: np.save(f, np.asarray(jd_embedding, dtype=np.float32)))
+    _write_atomic(directory, 'state.json', lambda f: f.write(json.dumps(state).encode('utf-8')))
+
+def load(job_id):
+    """(state, jd_embedding) for a saved job, or None."""
+    directory = _job_dir(job_id)
+    try:
+        with open(os.path.join(directory, 'state.json'), 'r', encoding='utf-8') as f:
+            state = json.load(f)
+        jd_embedding = np.load(os.path.join(directory, 'jd_embedding.npy'))
+    except (OSError, ValueError):
+        return None
+    if state.get('version') != JOB_STATE_VERSION:
+        return None
+    return state, jd_embedding
+
+def save_tfidf(job_id, vectorizer):
+    """Persist a fitted TfidfVectorizer's vocabulary and idf weights."""
+    directory = _job_dir(job_id)
+    os.makedirs(directory, exist_ok=True)
+    terms = sorted(vectorizer.vocabulary_, key=vectorizer.vocabulary_.get)
+    _write_atomic(directory, 'tfidf.npz', lambda f: np.savez(
+        f, terms=np.array(terms, dtype=str), idf=vectorizer.idf_.astype(np.float64)
+    ))
+
+def load_tfidf(job_id, **vectorizer_options):
+    """A TfidfVectorizer with the job's saved vocabulary and idf (transform only), or None."""
+    from sklearn.feature_extraction.text import TfidfVectorizer
+    try:
+        with np.load(os.path.join(_job_dir(job_id), 'tfidf.npz')) as saved:
+            terms, idf = saved['terms'], saved['idf']
+    except (OSError, KeyError, ValueError):
+        return None
+    vectorizer = TfidfVectorizer(vocabulary={str(term): i for i, term in enumerate(terms)}, **vectorizer_options)
+    vectorizer.idf_ = idf
+    return vectorizer
@@ -1,154 +1,914 @@
 import sys
 import json
 import os
+import time
+import threading
 import numpy as np
 import warnings
 
 # Suppress warnings
 warnings.filterwarnings("ignore")
 
-try:
-    from sentence_transformers import SentenceTransformer, util
-except ImportError as e:
-    sys.stderr.write(f"ImportError: {str(e)}\n")
-    sys.exit(1)
+from encoder import load_encoder, cache_name, known_dimension, record_dimension, ENCODER_BACKEND
+from utils import clean_text
+from textnorm import NormalizedText
+from extract_pool import iter_extracted, EXTRACT_WORKERS, EXTRACT_TIMEOUT
+from skills import extract_skills, identify_missing_skills, calculate_skill_match_score
+from embedding_store import get_store, text_key
+from talent_pool import get_pool, IVF_NPROBE
+import chunking
+import cascade
+import job_state
+import dedup
+import tracing
 
-from utils import extract_text_from_pdf, clean_text, extract_experience
-from skills import extract_skills, identify_missing_skills, identify_extra_skills, calculate_skill_match_score
+MODEL_NAME = 'all-MiniLM-L6-v2'
+# Texts per forward pass in the embedding phase
+EMBED_BATCH_SIZE = int(os.environ.get('MATCHER_BATCH_SIZE', 32))
+# Longest a scored-ready resume waits for batch-mates when streaming
+STREAM_IDLE_SECONDS = float(os.environ.get('MATCHER_STREAM_IDLE', 0.5))
+# Add scored resumes to the talent pool (opt-in; a request can override with "index_pool")
+POOL_INDEX = os.environ.get('MATCHER_POOL_INDEX', '0') == '1'
+# Also flag resumes already in the talent pool under another file name (a request can override with "dedup_pool")
+DEDUP_POOL = os.environ.get('MATCHER_DEDUP_POOL', '0') != '0'
+# Talent-pool search reranks this many nearest neighbours per requested result
+POOL_RERANK_FACTOR = 4
 
-try:
-    model = SentenceTransformer('all-MiniLM-L6-v2')
-except Exception as e:
-    sys.stderr.write(f"ModelLoadError: {str(e)}\n")
-    sys.exit(1)
+class ModelLoadError(RuntimeError):
+    pass
+
+# Loaded on first use, not at import: requests that never encode anything
+# (empty or invalid input, fully cached resumes and JDs, job appends with no
+# new text) are answered without importing torch.
+_model = None
+_model_lock = threading.Lock()
+_dimension = None
+
+def get_model():
+    """The sentence encoder, loaded once per process. Raises ModelLoadError."""
+    global _model
+    if _model is None:
+        with _model_lock:
+            if _model is None:
+                start = time.perf_counter()
+                try:
+                    model = load_encoder(MODEL_NAME)
+                except Exception as e:
+                    sys.stderr.write(f"ModelLoadError: {str(e)}\n")
+                    raise ModelLoadError(str(e)) from e
+                tracing.set_gauge('model_load_seconds', round(time.perf_counter() - start, 3))
+                record_dimension(cache_name(MODEL_NAME), model.get_sentence_embedding_dimension())
+                _model = model
+    return _model
+
+def embedding_dimension():
+    """Encoder output size, without loading the model once it has been recorded."""
+    global _dimension
+    if _dimension is None:
+        _dimension = known_dimension(cache_name(MODEL_NAME)) or get_model().get_sentence_embedding_dimension()
+    return _dimension
 
 def get_selection_chance(score):
     if score >= 80: return "High"
     if score >= 50: return "Medium"
     return "Low"
 
+def build_candidate(file_path, extraction, error=None):
+    """
+    Extraction phase for one resume: cleaned text, skills and experience from
+    the extracted PDF text. Resumes with too little text (or whose extraction
+    failed) are kept but skipped by the embedding phase.
+    """
+    if error:
+        sys.stderr.write(f"Warning: Extraction failed for {file_path}: {error}\n")
+        tracing.count("extract_errors")
+    if extraction:
+        # "cache" is an extraction cache hit; otherwise one entry per extractor that ran
+        timings = extraction.get('timings', {})
+        tracing.count("extract_cache_hits" if 'cache' in timings else "extract_cache_misses")
+        for name, timing in timings.items():
+            tracing.observe(f"extract_{name}", timing['seconds'], file_path)
+            if name != 'cache':
+                tracing.count(f"extractor_{name}")
+        tracing.annotate(file_path, method=extraction.get('method'), pages=extraction.get('pages'))
+    # Lowercased once and shared by cleaning and the experience patterns
+    text = NormalizedText(extraction['text'] if extraction else "")
+    with tracing.timed('clean_text', file_path):
+        cleaned_text = text.cleaned
+
+    # Handle empty/scanned PDFs
+    if not cleaned_text or len(cleaned_text) < 50:
+        sys.stderr.write(f"Warning: Low text content for {file_path} (len={len(cleaned_text) if cleaned_text else 0})\n")
+        return {
+            "file_path": file_path,
+            "cleaned_text": "",
+            "skills": [],
+            "experience_years": 0
+        }
+
+    with tracing.timed('extract_skills', file_path):
+        skills = extract_skills(cleaned_text)
+    with tracing.timed('extract_experience', file_path):
+        experience_years = text.experience_years
+    return {
+        "file_path": file_path,
+        "cleaned_text": cleaned_text,
+        "skills": skills,
+        "experience_years": experience_years
+    }
+
+def encode_texts(texts, batch_size=EMBED_BATCH_SIZE):
+    """
+    Normalized embeddings for `texts`, one row per text. Texts already in the
+    embedding store are looked up; only the misses go through the model.
+    """
+    unique_texts = list(dict.fromkeys(texts))
+    store = get_store(cache_name(MODEL_NAME), embedding_dimension())
+    cached = store.get_many(unique_texts) if store else {}
+
+    misses = [t for t in unique_texts if t not in cached]
+    sys.stderr.write(f"Debug: Embedding cache hits {len(cached)}/{len(unique_texts)}, encoding {len(misses)} (batch_size={batch_size})\n")
+    tracing.count("embedding_cache_hits", len(cached))
+    tracing.count("embedding_cache_misses", len(misses))
+    if misses:
+        with tracing.timed('encode'):
+            encoded = get_model().encode(
+                misses,
+                batch_size=batch_size,
+                convert_to_numpy=True,
+                normalize_embeddings=True
+            )
+        if store:
+            store.put_many(misses, encoded)
+        cached.update(zip(misses, encoded))
+
+    return np.vstack([cached[t] for t in texts]).astype(np.float32)
+
+def embed_candidates(candidates, batch_size=EMBED_BATCH_SIZE, max_chunks=None):
+    """
+    Split each resume with text into overlapping chunks (at most `max_chunks`)
+    and encode the chunks of all resumes together in batched forward passes.
+    Keeps each resume's document vector on the candidate as "embedding" and
+    returns (chunk embeddings, chunk count per candidate).
+    """
+    chunk_lists = [chunking.chunk_text(c['cleaned_text'], max_chunks=max_chunks) for c in candidates]
+    chunks = [chunk for chunk_list in chunk_lists for chunk in chunk_list]
+    sys.stderr.write(f"Debug: {len(chunks)} chunks for {len(candidates)} resumes\n")
+    embeddings = encode_texts(chunks, batch_size)
+
+    counts = [len(chunk_list) for chunk_list in chunk_lists]
+    offset = 0
+    for candidate, count in zip(candidates, counts):
+        candidate['embedding'] = chunking.document_vector(embeddings[offset:offset + count])
+        offset += count
+    return embeddings, counts
+
+def compute_semantic_scores(jd_embedding, candidates, batch_size=EMBED_BATCH_SIZE, chunk_options=None):
+    """
+    Embedding phase for a batch of resumes with text: embed their chunks
+    (embed_candidates), score every chunk with one matrix product and pool
+    each resume's chunk scores. `chunk_options` may set "max_chunks" (per
+    resume), "pooling" and "top_k". Returns one score (0-100) per candidate,
+    or a (candidates x JDs) matrix when `jd_embedding` holds one row per JD.
+    """
+    chunk_options = chunk_options or {}
+    start = time.perf_counter()
+    embeddings, counts = embed_candidates(candidates, batch_size, chunk_options.get('max_chunks'))
+    # Batched, so each resume is charged its share of the batch by chunk count
+    seconds = time.perf_counter() - start
+    for candidate, count in zip(candidates, counts):
+        tracing.observe('embed', seconds * count / max(1, sum(counts)), candidate['file_path'])
+
+    # Normalized embeddings: cosine similarity is a plain dot product
+    similarities = embeddings @ np.asarray(jd_embedding).T
+
+    scores = []
+    offset = 0
+    for count in counts:
+        scores.append(chunking.pool_similarities(
+            similarities[offset:offset + count],
+            chunk_options.get('pooling', chunking.POOLING),
+            chunk_options.get('top_k', chunking.POOLING_TOP_K)
+        ))
+        offset += count
+    return np.maximum(0, np.array(scores) * 100)
+
+def weighted_score(content_score, skill_score, experience_years):
+    """Final 0-100 score from a content score (semantic, or TF-IDF in the cascade prefilter)."""
+    # Experience Score (Target: 3 years)
+    if experience_years >= 3:
+        exp_score = 100
+    else:
+        exp_score = (experience_years / 3) * 100
+
+    # Final Weighted Score
+    # 50% Semantic (Deep content match)
+    # 30% Hard Skills (Keywords)
+    # 20% Experience
+    final_score = (content_score * 0.5) + (skill_score * 0.3) + (exp_score * 0.2)
+    return round(max(0, min(100, final_score)), 1)
+
+def build_insights(final_score, semantic_score, skill_score, experience_years, candidate_skills, missing_skills):
+    """Improvement plan for one resume: (pros, cons, improvement_tips)."""
+    pros = []
+    cons = []
+    improvement_tips = []
+
+    if final_score > 75:
+        pros.append("Strong overall match with job requirements")
+    if skill_score > 80:
+        pros.append("Excellent technical skill coverage")
+    if experience_years >= 3:
+         pros.append(f"Solid experience level ({experience_years} years)")
+
+    if missing_skills:
+        cons.append(f"Missing critical skills: {', '.join(missing_skills[:3])}")
+        improvement_tips.append(f"Learn and add these skills: {', '.join(missing_skills)}")
+
+    if semantic_score < 50:
+        cons.append("Resume content strongly diverges from Job Description context")
+        improvement_tips.append("Tailor your summary and bullet points to match the language of the JD.")
+
+    if experience_years < 2:
+        improvement_tips.append("Highlight academic projects or internships to compensate for lower experience.")
+
+    if not candidate_skills:
+        improvement_tips.append("Your resume might not be parsing correctly. Avoid complex layouts or graphics.")
+
+    return pros, cons, improvement_tips
+
+def build_result(cleaned_jd, jd_skills, candidate, semantic_score, insights=True):
+    """
+    Scoring phase: weighted score, selection status and (unless `insights` is
+    False) pros, cons and improvement tips for one resume.
+    """
+    with tracing.timed('score', candidate['file_path']):
+        return _build_result(cleaned_jd, jd_skills, candidate, semantic_score, insights)
+
+def _build_result(cleaned_jd, jd_skills, candidate, semantic_score, insights):
+    file_path = candidate['file_path']
+    candidate_skills = candidate['skills']
+    experience_years = candidate['experience_years']
+
+    # Skill Analysis
+    missing_skills, _ = identify_missing_skills(cleaned_jd, candidate_skills, jd_skills)
+    skill_score = calculate_skill_match_score(cleaned_jd, candidate_skills, jd_skills)
+    final_score = weighted_score(semantic_score, skill_score, experience_years)
+
+    selection_chance = get_selection_chance(final_score)
+    status = "Shortlisted" if selection_chance != "Low" else "Rejected"
+
+    # --- Improvement Plan & Insights ---
+    if insights:
+        pros, cons, improvement_tips = build_insights(
+            final_score, semantic_score, skill_score, experience_years, candidate_skills, missing_skills
+        )
+    else:
+        pros, cons, improvement_tips = [], [], []
+
+    return {
+        "fileName": os.path.basename(file_path),
+        "matchPercentage": final_score,
+        "semanticScore": round(semantic_score, 1),
+        "skillScore": round(skill_score, 1),
+        "selectionChance": selection_chance,
+        "status": status,
+        "skills": candidate_skills,
+        "missingSkills": missing_skills,
+        "experienceYears": experience_years,
+        "pros": pros,
+        "cons": cons,
+        "improvementTips": improvement_tips,
+        "downloadLink": f"/uploads/{os.path.basename(file_path)}"
+    }
+
+def build_prefiltered_result(candidate, prefilter_score, skill_score):
+    """
+    Minimal record for a resume the cascade dropped before the semantic stage.
+    The TF-IDF prefilter score isn't on the final scale, so it gets its own
+    field; the resume has no match score and was rejected as a low chance.
+    """
+    file_name = os.path.basename(candidate['file_path'])
+    return {
+        "fileName": file_name,
+        "matchPercentage": 0,
+        "prefilterScore": round(prefilter_score, 1),
+        "semanticScore": None,
+        "skillScore": round(skill_score, 1),
+        "selectionChance": "Low",
+        "status": "Rejected",
+        "skills": candidate['skills'],
+        "missingSkills": [],
+        "experienceYears": candidate['experience_years'],
+        "pros": [],
+        "cons": [],
+        "improvementTips": [],
+        "prefiltered": True,
+        "downloadLink": f"/uploads/{file_name}"
+    }
+
+def build_duplicate_result(representative, file_path, similarity):
+    """Record for a resume collapsed into an earlier copy: the copy's scores under its own file name."""
+    file_name = os.path.basename(file_path)
+    return dict(
+        representative,
+        fileName=file_name,
+        duplicateOf=representative['fileName'],
+        duplicateSimilarity=round(similarity, 3),
+        downloadLink=f"/uploads/{file_name}"
+    )
+
+def collapse_duplicates(scored, stored=None):
+    """
+    Drop duplicate records from (upload_index, result) pairs, listing their
+    file names under "duplicates" on the result they repeat; that can be one
+    of `stored` (file name -> result) for resumes repeating a saved job's.
+    """
+    by_name = dict(stored or {})
+    by_name.update((result['fileName'], result) for _, result in scored if 'duplicateOf' not in result)
+    kept = []
+    for index, result in sorted(scored, key=lambda item: item[0]):
+        if 'duplicateOf' in result:
+            by_name[result['duplicateOf']].setdefault('duplicates', []).append(result['fileName'])
+        else:
+            kept.append((index, result))
+    return kept
+
+def rank_key(index, result):
+    """
+    Sort key for final rankings: semantically scored resumes first, best score
+    first (prefiltered ones by prefilter score), ties in upload order.
+    """
+    return (result.get('prefiltered', False), -result['matchPercentage'], -result.get('prefilterScore', 0), index)
+
+def cascade_results(cleaned_jd, jd_skills, candidates, options, chunk_options=None, batch_size=EMBED_BATCH_SIZE):
+    """
+    Cascade ranking for `candidates` (in upload order) with options
+    {"top_k", "margin"}, yielding (candidate, result):
+      1. prefilter everyone: the final weighting with TF-IDF in place of the
+         semantic score (skills and experience are already extracted)
+      2. embed and rescore only the best top_k + margin
+      3. full results with insights for the final top_k; the margin gets
+         scores without insights, everyone else a prefiltered record.
+    Only the final top_k can be Shortlisted.
+    """
+    skill_scores = [calculate_skill_match_score(cleaned_jd, c['skills'], jd_skills) for c in candidates]
+    with_text = [i for i, c in enumerate(candidates) if c['cleaned_text']]
+    tfidf_scores = cascade.tfidf_similarities(cleaned_jd, [candidates[i]['cleaned_text'] for i in with_text]) * 100
+    content_scores = dict(zip(with_text, map(float, tfidf_scores)))
+    prefilter_scores = [
+        weighted_score(content_scores.get(i, 0.0), skill_scores[i], c['experience_years'])
+        for i, c in enumerate(candidates)
+    ]
+
+    # Resumes without text have nothing to embed and never pass the prefilter
+    ranked = sorted(with_text, key=lambda i: (-prefilter_scores[i], i))
+    rerank = ranked[:options['top_k'] + options['margin']]
+    sys.stderr.write(f"Debug: Cascade reranking {len(rerank)} of {len(candidates)} resumes\n")
+
+    final = []
+    if rerank:
+        jd_embedding = encode_texts([cleaned_jd], batch_size)[0]
+        semantic_scores = compute_semantic_scores(jd_embedding, [candidates[i] for i in rerank], batch_size, chunk_options)
+        for i, semantic_score in zip(rerank, semantic_scores):
+            semantic_score = float(semantic_score)
+            final.append((weighted_score(semantic_score, skill_scores[i], candidates[i]['experience_years']), i, semantic_score))
+        final.sort(key=lambda item: (-item[0], item[1]))
+
+    for position, (_, i, semantic_score) in enumerate(final):
+        shortlisted = position < options['top_k']
+        result = build_result(cleaned_jd, jd_skills, candidates[i], semantic_score, insights=shortlisted)
+        if not shortlisted:
+            result['status'] = "Rejected"
+        yield candidates[i], result
+
+    reranked = set(rerank)
+    for i in sorted(range(len(candidates)), key=lambda i: (-prefilter_scores[i], i)):
+        if i not in reranked:
+            yield candidates[i], build_prefiltered_result(candidates[i], prefilter_scores[i], skill_scores[i])
+
+def _chunk_options(request, embedded_count):
+    """Chunking/pooling settings of a request for `embedded_count` resumes."""
+    # The job's chunk budget is split per resume up front, so a resume's score
+    # doesn't depend on which micro-batch it lands in
+    chunk_options = {
+        "pooling": request.get('pooling') or chunking.POOLING,
+        "top_k": int(request.get('pooling_top_k') or chunking.POOLING_TOP_K),
+        "max_chunks": chunking.chunks_per_resume(
+            embedded_count, int(request.get('max_chunks') or chunking.MAX_CHUNKS_PER_JOB)
+        )
+    }
+    if chunk_options['pooling'] not in chunking.POOLING_METHODS:
+        raise ValueError(f"Unknown pooling method: {chunk_options['pooling']}")
+    return chunk_options
+
+def iter_results(request, idle=None, candidates_out=None, job=None, stored=None):
+    """
+    Score every resume in a matcher request against its job description,
+    yielding (upload_index, result) as each resume is scored.
+    `request` is the stdin payload: {"job_description": ..., "file_paths": [...]},
+    optionally with "batch_size", "pooling" (max/mean/topk), "pooling_top_k" and
+    "max_chunks" (per job) for the embedding phase, "extract_workers" /
+    "extract_timeout" (seconds per file) for the extraction phase and "cascade"
+    (see cascade_results). process_request and stream_request also take a
+    "job_id" to save the job for later appends (see append_candidates).
+
+    Unless "dedup" is false, a resume that repeats an earlier one of the
+    request (see dedup.py) is not embedded: once the earlier copy is scored
+    it is yielded as a duplicate record (build_duplicate_result), which the
+    callers fold into that copy with collapse_duplicates. The fingerprint
+    (dedup.fingerprint) of every new representative is kept in
+    job["fingerprints"] by file name; fingerprints already there are earlier
+    resumes of the job, whose results `stored` maps by file name, so a resume
+    repeating one of those yields a duplicate of the stored result. With "dedup_pool"
+    a resume whose text is already in the talent pool under another file
+    name gets that name as "previousSubmission".
+
+    Resumes are embedded in micro-batches as extraction streams in: a batch is
+    encoded once it reaches batch_size or extraction ends. With `idle` set it is
+    also encoded when it has waited `idle` seconds, so streamed results don't
+    sit behind a slow (e.g. OCR) file. Embedded candidates are appended to
+    `candidates_out` when given (for index_candidates).
+
+    `job` holds the JD state shared by every resume of the job ("cleaned_jd",
+    "jd_skills", "jd_embedding", "chunk_options"). Missing entries are filled
+    in from the request, so passing {} collects them for job_state; a saved
+    job's state is reused as is by append_candidates.
+    """
+    job_description = request.get('job_description', '')
+    file_paths = request.get('file_paths', [])
+    batch_size = int(request.get('batch_size') or EMBED_BATCH_SIZE)
+    extract_workers = int(request.get('extract_workers') or EXTRACT_WORKERS)
+    extract_timeout = float(request.get('extract_timeout') or EXTRACT_TIMEOUT)
+
+    job = {} if job is None else job
+    if not file_paths or not (job_description or 'cleaned_jd' in job):
+        return
+
+    # Prepare JD (skills extracted once per job, not once per resume)
+    if 'cleaned_jd' not in job:
+        job['cleaned_jd'] = clean_text(job_description)
+        job['jd_skills'] = extract_skills(job['cleaned_jd'])
+    cleaned_jd, jd_skills = job['cleaned_jd'], job['jd_skills']
+
+    file_paths = [path for path in file_paths if os.path.exists(path)]
+    order = {path: i for i, path in enumerate(file_paths)}
+    cascade_options = cascade.cascade_options(request.get('cascade'))
+
+    embedded_count = len(file_paths)
+    if cascade_options:
+        embedded_count = min(embedded_count, cascade_options['top_k'] + cascade_options['margin'])
+    if not job.get('chunk_options'):
+        job['chunk_options'] = _chunk_options(request, embedded_count)
+    chunk_options = job['chunk_options']
+
+    duplicate_index = None
+    if request.get('dedup', dedup.DEDUP):
+        duplicate_index = dedup.DuplicateIndex()
+        for file_name, (digest, signature) in job.setdefault('fingerprints', {}).items():
+            duplicate_index.add_fingerprint(file_name, digest, signature)
+    check_pool = request.get('dedup_pool', DEDUP_POOL)
+    # Upload index (or a stored resume's file name) -> its result
+    emitted = dict(stored or {})
+    # Representative upload index -> [(index, file_path, similarity)] not yet yielded
+    waiting = {}
+    previous = {}
+
+    def find_duplicate(candidate):
+        """Upload index of the earlier copy this resume repeats, or None (and it becomes a representative)."""
+        if not candidate['cleaned_text']:
+            return None
+        index = order[candidate['file_path']]
+        match = None
+        if duplicate_index:
+            digest, signature = dedup.fingerprint(candidate['cleaned_text'])
+            match = duplicate_index.add_fingerprint(index, digest, signature)
+            if match is None:
+                job['fingerprints'][os.path.basename(candidate['file_path'])] = [digest, signature.tolist()]
+        if match is None:
+            if check_pool:
+                row = get_talent_pool().get(text_key(candidate['cleaned_text']))
+                if row and row['file_name'] != os.path.basename(candidate['file_path']):
+                    previous[index] = row['file_name']
+            return None
+        earlier = file_paths[match[0]] if isinstance(match[0], int) else match[0]
+        sys.stderr.write(f"Debug: {candidate['file_path']} duplicates {earlier} (similarity {match[1]:.2f})\n")
+        waiting.setdefault(match[0], []).append((index, candidate['file_path'], match[1]))
+        return match[0]
+
+    def release(representative):
+        for index, file_path, similarity in waiting.pop(representative, []):
+            yield index, build_duplicate_result(emitted[representative], file_path, similarity)
+
+    def finish(index, result):
+        """Yield a representative's result, then the duplicates waiting on it."""
+        if index in previous:
+            result['previousSubmission'] = previous[index]
+        emitted[index] = result
+        yield index, result
+        yield from release(index)
+
+    if cascade_options:
+        # Stage one needs the whole pool, so nothing is scored until extraction ends
+        candidates = [
+            build_candidate(*item)
+            for item in iter_extracted(file_paths, extract_workers, extract_timeout)
+        ]
+        candidates.sort(key=lambda c: order[c['file_path']])
+        candidates = [c for c in candidates if find_duplicate(c) is None]
+        # Copies of stored resumes don't wait on this run's scoring
+        for representative in [r for r in waiting if r in emitted]:
+            yield from release(representative)
+        for candidate, result in cascade_results(cleaned_jd, jd_skills, candidates, cascade_options, chunk_options, batch_size):
+            yield from finish(order[candidate['file_path']], result)
+        if candidates_out is not None:
+            candidates_out.extend(c for c in candidates if 'embedding' in c)
+        return
+
+    pending = []
+    pending_since = None
+
+    def score_pending():
+        if job.get('jd_embedding') is None:
+            job['jd_embedding'] = encode_texts([cleaned_jd], batch_size)[0]
+        scores = compute_semantic_scores(job['jd_embedding'], pending, batch_size, chunk_options)
+        scored = []
+        for candidate, semantic_score in zip(pending, scores):
+            semantic_score = float(semantic_score)
+            sys.stderr.write(f"Debug: {candidate['file_path']} Semantic Score: {semantic_score}\n")
+            scored.append((order[candidate['file_path']], build_result(cleaned_jd, jd_skills, candidate, semantic_score)))
+        if candidates_out is not None:
+            candidates_out.extend(pending)
+        pending.clear()
+        for index, result in scored:
+            yield from finish(index, result)
+
+    # 1. Extraction phase (parallel, results arrive as files finish)
+    for item in iter_extracted(file_paths, extract_workers, extract_timeout, idle):
+        if item is not None:
+            path, extraction, error = item
+            candidate = build_candidate(path, extraction, error)
+            representative = find_duplicate(candidate)
+            if representative is not None:
+                if representative in emitted:
+                    yield from release(representative)
+            elif not candidate['cleaned_text']:
+                # Nothing to embed: score it straight away
+                yield from finish(order[path], build_result(cleaned_jd, jd_skills, candidate, 0.0))
+            else:
+                if not pending:
+                    pending_since = time.time()
+                pending.append(candidate)
+
+        # 2./3. Embedding and scoring phases, one micro-batch at a time
+        waited_too_long = idle is not None and pending and time.time() - pending_since >= idle
+        if len(pending) >= batch_size or (pending and (item is None or waited_too_long)):
+            yield from score_pending()
+
+    if pending:
+        yield from score_pending()
+
+def process_multi_request(request):
+    """
+    Score one resume pool against several job descriptions:
+        {"job_descriptions": [jd, ...], "file_paths": [...], ...}
+    Resumes are extracted and embedded once, the JDs are embedded in one
+    batch and the semantic scores come from one (resumes x JDs) similarity
+    matrix; skills are matched against each JD's skill set. Takes the same
+    options as iter_results except "cascade". Returns one ranking per JD:
+        [{"jobIndex": j, "results": [...]}, ...]
+    """
+    job_descriptions = request.get('job_descriptions') or []
+    file_paths = [path for path in request.get('file_paths', []) if os.path.exists(path)]
+    batch_size = int(request.get('batch_size') or EMBED_BATCH_SIZE)
+    extract_workers = int(request.get('extract_workers') or EXTRACT_WORKERS)
+    extract_timeout = float(request.get('extract_timeout') or EXTRACT_TIMEOUT)
+    chunk_options = _chunk_options(request, len(file_paths))
+
+    cleaned_jds = [clean_text(jd) for jd in job_descriptions]
+    jd_skill_sets = [extract_skills(cleaned_jd) for cleaned_jd in cleaned_jds]
+    rankings = [{"jobIndex": j, "results": []} for j in range(len(job_descriptions))]
+    if not job_descriptions or not file_paths:
+        return rankings
+
+    order = {path: i for i, path in enumerate(file_paths)}
+    candidates = sorted(
+        (build_candidate(*item) for item in iter_extracted(file_paths, extract_workers, extract_timeout)),
+        key=lambda c: order[c['file_path']]
+    )
+    with_text = [c for c in candidates if c['cleaned_text']]
+
+    # Repeated resumes are embedded once and listed under "duplicates" of their first copy
+    duplicate_of = {}
+    if request.get('dedup', dedup.DEDUP):
+        duplicate_index = dedup.DuplicateIndex()
+        for candidate in with_text:
+            match = duplicate_index.add(candidate['file_path'], candidate['cleaned_text'])
+            if match:
+                duplicate_of[candidate['file_path']] = match[0]
+    with_text = [c for c in with_text if c['file_path'] not in duplicate_of]
+
+    semantic_scores = {}
+    if with_text:
+        jd_embeddings = encode_texts(cleaned_jds, batch_size)
+        scores = compute_semantic_scores(jd_embeddings, with_text, batch_size, chunk_options)
+        semantic_scores = {c['file_path']: row for c, row in zip(with_text, scores.reshape(len(with_text), -1))}
+
+    for j, (cleaned_jd, jd_skills) in enumerate(zip(cleaned_jds, jd_skill_sets)):
+        scored = []
+        for candidate in candidates:
+            if candidate['file_path'] in duplicate_of:
+                continue
+            row = semantic_scores.get(candidate['file_path'])
+            semantic_score = float(row[j]) if row is not None else 0.0
+            scored.append((order[candidate['file_path']], build_result(cleaned_jd, jd_skills, candidate, semantic_score)))
+        by_path = {file_paths[index]: result for index, result in scored}
+        for file_path, representative in duplicate_of.items():
+            by_path[representative].setdefault('duplicates', []).append(os.path.basename(file_path))
+        scored.sort(key=lambda item: rank_key(*item))
+        rankings[j]["results"] = [result for _, result in scored]
+
+    _index_request(request, with_text)
+    return rankings
+
+def process_request(request):
+    """Score a matcher request and return the ranked list of candidate results."""
+    candidates = []
+    job = {}
+    # Ties keep upload order so rankings are the same run to run
+    scored = collapse_duplicates(list(iter_results(request, candidates_out=candidates, job=job)))
+    scored.sort(key=lambda item: rank_key(*item))
+    results = [result for _, result in scored]
+    _save_job(request, job, results)
+    _index_request(request, candidates)
+    return results
+
+def stream_request(request, emit):
+    """
+    Streaming variant of process_request. Calls `emit` with one record per
+    resume as soon as it is scored, then a summary with the final ranking:
+        {"type": "result", "index": i, "completed": k, "total": n, "result": {...}}
+        {"type": "summary", "total": n, "ranking": [upload indexes, best first],
+         "duplicates": {upload index: [duplicate file names]}, "trace": {...}}
+    `index` is the resume's position among the existing files in the request.
+    Duplicates get result records too, but are left out of the ranking.
+    "trace" (see tracing.py) is only there when the request has "trace": true.
+    """
+    total = sum(1 for path in request.get('file_paths', []) if os.path.exists(path))
+    if not request.get('job_description'):
+        total = 0
+
+    results = {}
+    candidates = []
+    job = {}
+    for index, result in iter_results(request, idle=STREAM_IDLE_SECONDS, candidates_out=candidates, job=job):
+        results[index] = result
+        emit({"type": "result", "index": index, "completed": len(results), "total": total, "result": result})
+
+    scored = sorted(collapse_duplicates(list(results.items())), key=lambda item: rank_key(*item))
+    ranking = [index for index, _ in scored]
+    duplicates = {index: results[index]['duplicates'] for index in ranking if 'duplicates' in results[index]}
+    summary = {"type": "summary", "total": total, "ranking": ranking, "duplicates": duplicates}
+    if request.get('trace') and tracing.current() is not None:
+        summary["trace"] = tracing.current().record()
+    emit(summary)
+    _save_job(request, job, [results[index] for index in ranking])
+    _index_request(request, candidates)
+
+def _save_job(request, job, results):
+    """Keep a request's JD state and ranking under its "job_id" for append_candidates."""
+    job_id = request.get('job_id')
+    if not job_id or 'cleaned_jd' not in job:
+        return
+    # Like indexing, saving must never fail the match it rides on
+    try:
+        jd_embedding = job.get('jd_embedding')
+        if jd_embedding is None:
+            # Cascade runs embed the JD inside cascade_results; this is a store hit
+            jd_embedding = encode_texts([job['cleaned_jd']])[0]
+        state = {
+            "encoder": cache_name(MODEL_NAME),
+            "cleaned_jd": job['cleaned_jd'],
+            "jd_skills": job['jd_skills'],
+            "chunk_options": job.get('chunk_options'),
+            "cascade": cascade.cascade_options(request.get('cascade')),
+            "fingerprints": job.get('fingerprints', {}),
+            "results": results
+        }
+        with job_state.locked(job_id):
+            job_state.save(job_id, state, jd_embedding)
+        sys.stderr.write(f"Debug: Saved state for job {job_id} ({len(results)} resumes)\n")
+    except Exception as e:
+        sys.stderr.write(f"Warning: Saving state for job {job_id} failed: {e}\n")
+
+def append_candidates(request):
+    """
+    Job op: score new resumes {"job_id", "file_paths"} against a job that an
+    earlier match request saved under the same "job_id", and merge them into
+    its ranking. Only the new resumes are extracted and embedded; the cleaned
+    JD, its skills, embedding and chunking options come from the saved state,
+    so their scores are comparable with the stored ones. A new resume that
+    repeats a stored one is listed under that result's "duplicates" instead
+    of being ranked. In a cascade job only the first top_k of the merged
+    ranking stay Shortlisted. Returns {"added": [results, best first],
+    "ranking": [file names, best first], "duplicates": {stored file name:
+    its duplicates, for those that gained any}}.
+    """
+    job_id = request.get('job_id')
+    if not job_id:
+        raise ValueError("append needs a job_id")
+
+    with job_state.locked(job_id):
+        saved = job_state.load(job_id)
+        if saved is None:
+            raise ValueError(f"Unknown job: {job_id}")
+        state, jd_embedding = saved
+        if state['encoder'] != cache_name(MODEL_NAME):
+            # Encoder changed since the job ran: the stored resumes keep their scores
+            sys.stderr.write(f"Warning: Job {job_id} was scored with {state['encoder']}, re-embedding its JD\n")
+            jd_embedding = encode_texts([state['cleaned_jd']])[0]
+            state['encoder'] = cache_name(MODEL_NAME)
+        job = {
+            "cleaned_jd": state['cleaned_jd'],
+            "jd_skills": state['jd_skills'],
+            "jd_embedding": jd_embedding,
+            "chunk_options": state.get('chunk_options'),
+            # States saved before fingerprints were kept only dedup the new resumes
+            "fingerprints": state.get('fingerprints', {})
+        }
+
+        stored = {result['fileName']: result for result in state['results']}
+        known = set(stored).union(*(result.get('duplicates', []) for result in state['results']))
+        new_request = {key: value for key, value in request.items() if key not in ('cascade', 'job_description')}
+        new_request['file_paths'] = [path for path in request.get('file_paths', []) if os.path.basename(path) not in known]
+        candidates = []
+        results = list(iter_results(new_request, candidates_out=candidates, job=job, stored=stored))
+        grown = sorted({result['duplicateOf'] for _, result in results if result.get('duplicateOf') in stored})
+        scored = collapse_duplicates(results, stored)
+        scored.sort(key=lambda item: rank_key(*item))
+        added = [result for _, result in scored]
+
+        # Stored results come first, so ties keep their place ahead of new resumes
+        merged = [result for _, result in sorted(enumerate(state['results'] + added), key=lambda item: rank_key(*item))]
+        top_k = (state.get('cascade') or {}).get('top_k')
+        if top_k:
+            for result in merged[top_k:]:
+                result['status'] = "Rejected"
+
+        state['results'] = merged
+        state['chunk_options'] = job.get('chunk_options')
+        state['fingerprints'] = job['fingerprints']
+        job_state.save(job_id, state, jd_embedding)
+
+    sys.stderr.write(f"Debug: Job {job_id} +{len(added)} resumes ({len(merged)} ranked)\n")
+    _index_request(request, candidates)
+    return {
+        "added": added,
+        "ranking": [result['fileName'] for result in merged],
+        "duplicates": {file_name: stored[file_name]['duplicates'] for file_name in grown}
+    }
+
+def get_talent_pool():
+    return get_pool(cache_name(MODEL_NAME), embedding_dimension())
+
+def index_candidates(candidates, batch_size=EMBED_BATCH_SIZE):
+    """
+    Add resumes with text to the talent pool, keyed by their cleaned text.
+    Candidates scored by this process already carry their document vector;
+    the rest are embedded here. Returns the number of new pool entries.
+    """
+    candidates = [c for c in candidates if c['cleaned_text']]
+    missing = [c for c in candidates if 'embedding' not in c]
+    if missing:
+        embed_candidates(missing, batch_size, chunking.chunks_per_resume(len(missing)))
+    if not candidates:
+        return 0
+    entries = [{
+        "key": text_key(c['cleaned_text']),
+        "file_name": os.path.basename(c['file_path']),
+        "skills": c['skills'],
+        "experience_years": c['experience_years']
+    } for c in candidates]
+    return get_talent_pool().add(entries, [c['embedding'] for c in candidates])
+
+def _index_request(request, candidates):
+    # Indexing must never fail the match it rides on
+    if not request.get('index_pool', POOL_INDEX) or not candidates:
+        return
+    try:
+        added = index_candidates(candidates)
+        sys.stderr.write(f"Debug: Talent pool +{added} resumes\n")
+    except Exception as e:
+        sys.stderr.write(f"Warning: Talent pool indexing failed: {e}\n")
+
+def pool_add(request):
+    """
+    Talent-pool op: extract and index {"file_paths": [...]}.
+    Returns {"added", "indexed", "size"}.
+    """
+    file_paths = [path for path in request.get('file_paths', []) if os.path.exists(path)]
+    batch_size = int(request.get('batch_size') or EMBED_BATCH_SIZE)
+    extract_workers = int(request.get('extract_workers') or EXTRACT_WORKERS)
+    extract_timeout = float(request.get('extract_timeout') or EXTRACT_TIMEOUT)
+
+    added = indexed = 0
+    batch = []
+    for path, extraction, error in iter_extracted(file_paths, extract_workers, extract_timeout):
+        candidate = build_candidate(path, extraction, error)
+        if candidate['cleaned_text']:
+            batch.append(candidate)
+        # Index in slices so a large backfill doesn't hold every vector in memory
+        if len(batch) >= batch_size * 8:
+            added += index_candidates(batch, batch_size)
+            indexed += len(batch)
+            batch = []
+    if batch:
+        added += index_candidates(batch, batch_size)
+        indexed += len(batch)
+    return {"added": added, "indexed": indexed, "size": len(get_talent_pool())}
+
+def pool_search(request):
+    """
+    Talent-pool op: best indexed resumes for {"job_description", "top_k"?, "nprobe"?}.
+    The pool's nearest neighbours by document embedding are reranked with the
+    usual weighted score (semantic, skills, experience).
+    Returns {"results": [...], "poolSize", "seconds"}.
+    """
+    start = time.time()
+    top_k = int(request.get('top_k') or 10)
+    nprobe = int(request.get('nprobe') or IVF_NPROBE)
+    cleaned_jd = clean_text(request.get('job_description', ''))
+    if not cleaned_jd:
+        return {"results": [], "poolSize": 0, "seconds": 0.0}
+    jd_skills = extract_skills(cleaned_jd)
+    jd_embedding = encode_texts([cleaned_jd])[0]
+
+    pool = get_talent_pool()
+    results = []
+    for row, similarity in pool.search(jd_embedding, top_k * POOL_RERANK_FACTOR, nprobe):
+        semantic_score = max(0.0, similarity * 100)
+        skill_score = calculate_skill_match_score(cleaned_jd, row['skills'], jd_skills)
+        missing_skills, _ = identify_missing_skills(cleaned_jd, row['skills'], jd_skills)
+        match_percentage = weighted_score(semantic_score, skill_score, row['experience_years'])
+        results.append({
+            "fileName": row['file_name'],
+            "matchPercentage": match_percentage,
+            "semanticScore": round(semantic_score, 1),
+            "skillScore": round(skill_score, 1),
+            "selectionChance": get_selection_chance(match_percentage),
+            "skills": row['skills'],
+            "missingSkills": missing_skills,
+            "experienceYears": row['experience_years'],
+            "addedAt": row['added_at'],
+            "downloadLink": f"/uploads/{row['file_name']}"
+        })
+    results.sort(key=lambda r: -r['matchPercentage'])
+    return {"results": results[:top_k], "poolSize": len(pool), "seconds": round(time.time() - start, 4)}
+
+# Single-reply ops besides "match", shared with server.py
+OPS = {
+    "append": append_candidates,
+    "pool_add": pool_add,
+    "pool_search": pool_search
+}
+
+def _print_record(record):
+    sys.stdout.write(json.dumps(record) + "\n")
+    sys.stdout.flush()
+
 def main():
+    stream = '--stream' in sys.argv[1:]
     try:
         input_data = sys.stdin.read()
         if not input_data:
             return
 
         request = json.loads(input_data)
-        
-        job_description = request.get('job_description', '')
-        file_paths = request.get('file_paths', [])
-        
-        if not job_description or not file_paths:
-            print(json.dumps([]))
-            return
+        op = request.get('op', 'match')
+        if op != 'match' and op not in OPS:
+            raise ValueError(f"Unknown op: {op}")
+        if op == 'match' and 'job_descriptions' in request:
+            op = 'multi'
+        stream = stream or bool(request.get('stream'))
 
-        # Prepare JD
-        cleaned_jd = clean_text(job_description)
-        jd_embedding = model.encode(cleaned_jd, convert_to_tensor=True)
-        jd_skills_all = extract_skills(cleaned_jd)
-        
-        results = []
-        
-        for file_path in file_paths:
-            if not os.path.exists(file_path):
-                continue
-                
-            raw_text = extract_text_from_pdf(file_path)
-            cleaned_text = clean_text(raw_text)
-            
-            # Handle empty/scanned PDFs
-            # Handle empty/scanned PDFs
-            if not cleaned_text or len(cleaned_text) < 50:
-                sys.stderr.write(f"Warning: Low text content for {file_path} (len={len(cleaned_text) if cleaned_text else 0})\n")
-                cleaned_text = ""
-                candidate_skills = []
-                experience_years = 0
-                semantic_score = 0
-            else:
-                sys.stderr.write(f"Debug: Analyzing {file_path} against Job Description (len={len(cleaned_jd)}). Text len: {len(cleaned_text)}\n")
-                
-                # 1. Semantic Score
-                resume_embedding = model.encode(cleaned_text, convert_to_tensor=True)
-                similarity = util.cos_sim(jd_embedding, resume_embedding).item()
-                semantic_score = float(max(0, similarity * 100))
-                
-                sys.stderr.write(f"Debug: Match Semantic Score: {semantic_score}\n")
-
-                candidate_skills = extract_skills(cleaned_text)
-                experience_years = extract_experience(raw_text)
-            
-            # Skill Analysis
-            missing_skills, _ = identify_missing_skills(cleaned_jd, candidate_skills)
-            extra_skills = identify_extra_skills(cleaned_jd, candidate_skills)
-            skill_score = calculate_skill_match_score(cleaned_jd, candidate_skills)
-            
-            # Experience Score (Target: 3 years)
-            if experience_years >= 3:
-                exp_score = 100
+        with tracing.request_trace(request, op):
+            if op in OPS:
+                _print_record(OPS[op](request))
+            elif op == 'multi':
+                # Multi-JD requests always get one JSON document back
+                _print_record(process_multi_request(request))
+            elif stream:
+                stream_request(request, _print_record)
             else:
-                exp_score = (experience_years / 3) * 100
-                
-            # Final Weighted Score
-            # 50% Semantic (Deep content match)
-            # 30% Hard Skills (Keywords)
-            # 20% Experience
-            final_score = (semantic_score * 0.5) + (skill_score * 0.3) + (exp_score * 0.2)
-            final_score = round(max(0, min(100, final_score)), 1)
-            
-            selection_chance = get_selection_chance(final_score)
-            status = "Shortlisted" if selection_chance != "Low" else "Rejected"
-            
-            # --- Improvement Plan & Insights ---
-            pros = []
-            cons = []
-            improvement_tips = []
-            
-            # --- Improvement Plan & Insights ---
-            pros = []
-            cons = []
-            improvement_tips = []
-            
-            if final_score > 75:
-                pros.append("Strong overall match with job requirements")
-            if skill_score > 80:
-                pros.append("Excellent technical skill coverage")
-            if experience_years >= 3:
-                 pros.append(f"Solid experience level ({experience_years} years)")
-            
-            if missing_skills:
-                cons.append(f"Missing critical skills: {', '.join(missing_skills[:3])}")
-                improvement_tips.append(f"Learn and add these skills: {', '.join(missing_skills)}")
-            
-            if semantic_score < 50:
-                cons.append("Resume content strongly diverges from Job Description context")
-                improvement_tips.append("Tailor your summary and bullet points to match the language of the JD.")
-                
-            if experience_years < 2:
-                improvement_tips.append("Highlight academic projects or internships to compensate for lower experience.")
-            
-            if not candidate_skills:
-                improvement_tips.append("Your resume might not be parsing correctly. Avoid complex layouts or graphics.")
-
-            results.append({
-                "fileName": os.path.basename(file_path),
-                "matchPercentage": final_score,
-                "semanticScore": round(semantic_score, 1),
-                "skillScore": round(skill_score, 1),
-                "selectionChance": selection_chance,
-                "status": status,
-                "skills": candidate_skills,
-                "missingSkills": missing_skills,
-                "experienceYears": experience_years,
-                "pros": pros,
-                "cons": cons,
-                "improvementTips": improvement_tips,
-                "downloadLink": f"/uploads/{os.path.basename(file_path)}"
-            })
-            
-        results.sort(key=lambda x: x['matchPercentage'], reverse=True)
-        print(json.dumps(results))
-
-    except Exception:
+                print(json.dumps(process_request(request)))
+
+    except Exception as e:
+        if stream:
+            _print_record({"type": "error", "error": str(e)})
+            return
+        if isinstance(e, ModelLoadError):
+            # The backend reports the exit status and stderr
+            sys.exit(1)
         # Return empty list on critical failure to prevent backend crash
         print(json.dumps([]))
 
@@ -0,0 +1,78 @@
+"""
+OCR for pages without a text layer (EasyOCR).
+
+The EasyOCR reader loads its detection and recognition models when it is
+created, so it is built once per process on first use and shared. Pages are
+rendered one after another (PyMuPDF documents are not thread-safe) and each
+rendered page is recognised on a small thread pool while the next one renders.
+The render zoom follows the page size, and only the first OCR_MAX_PAGES
+scanned pages of a resume are OCR'd.
+"""
+import os
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+OCR_WORKERS = int(os.environ.get('MATCHER_OCR_WORKERS', 2))
+OCR_MAX_PAGES = int(os.environ.get('MATCHER_OCR_MAX_PAGES', 4))
+# Longest side of the rendered page in pixels (~A4 at 190 DPI)
+OCR_TARGET_PIXELS = int(os.environ.get('MATCHER_OCR_TARGET_PIXELS', 2200))
+OCR_MIN_ZOOM = 1.5
+OCR_MAX_ZOOM = 3.0
+
+_reader = None
+_reader_lock = threading.Lock()
+
+def get_reader():
+    """Shared EasyOCR reader, created on first use. Raises ImportError without easyocr."""
+    global _reader
+    if _reader is None:
+        with _reader_lock:
+            if _reader is None:
+                import easyocr
+                sys.stderr.write("Debug: Loading EasyOCR models...\n")
+                _reader = easyocr.Reader(['en'], gpu=False, verbose=False)
+    return _reader
+
+def page_zoom(page):
+    """Render zoom that puts the page's longest side near OCR_TARGET_PIXELS."""
+    longest = max(page.rect.width, page.rect.height) or 1
+    return max(OCR_MIN_ZOOM, min(OCR_MAX_ZOOM, OCR_TARGET_PIXELS / longest))
+
+def render_page(page):
+    import numpy as np
+    from utils import load_fitz
+    fitz = load_fitz()
+    zoom = page_zoom(page)
+    # Always RGB without alpha, which is what easyocr expects
+    pix = page.get_pixmap(matrix=fitz.Matrix(zoom, zoom), colorspace=fitz.csRGB, alpha=False)
+    return np.frombuffer(pix.samples, dtype=np.uint8).reshape((pix.h, pix.w, pix.n))
+
+def _recognise(reader, index, img):
+    result = reader.readtext(img, detail=0)
+    page_content = " ".join(result)
+    sys.stderr.write(f"Debug: Page {index+1} OCR found {len(page_content)} chars\n")
+    return page_content
+
+def ocr_pages(doc, page_indices, max_pages=OCR_MAX_PAGES, workers=OCR_WORKERS):
+    """
+    OCR the given pages of an open pymupdf document.
+    Returns {page_index: text}; pages beyond `max_pages` are skipped.
+    """
+    reader = get_reader()
+    if len(page_indices) > max_pages:
+        sys.stderr.write(f"Debug: OCR capped at {max_pages} of {len(page_indices)} scanned pages\n")
+        page_indices = page_indices[:max_pages]
+
+    # Not a with-block: its exit waits for every submitted page, so the
+    # per-file timeout (an exception raised in this thread) would have to
+    # wait for the whole document. Queued pages are cancelled instead.
+    executor = ThreadPoolExecutor(max_workers=max(1, workers))
+    try:
+        futures = {}
+        for i in page_indices:
+            sys.stderr.write(f"Debug: OCR Scanning page {i+1}...\n")
+            futures[i] = executor.submit(_recognise, reader, i, render_page(doc[i]))
+        return {i: future.result() for i, future in futures.items()}
+    finally:
+        executor.shutdown(wait=False, cancel_futures=True)
@@ -5,8 +5,11 @@ import numpy as np
 from sklearn.feature_extraction.text import TfidfVectorizer
 from sklearn.metrics.pairwise import cosine_similarity
 
-from utils import extract_text_from_pdf, clean_text, extract_experience
+from utils import extract_text_from_pdf, clean_text
+from textnorm import NormalizedText
 from skills import extract_skills, identify_missing_skills, identify_extra_skills, calculate_skill_match_score
+import job_state
+import tfidf_model
 
 def main():
     try:
@@ -26,6 +29,7 @@ def main():
 
         # Prepare corpus: [Job Description, Resume 1, Resume 2, ...]
         cleaned_jd = clean_text(job_description)
+        jd_skills = extract_skills(cleaned_jd)
         corpus = [cleaned_jd]
         
         resumes_data = []
@@ -35,8 +39,8 @@ def main():
             if not os.path.exists(file_path):
                 continue
                 
-            raw_text = extract_text_from_pdf(file_path)
-            cleaned_text = clean_text(raw_text)
+            text = NormalizedText(extract_text_from_pdf(file_path))
+            cleaned_text = text.cleaned
             
             # DEMO MODE / FALLBACK
             # If text is empty (scanned PDF), generate mock data so user sees results
@@ -50,9 +54,9 @@ def main():
             else:
                 is_demo = False
                 candidate_skills = extract_skills(cleaned_text)
-                missing_skills, jd_target_skills = identify_missing_skills(cleaned_jd, candidate_skills)
-                extra_skills = identify_extra_skills(cleaned_jd, candidate_skills)
-                experience_years = extract_experience(raw_text)  # Use raw text for better pattern matching
+                missing_skills, jd_target_skills = identify_missing_skills(cleaned_jd, candidate_skills, jd_skills)
+                extra_skills = identify_extra_skills(cleaned_jd, candidate_skills, jd_skills)
+                experience_years = text.experience_years  # Matched on the raw text for better pattern matching
             
             resumes_data.append({
                 "file_path": file_path,
@@ -67,8 +71,24 @@ def main():
             corpus.append(cleaned_text)
 
         # Calculate TF-IDF
-        vectorizer = TfidfVectorizer(stop_words='english')
-        tfidf_matrix = vectorizer.fit_transform(corpus)
+        # The stable model (tfidf_model.py) only transforms, so a resume's score
+        # doesn't depend on the rest of its upload. Until one is fitted, a
+        # "job_id" keeps this request's fitted vocabulary and an "append"
+        # request for that job scores its new resumes on the same scale
+        model = tfidf_model.get_model()
+        job_id = request.get('job_id')
+        if model is not None:
+            tfidf_matrix = model.transform(corpus)
+        elif job_id and request.get('append'):
+            vectorizer = job_state.load_tfidf(job_id, stop_words='english')
+            if vectorizer is None:
+                raise ValueError(f"No saved TF-IDF vocabulary for job {job_id}")
+            tfidf_matrix = vectorizer.transform(corpus)
+        else:
+            vectorizer = TfidfVectorizer(stop_words='english')
+            tfidf_matrix = vectorizer.fit_transform(corpus)
+            if job_id:
+                job_state.save_tfidf(job_id, vectorizer)
         
         # Calculate Cosine Similarity
         # tfidf_matrix[0] is the JD
@@ -96,7 +116,7 @@ def main():
             # 10% Experience
             
             content_score = similarity * 100  # 0-100
-            skill_score = calculate_skill_match_score(cleaned_jd, resume_info['skills'])  # 0-100
+            skill_score = calculate_skill_match_score(cleaned_jd, resume_info['skills'], jd_skills)  # 0-100
             
             # Experience scoring: assume JD requires 3-5 years (can be parameterized later)
             # For now, give full points if >= 3 years, partial if less
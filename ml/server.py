@@ -0,0 +1,294 @@
+"""
+Long-lived matcher server.
+
+Loads the sentence encoder once and keeps it warm, so a shortlisting call only
+pays for scoring instead of interpreter start-up, torch import and model load.
+
+Protocol: every message, in both directions, is a 4-byte big-endian length
+followed by that many bytes of UTF-8 JSON. A request body is the same payload
+matcher.py reads from stdin ({"job_description": ..., "file_paths": [...]})
+and the reply is the JSON array matcher.py would print (for "job_descriptions",
+one ranking per JD, see matcher.process_multi_request). With "stream": true
+the reply is instead one message per record of matcher.stream_request
+(per-resume results, then a summary). Other messages:
+    {"op": "health"}      -> {"status": "ok", "ready": bool, ...}
+    {"op": "ready"}       -> {"ready": bool}
+    {"op": "pool_add", "file_paths": [...]}          -> {"added", "indexed", "size"}
+    {"op": "pool_search", "job_description": ...}    -> {"results": [...], "poolSize", "seconds"}
+    {"op": "append", "job_id": ..., "file_paths": [...]} -> {"added": [...], "ranking": [...]}
+    {"op": "metrics"}     -> per-stage timings, cache counters and gauges (tracing.metrics)
+With --metrics-port the same metrics are also served over HTTP at /metrics in
+the Prometheus text format.
+
+With --fork the model is loaded before listening and every connection is
+served by a forked child (at most --workers at a time) that shares the loaded
+weights copy-on-write. Children run in parallel without the GIL and give
+their memory back when they exit. Their metrics stay in the child, so use
+MATCHER_TRACE_FILE for per-request timings. ONNX Runtime sessions own threads
+that don't survive fork, so with an onnx encoder each child loads its own.
+
+Usage:
+    python server.py                     # TCP on 127.0.0.1:5001
+    python server.py --socket /tmp/m.sock --workers 4 --metrics-port 9101
+    python server.py --fork --workers 4
+"""
+import os
+import sys
+import json
+import time
+import struct
+import socket
+import argparse
+import threading
+import socketserver
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import tracing
+import extract_pool
+
+HEADER = struct.Struct('>I')
+MAX_MESSAGE_BYTES = 64 * 1024 * 1024
+
+DEFAULT_HOST = os.environ.get('MATCHER_HOST', '127.0.0.1')
+DEFAULT_PORT = int(os.environ.get('MATCHER_PORT', 5001))
+DEFAULT_SOCKET = os.environ.get('MATCHER_SOCKET', '')
+DEFAULT_WORKERS = int(os.environ.get('MATCHER_WORKERS', 2))
+DEFAULT_METRICS_PORT = int(os.environ.get('MATCHER_METRICS_PORT', 0))
+
+# Populated by the loader once matcher.py is imported and the model loaded
+_matcher = None
+_ready = threading.Event()
+_load_error = None
+_started_at = time.time()
+_loaded_in = None
+_workers = None
+
+
+def _load_matcher(fork=False):
+    global _matcher, _load_error, _loaded_in
+    start = time.time()
+    try:
+        import matcher
+        # matcher.py loads the model lazily; the server wants it warm
+        if not (fork and matcher.ENCODER_BACKEND.startswith('onnx')):
+            matcher.get_model()
+        _matcher = matcher
+        _loaded_in = round(time.time() - start, 3)
+        sys.stderr.write(f"Debug: Matcher ready in {_loaded_in}s\n")
+    except BaseException as e:
+        # matcher.ModelLoadError, or an ImportError for a missing dependency
+        _load_error = str(e) or e.__class__.__name__
+        sys.stderr.write(f"ModelLoadError: {_load_error}\n")
+    finally:
+        _ready.set()
+
+
+def recv_exact(sock, size):
+    buf = bytearray()
+    while len(buf) < size:
+        chunk = sock.recv(size - len(buf))
+        if not chunk:
+            return None
+        buf.extend(chunk)
+    return bytes(buf)
+
+
+def recv_message(sock):
+    header = recv_exact(sock, HEADER.size)
+    if header is None:
+        return None
+    (length,) = HEADER.unpack(header)
+    if length > MAX_MESSAGE_BYTES:
+        raise ValueError(f"Message too large ({length} bytes)")
+    body = recv_exact(sock, length)
+    if body is None:
+        return None
+    return json.loads(body.decode('utf-8'))
+
+
+def send_message(sock, payload):
+    body = json.dumps(payload).encode('utf-8')
+    sock.sendall(HEADER.pack(len(body)) + body)
+
+
+def health():
+    return {
+        "status": "ok" if _load_error is None else "error",
+        "ready": _matcher is not None,
+        "error": _load_error,
+        "model": getattr(_matcher, 'MODEL_NAME', None),
+        "encoder": getattr(_matcher, 'ENCODER_BACKEND', None),
+        "modelLoadSeconds": _loaded_in,
+        "uptimeSeconds": round(time.time() - _started_at, 1),
+        "pid": os.getpid()
+    }
+
+
+def handle_request(request, send):
+    """Answer one request, calling `send` once per reply message."""
+    op = request.get('op', 'match')
+    if op == 'health':
+        return send(health())
+    if op == 'ready':
+        return send({"ready": _matcher is not None})
+    if op == 'metrics':
+        return send(dict(tracing.metrics(), uptimeSeconds=round(time.time() - _started_at, 1)))
+
+    _ready.wait()
+    if _matcher is None:
+        return send({"error": f"Matcher failed to load: {_load_error}"})
+    if op != 'match' and op not in _matcher.OPS:
+        return send({"error": f"Unknown op: {op}"})
+
+    if op == 'match' and 'job_descriptions' in request:
+        op = 'multi'
+
+    # Bound concurrent scoring to the configured worker count
+    queued_at = time.perf_counter()
+    with _workers:
+        tracing.observe('queue_wait', time.perf_counter() - queued_at)
+        with tracing.request_trace(request, op):
+            if op in _matcher.OPS:
+                send(_matcher.OPS[op](request))
+            elif op == 'multi':
+                send(_matcher.process_multi_request(request))
+            elif request.get('stream'):
+                _matcher.stream_request(request, send)
+            else:
+                send(_matcher.process_request(request))
+
+
+class MatcherHandler(socketserver.BaseRequestHandler):
+    def handle(self):
+        # A connection may carry several requests; it ends when the client closes
+        while True:
+            try:
+                request = recv_message(self.request)
+            except (ValueError, OSError) as e:
+                sys.stderr.write(f"Warning: Bad request: {e}\n")
+                return
+            if request is None:
+                return
+
+            try:
+                handle_request(request, lambda payload: send_message(self.request, payload))
+            except OSError:
+                return
+            except Exception as e:
+                sys.stderr.write(f"Error: Request failed: {e}\n")
+                try:
+                    send_message(self.request, {"error": str(e)})
+                except OSError:
+                    return
+
+
+class ThreadingTCPMatcherServer(socketserver.ThreadingMixIn, socketserver.TCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+
+if hasattr(socketserver, 'UnixStreamServer'):
+    class ThreadingUnixMatcherServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+        daemon_threads = True
+
+
+if hasattr(socketserver, 'ForkingMixIn'):
+    class ForkingMatcherMixIn(socketserver.ForkingMixIn):
+        def finish_request(self, request, client_address):
+            try:
+                super().finish_request(request, client_address)
+            finally:
+                # The child leaves with os._exit, which skips the pool's own cleanup
+                extract_pool.shutdown()
+
+    class ForkingTCPMatcherServer(ForkingMatcherMixIn, socketserver.TCPServer):
+        allow_reuse_address = True
+
+    class ForkingUnixMatcherServer(ForkingMatcherMixIn, socketserver.UnixStreamServer):
+        pass
+
+
+class MetricsHandler(BaseHTTPRequestHandler):
+    """GET /metrics in the Prometheus text format."""
+    def do_GET(self):
+        if self.path.split('?')[0] != '/metrics':
+            self.send_error(404)
+            return
+        tracing.set_gauge('uptime_seconds', round(time.time() - _started_at, 1))
+        tracing.set_gauge('ready', int(_matcher is not None))
+        body = tracing.prometheus_text().encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/plain; version=0.0.4')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def serve_metrics(host, port):
+    metrics_server = ThreadingHTTPServer((host, port), MetricsHandler)
+    metrics_server.daemon_threads = True
+    threading.Thread(target=metrics_server.serve_forever, daemon=True).start()
+    sys.stderr.write(f"Metrics on http://{host}:{port}/metrics\n")
+    return metrics_server
+
+
+def create_server(host=DEFAULT_HOST, port=DEFAULT_PORT, socket_path=DEFAULT_SOCKET, fork=False):
+    if fork and not hasattr(os, 'fork'):
+        raise RuntimeError("--fork is not supported on this platform")
+    if socket_path:
+        if not hasattr(socket, 'AF_UNIX'):
+            raise RuntimeError("Unix sockets are not supported on this platform, use --port")
+        if os.path.exists(socket_path):
+            os.unlink(socket_path)
+        server_class = ForkingUnixMatcherServer if fork else ThreadingUnixMatcherServer
+        return server_class(socket_path, MatcherHandler)
+    server_class = ForkingTCPMatcherServer if fork else ThreadingTCPMatcherServer
+    return server_class((host, port), MatcherHandler)
+
+
+def serve(host=DEFAULT_HOST, port=DEFAULT_PORT, socket_path=DEFAULT_SOCKET, workers=DEFAULT_WORKERS,
+          metrics_port=DEFAULT_METRICS_PORT, fork=False):
+    global _workers
+    _workers = threading.BoundedSemaphore(max(1, workers))
+
+    server = create_server(host, port, socket_path, fork)
+    if metrics_port:
+        serve_metrics(host, metrics_port)
+    address = socket_path or f"{host}:{port}"
+
+    if fork:
+        # Children must be forked from a process that already holds the model
+        server.max_children = max(1, workers)
+        _load_matcher(fork=True)
+        sys.stderr.write(f"Matcher server listening on {address}, forking up to {workers} worker(s)\n")
+    else:
+        sys.stderr.write(f"Matcher server listening on {address} with {workers} worker(s)\n")
+        # Listen straight away so health checks answer while the model loads
+        threading.Thread(target=_load_matcher, daemon=True).start()
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        if socket_path and os.path.exists(socket_path):
+            os.unlink(socket_path)
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Warm resume matcher server")
+    parser.add_argument('--host', default=DEFAULT_HOST)
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT)
+    parser.add_argument('--socket', default=DEFAULT_SOCKET, help="Unix socket path (overrides --host/--port)")
+    parser.add_argument('--workers', type=int, default=DEFAULT_WORKERS, help="Max requests scored concurrently")
+    parser.add_argument('--metrics-port', type=int, default=DEFAULT_METRICS_PORT, help="Serve Prometheus metrics over HTTP on this port")
+    parser.add_argument('--fork', action='store_true', help="Preload the model and fork a child per connection")
+    return parser.parse_args(argv)
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    serve(args.host, args.port, args.socket, args.workers, args.metrics_port, args.fork)
@@ -1,95 +1,200 @@
+import os
 import re
+import csv
+import sys
+import json
+import pickle
+import hashlib
+import tempfile
 
-# Canonical Skill List
-SKILL_DB = [
-    'python', 'java', 'c++', 'c#', 'javascript', 'typescript', 'html', 'css', 
-    'react', 'angular', 'vue', 'node.js', 'express', 'django', 'flask', 
-    'spring', 'sql', 'mysql', 'postgresql', 'mongodb', 'aws', 'azure', 'gcp', 
-    'docker', 'kubernetes', 'git', 'linux', 'machine learning', 'deep learning',
-    'tensorflow', 'pytorch', 'scikit-learn', 'pandas', 'numpy', 'nlp', 'computer vision',
-    'agile', 'scrum', 'jira', 'rest api', 'graphql', 'devops', 'ci/cd',
-    'tableau', 'power bi', 'excel', 'spark', 'hadoop'
-]
+from extract_cache import CACHE_DIR
+
+# Versioned skill vocabulary: canonical skills, aliases and categories.
+# Point SKILL_TAXONOMY_PATH at a larger JSON/CSV file to swap it out.
+TAXONOMY_PATH = os.environ.get(
+    'SKILL_TAXONOMY_PATH',
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), 'dataset', 'skills_taxonomy.json')
+)
+SKILL_INDEX_CACHE_DIR = os.path.join(CACHE_DIR, 'skills')
+# Bump when the index layout below changes so cached indexes are rebuilt
+SKILL_INDEX_FORMAT = "1"
+
+_WORD_RE = re.compile(r'\w+')
+
+def _parse_taxonomy(raw, path):
+    """
+    Read a taxonomy file into {"version", "skills": [{name, category, aliases, match_name}]}.
+    JSON: {"version": ..., "skills": [{"name", "category", "aliases": [...], "match_name"?}]}
+    CSV:  name,category,aliases[,match_name] with aliases separated by ';'
+    """
+    if path.lower().endswith('.csv'):
+        rows = csv.DictReader(raw.decode('utf-8').splitlines())
+        skills = [{
+            "name": row['name'],
+            "category": row.get('category') or '',
+            "aliases": [a for a in (row.get('aliases') or '').split(';') if a],
+            "match_name": (row.get('match_name') or 'true').lower() != 'false'
+        } for row in rows]
+        return {"version": os.path.basename(path), "skills": skills}
+
+    taxonomy = json.loads(raw.decode('utf-8'))
+    return {"version": taxonomy.get('version', ''), "skills": taxonomy['skills']}
+
+def build_skill_index(taxonomy):
+    """
+    Compile a taxonomy into a lookup index (plain dicts/lists so it pickles):
+      by_first_word - first word of each surface form -> [(form, canonical)], longest first
+      loose_pattern - regex for forms that begin/end with a symbol (c++, c#, .net),
+                      matched as substrings since \b doesn't work around them
+    Matching is then one dictionary lookup per word of the text.
+    """
+    skill_names = []
+    aliases = {}
+    categories = {}
+    forms = {}
+    for entry in taxonomy['skills']:
+        name = entry['name'].lower().strip()
+        if name in categories:
+            continue
+        skill_names.append(name)
+        categories[name] = entry.get('category', '')
+        if entry.get('match_name', True):
+            forms.setdefault(name, name)
+        for alias in entry.get('aliases', []):
+            alias = alias.lower().strip()
+            aliases.setdefault(alias, name)
+            forms.setdefault(alias, name)
+
+    by_first_word = {}
+    loose = []
+    for form, canonical in forms.items():
+        first = _WORD_RE.match(form)
+        if not first or not _is_word_char(form[-1]):
+            loose.append(form)
+            continue
+        by_first_word.setdefault(first.group(), []).append((form, canonical))
+    for entries in by_first_word.values():
+        entries.sort(key=lambda e: len(e[0]), reverse=True)
+
+    loose.sort(key=len, reverse=True)
+    return {
+        "format": SKILL_INDEX_FORMAT,
+        "version": taxonomy['version'],
+        "skills": skill_names,
+        "aliases": aliases,
+        "categories": categories,
+        "forms": forms,
+        "by_first_word": by_first_word,
+        "loose_pattern": '(?=(' + '|'.join(re.escape(f) for f in loose) + '))' if loose else None
+    }
+
+def load_skill_index(path=TAXONOMY_PATH):
+    """
+    Load the compiled index for a taxonomy file, building it on first use.
+    Compiled indexes are pickled under the cache dir, keyed by the file's hash,
+    so later starts skip parsing and compiling.
+    """
+    with open(path, 'rb') as f:
+        raw = f.read()
+    digest = hashlib.sha256(raw + SKILL_INDEX_FORMAT.encode()).hexdigest()
+    cache_path = os.path.join(SKILL_INDEX_CACHE_DIR, f"{digest}.pkl")
+
+    try:
+        with open(cache_path, 'rb') as f:
+            return pickle.load(f)
+    except (OSError, EOFError, pickle.UnpicklingError):
+        pass
 
+    index = build_skill_index(_parse_taxonomy(raw, path))
+    try:
+        os.makedirs(SKILL_INDEX_CACHE_DIR, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=SKILL_INDEX_CACHE_DIR, suffix='.tmp')
+        with os.fdopen(fd, 'wb') as f:
+            pickle.dump(index, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, cache_path)
+    except OSError as e:
+        sys.stderr.write(f"Warning: Could not cache skill index: {e}\n")
+    return index
+
+def _is_word_char(c):
+    # Same definition as regex \w on str
+    return c.isalnum() or c == '_'
+
+_INDEX = load_skill_index()
+_LOOSE_RE = re.compile(_INDEX['loose_pattern']) if _INDEX['loose_pattern'] else None
+
+# Canonical Skill List
+SKILL_DB = _INDEX['skills']
 # Aliases for normalization (variation -> canonical)
-SKILL_ALIASES = {
-    'reactjs': 'react', 'react.js': 'react',
-    'nodejs': 'node.js', 'node js': 'node.js',
-    'musql': 'mysql', # common typo
-    'postgres': 'postgresql',
-    'js': 'javascript',
-    'ts': 'typescript',
-    'golang': 'go',
-    'ml': 'machine learning',
-    'dl': 'deep learning',
-    'cv': 'computer vision',
-    'aws web services': 'aws',
-    'google cloud': 'gcp',
-    'google cloud platform': 'gcp',
-    'cplusplus': 'c++',
-    'csharp': 'c#',
-    'html5': 'html',
-    'css3': 'css'
-}
+SKILL_ALIASES = _INDEX['aliases']
+# Canonical skill -> category
+SKILL_CATEGORIES = _INDEX['categories']
+TAXONOMY_VERSION = _INDEX['version']
 
 def extract_skills(text):
+    """
+    Canonical skills mentioned in `text`, in order of first mention.
+    Each word of the text is looked up in the index; candidate forms starting
+    with that word are confirmed with startswith and a word-boundary check.
+    """
     text = text.lower()
-    found_skills = set()
-    
-    # Check Canonical Skills
-    for skill in SKILL_DB:
-        # Handle special chars
-        escaped_skill = re.escape(skill)
-        # Boundary check: \b matches transition from word to non-word char (like space, punctuation)
-        # For "C++", + is not a word char, so \bC\+\+\b might fail depending on context if followed by space vs dot
-        # We'll use a slightly more robust regex for these specific cases
-        if skill in ['c++', 'c#', '.net']:
-            pattern = re.compile(re.escape(skill)) # simpler check for these
-             # Check if it exists with whitespace around or start/end of string
-            # This is a bit loose but C++ is rare to mis-match (unlike 'C')
-            if pattern.search(text):
-                found_skills.add(skill)
-        else:
-            pattern = r'\b' + escaped_skill + r'\b'
-            if re.search(pattern, text):
-                found_skills.add(skill)
-
-    # Check Aliases
-    for alias, canonical in SKILL_ALIASES.items():
-        if canonical in found_skills:
-            continue # already found
-            
-        escaped_alias = re.escape(alias)
-        pattern = r'\b' + escaped_alias + r'\b'
-        if re.search(pattern, text):
-            found_skills.add(canonical)
-            
-    return list(found_skills)
-
-def identify_missing_skills(job_desc_text, candidate_skills):
-    jd_skills = extract_skills(job_desc_text)
-    missing = [skill for skill in jd_skills if skill not in candidate_skills]
+    by_first_word = _INDEX['by_first_word']
+    length = len(text)
+    first_seen = {}
+
+    for match in _WORD_RE.finditer(text):
+        entries = by_first_word.get(match.group())
+        if not entries:
+            continue
+        start = match.start()
+        for form, canonical in entries:
+            end = start + len(form)
+            if canonical in first_seen or not text.startswith(form, start):
+                continue
+            # \b after the form: the next char must not continue the word
+            if end == length or not _is_word_char(text[end]):
+                first_seen[canonical] = start
+
+    if _LOOSE_RE:
+        for match in _LOOSE_RE.finditer(text):
+            canonical = _INDEX['forms'][match.group(1)]
+            if canonical not in first_seen or match.start() < first_seen[canonical]:
+                first_seen[canonical] = match.start()
+
+    return sorted(first_seen, key=first_seen.get)
+
+def identify_missing_skills(job_desc_text, candidate_skills, jd_skills=None):
+    """
+    JD skills the candidate lacks. Pass `jd_skills` (from extract_skills on the
+    JD) to avoid re-scanning the same JD for every resume.
+    """
+    if jd_skills is None:
+        jd_skills = extract_skills(job_desc_text)
+    candidate_set = set(candidate_skills)
+    missing = [skill for skill in jd_skills if skill not in candidate_set]
     return missing, jd_skills
 
-def identify_extra_skills(job_desc_text, candidate_skills):
+def identify_extra_skills(job_desc_text, candidate_skills, jd_skills=None):
     """
     Identify skills the candidate has that are not in the job description.
     These are 'bonus' skills.
     """
-    jd_skills = extract_skills(job_desc_text)
-    extra = [skill for skill in candidate_skills if skill not in jd_skills]
+    if jd_skills is None:
+        jd_skills = extract_skills(job_desc_text)
+    jd_set = set(jd_skills)
+    extra = [skill for skill in candidate_skills if skill not in jd_set]
     return extra
 
-def calculate_skill_match_score(job_desc_text, candidate_skills):
+def calculate_skill_match_score(job_desc_text, candidate_skills, jd_skills=None):
     """
     Calculate skill match percentage.
     Returns a score between 0-100 based on how many JD skills the candidate has.
     """
-    jd_skills = extract_skills(job_desc_text)
+    if jd_skills is None:
+        jd_skills = extract_skills(job_desc_text)
     if not jd_skills:
         return 0.0
     
-    matched_count = sum(1 for skill in jd_skills if skill in candidate_skills)
+    candidate_set = set(candidate_skills)
+    matched_count = sum(1 for skill in jd_skills if skill in candidate_set)
     return (matched_count / len(jd_skills)) * 100
-
-
@@ -0,0 +1,399 @@
+"""
+Large synthetic (JD, resume, label) corpus for load testing.
+
+train_model.generate_synthetic_data makes a few hundred one-sentence resumes,
+which is too small and too short to load-test extraction, skills or
+embedding. This generator streams any number of records to CSV (optionally
+gzipped) or Parquet, one chunk at a time, so memory stays flat however many
+records are written:
+  - JDs and resumes are built from the skill taxonomy (skills.py), with
+    aliases mixed in so skill normalization is exercised
+  - resumes have summary, experience, projects, skills and education
+    sections, typically 250-700 words
+  - many resumes apply to each JD (--jds distinct job descriptions)
+  - labels follow from the content: positive when the resume covers at least
+    POSITIVE_OVERLAP of the JD's required skills and has close to the
+    required years; negatives include same-role near misses on either skills
+    or years
+With --pdfs the first N resumes are also rendered as PDFs (text layer or
+image only, see benchmark.render_pdf) by the same worker processes.
+
+Every chunk is generated from its own seed, so output is reproducible for a
+given --seed regardless of --workers.
+
+Usage:
+    python synth_corpus.py --count 1000000 --output corpus.parquet --workers 4
+    python synth_corpus.py --count 20000 --output corpus.csv.gz --pdfs 2000 --pdf-dir corpus_pdfs
+"""
+import os
+import sys
+import csv
+import json
+import gzip
+import time
+import random
+import argparse
+import multiprocessing
+from collections import deque
+
+CHUNK_SIZE = 5000
+# Share of a JD's required skills a resume must cover to be labelled a match
+POSITIVE_OVERLAP = 0.6
+PDF_KINDS = ('text', 'scanned')
+COLUMNS = (
+    'job_id', 'job_description', 'resume_id', 'resume_text', 'label',
+    'role', 'years_experience', 'required_years', 'skill_overlap', 'pdf_path'
+)
+
+# Role -> taxonomy categories its skills come from, most relevant first
+ROLES = {
+    "Software Engineer": ("language", "backend", "database", "devops"),
+    "Frontend Developer": ("frontend", "language", "methodology"),
+    "Backend Developer": ("backend", "database", "language", "cloud"),
+    "Full Stack Developer": ("frontend", "backend", "database", "language"),
+    "Data Scientist": ("data_science", "analytics", "language"),
+    "Data Analyst": ("analytics", "database", "methodology"),
+    "Machine Learning Engineer": ("data_science", "language", "cloud", "devops"),
+    "DevOps Engineer": ("devops", "cloud", "language"),
+    "Cloud Architect": ("cloud", "devops", "backend"),
+    "Product Manager": ("methodology", "analytics"),
+}
+
+_DISPLAY = {
+    'c++': 'C++', 'c#': 'C#', 'javascript': 'JavaScript', 'typescript': 'TypeScript', 'html': 'HTML',
+    'css': 'CSS', 'node.js': 'Node.js', 'sql': 'SQL', 'mysql': 'MySQL', 'postgresql': 'PostgreSQL',
+    'mongodb': 'MongoDB', 'aws': 'AWS', 'gcp': 'GCP', 'nlp': 'NLP', 'tensorflow': 'TensorFlow',
+    'pytorch': 'PyTorch', 'numpy': 'NumPy', 'rest api': 'REST API', 'graphql': 'GraphQL', 'devops': 'DevOps',
+    'ci/cd': 'CI/CD', 'power bi': 'Power BI'
+}
+
+_FIRST_NAMES = [
+    "Aarav", "Asha", "Ben", "Carlos", "Chen", "Divya", "Elena", "Emeka", "Farid", "Fatima", "Grace", "Hiro",
+    "Ines", "Isha", "Jonas", "Kavya", "Liam", "Mei", "Nadia", "Omar", "Priya", "Rahul", "Sara", "Tomas", "Yuki", "Zara"
+]
+_LAST_NAMES = [
+    "Rao", "Smith", "Li", "Gupta", "Novak", "Khan", "Okafor", "Tanaka", "Das", "Berg", "Garcia", "Mehta",
+    "Nguyen", "Kowalski", "Haddad", "Iyer", "Jensen", "Silva", "Sharma", "Ahmed", "Fischer", "Kim"
+]
+_CITIES = ["Bengaluru", "Pune", "Hyderabad", "London", "Berlin", "Toronto", "Austin", "Singapore", "Dublin", "Lisbon"]
+_COMPANIES = [
+    "Acme Corp", "Globex", "Initech", "Umbrella Labs", "Stark Industries", "Wayne Tech", "Hooli", "Vandelay Imports",
+    "Soylent Systems", "Cyberdyne", "Tyrell Analytics", "Wonka Digital", "Aperture Software", "Massive Dynamic",
+    "Oscorp", "Pied Piper", "Nakatomi Trading", "Gringotts Fintech", "Monarch Health", "Blue Sun Logistics"
+]
+_UNIVERSITIES = [
+    "IIT Bombay", "NIT Trichy", "University of Toronto", "TU Munich", "University of Texas at Austin",
+    "National University of Singapore", "Trinity College Dublin", "University of Lisbon", "BITS Pilani", "Anna University"
+]
+_DEGREES = ["B.Tech in Computer Science", "B.Sc in Information Technology", "M.Sc in Data Science",
+            "B.E. in Electronics", "M.Tech in Software Engineering", "MBA in Technology Management"]
+_CERTIFICATIONS = ["AWS Certified Solutions Architect", "Certified Kubernetes Administrator", "Google Data Analytics",
+                   "Microsoft Azure Fundamentals", "Certified ScrumMaster", "TensorFlow Developer Certificate"]
+_SENIORITY = ["Junior", "", "", "Senior", "Lead"]
+_BULLETS = [
+    "Built and maintained REST services in {skill} handling {n}k requests per day.",
+    "Led a team of {small} engineers delivering customer-facing features with {skill} and {skill2}.",
+    "Cut infrastructure cost by {pct}% by moving batch workloads to {skill}.",
+    "Designed data pipelines in {skill} processing {n} million records a day.",
+    "Mentored {small} junior developers on {skill} best practices and code review.",
+    "Reduced p95 latency by {pct}% by profiling and rewriting hot paths in {skill}.",
+    "Migrated a legacy monolith to {skill} microservices with zero downtime.",
+    "Automated release pipelines with {skill}, taking deploys from hours to {small} minutes.",
+    "Introduced {skill} dashboards used by {n} stakeholders for weekly planning.",
+    "Raised test coverage from {pct}% to 90% using {skill} and {skill2}.",
+    "Shipped a recommendation feature with {skill} that lifted engagement by {pct}%.",
+    "Owned on-call for {small} services and wrote runbooks covering {skill} incidents.",
+    "Partnered with product and design to scope {small} quarterly roadmaps around {skill}.",
+    "Delivered {n} releases of a {skill} product used by {n}k customers, working closely with QA.",
+    "Wrote design docs and ran architecture reviews for {skill} services owned by {small} teams.",
+    "Improved observability of {skill} jobs with structured logging, tracing and SLO alerts.",
+    "Profiled and fixed memory leaks in long-running {skill} workers, halving restarts.",
+]
+_PROJECTS = [
+    ("Resume Parser", "Extracts structured fields from PDFs using {skill} and {skill2}."),
+    ("Fraud Detection", "Real-time anomaly scoring with {skill}, served behind a {skill2} API."),
+    ("Inventory Forecasting", "Weekly demand forecasts in {skill}, visualised with {skill2}."),
+    ("Chat Support Bot", "Intent classification with {skill}; deployed on {skill2}."),
+    ("Observability Stack", "Metrics and alerting for {n} services using {skill} and {skill2}."),
+    ("Open Source Contributions", "Patches and documentation for {skill} tooling; {n} merged pull requests."),
+]
+
+def display(skill):
+    return _DISPLAY.get(skill) or ' '.join(word.capitalize() for word in skill.split())
+
+class Taxonomy:
+    """Skills by category, each role's skill pool and the aliases of each skill."""
+    def __init__(self):
+        from skills import SKILL_DB, SKILL_CATEGORIES, SKILL_ALIASES
+        self.skills = list(SKILL_DB)
+        by_category = {}
+        for skill in self.skills:
+            by_category.setdefault(SKILL_CATEGORIES.get(skill), []).append(skill)
+        self.aliases = {}
+        for alias, canonical in SKILL_ALIASES.items():
+            self.aliases.setdefault(canonical, []).append(alias)
+        # A replacement taxonomy may not have these categories; fall back to every skill
+        self.role_skills = {
+            role: [s for category in categories for s in by_category.get(category, [])] or self.skills
+            for role, categories in ROLES.items()
+        }
+
+    def mention(self, skill, rng, alias_rate=0.2):
+        """How a resume writes `skill`: usually its display name, sometimes an alias."""
+        aliases = self.aliases.get(skill)
+        if aliases and rng.random() < alias_rate:
+            return rng.choice(aliases)
+        return display(skill)
+
+def make_jds(count, seed, taxonomy):
+    """`count` job descriptions, the same for every worker given the seed."""
+    rng = random.Random(f"jds:{seed}")
+    jds = []
+    for job_id in range(count):
+        role = rng.choice(list(ROLES))
+        pool = taxonomy.role_skills[role]
+        required = rng.sample(pool, k=min(len(pool), rng.randint(3, 6)))
+        nice = rng.sample([s for s in taxonomy.skills if s not in required], k=rng.randint(1, 3))
+        years = rng.randint(0, 8)
+        company = rng.choice(_COMPANIES)
+        text = (
+            f"{company} is hiring a {role} in {rng.choice(_CITIES)}. "
+            f"You will design, build and run {rng.choice(['customer-facing', 'internal', 'data', 'platform'])} systems "
+            f"with a cross-functional team. Requirements: {years}+ years of experience with "
+            f"{', '.join(display(s) for s in required)}. "
+            f"Nice to have: {', '.join(display(s) for s in nice)}. "
+            f"Strong communication and ownership; experience with agile delivery is a plus."
+        )
+        jds.append({"job_id": job_id, "role": role, "required": required, "required_years": years, "text": text})
+    return jds
+
+def _fill(template, skills, rng):
+    # Called ~25 times per resume; rng.random() is several times cheaper than randint/sample
+    r = rng.random
+    i = int(r() * len(skills))
+    j = (i + 1 + int(r() * (len(skills) - 1))) % len(skills)
+    return template.format(
+        skill=skills[i], skill2=skills[j],
+        n=2 + int(r() * 499), small=2 + int(r() * 8), pct=10 + int(r() * 61)
+    )
+
+def resume_paragraphs(jd, positive, rng, taxonomy):
+    """
+    Paragraphs of one resume applying to `jd`, aiming for a match when
+    `positive`. Returns (paragraphs, skills listed, years of experience).
+    """
+    role = jd['role']
+    required = jd['required']
+    if positive:
+        keep = rng.randint(-(-len(required) * 3 // 4), len(required))
+        skills = rng.sample(required, k=keep)
+        years = jd['required_years'] + rng.randint(0, 4)
+    elif rng.random() < 0.25 and jd['required_years'] >= 2:
+        # Near miss: same role and the required skills, but too junior
+        keep = rng.randint(-(-len(required) * 3 // 4), len(required))
+        skills = rng.sample(required, k=keep)
+        years = rng.randint(0, jd['required_years'] - 2)
+    elif rng.random() < 0.5:
+        # Near miss: same role, few of the required skills
+        skills = rng.sample(required, k=rng.randint(0, max(0, int(len(required) * POSITIVE_OVERLAP) - 1)))
+        years = max(0, jd['required_years'] + rng.randint(-4, 2))
+    else:
+        role = rng.choice([r for r in ROLES if r != jd['role']])
+        skills = []
+        years = rng.randint(0, 12)
+    pool = [s for s in taxonomy.role_skills[role] if s not in skills and (positive or s not in required)]
+    skills += rng.sample(pool, k=min(len(pool), rng.randint(3, 7)))
+    rng.shuffle(skills)
+    mentions = [taxonomy.mention(s, rng) for s in skills]
+
+    name = f"{rng.choice(_FIRST_NAMES)} {rng.choice(_LAST_NAMES)}"
+    handle = name.lower().replace(' ', '.')
+    paragraphs = [
+        name,
+        f"{handle}@example.com | +91 9{rng.randint(100000000, 999999999)} | {rng.choice(_CITIES)} | linkedin.com/in/{handle.replace('.', '-')}",
+        "SUMMARY",
+        f"{role} with {years}+ years of experience building reliable software. Skilled in "
+        f"{', '.join(mentions[:-1])} and {mentions[-1]}. {rng.choice(['Enjoys', 'Focused on', 'Known for'])} "
+        f"{rng.choice(['clean, well-tested code', 'mentoring and code review', 'turning data into decisions', 'shipping quickly and safely'])}. "
+        f"Has worked across {rng.choice(['fintech', 'healthcare', 'e-commerce', 'logistics', 'media', 'SaaS'])} and "
+        f"{rng.choice(['retail', 'education', 'gaming', 'telecom', 'public sector', 'travel'])} teams, from early prototypes "
+        f"to systems serving millions of users, and {rng.choice(['is comfortable owning features end to end', 'likes working closely with product and design', 'cares about documentation and operability'])}.",
+        "EXPERIENCE"
+    ]
+    year = 2025
+    for _ in range(min(5, years // 3 + 2)):
+        length = rng.randint(1, 3)
+        title = f"{rng.choice(_SENIORITY)} {role}".strip()
+        paragraphs.append(f"{title}, {rng.choice(_COMPANIES)} ({year - length} - {'Present' if year == 2025 else year})")
+        paragraphs.extend("• " + _fill(t, mentions, rng) for t in rng.sample(_BULLETS, k=rng.randint(5, 8)))
+        year -= length
+    paragraphs.append("PROJECTS")
+    for project, description in rng.sample(_PROJECTS, k=rng.randint(2, 4)):
+        paragraphs.append(f"{project}: {_fill(description, mentions, rng)}")
+    paragraphs.append("SKILLS")
+    paragraphs.append(", ".join(mentions))
+    paragraphs.append("EDUCATION")
+    paragraphs.append(f"{rng.choice(_DEGREES)}, {rng.choice(_UNIVERSITIES)} ({year - rng.randint(0, 2)})")
+    if rng.random() < 0.4:
+        paragraphs.extend(["CERTIFICATIONS", rng.choice(_CERTIFICATIONS)])
+    return paragraphs, skills, years
+
+_taxonomy = None
+_jds = None
+
+def _init_worker(jd_count, seed):
+    global _taxonomy, _jds
+    _taxonomy = Taxonomy()
+    _jds = make_jds(jd_count, seed, _taxonomy)
+
+def generate_chunk(index, start, size, seed, positive_rate=0.5, label_noise=0.0, pdf_count=0, pdf_dir=None, pdf_kinds=PDF_KINDS):
+    """Records start .. start + size - 1, rendering the PDFs of those below pdf_count."""
+    rng = random.Random(f"{seed}:{index}")
+    records = []
+    for resume_id in range(start, start + size):
+        jd = rng.choice(_jds)
+        paragraphs, skills, years = resume_paragraphs(jd, rng.random() < positive_rate, rng, _taxonomy)
+        overlap = len(set(skills) & set(jd['required'])) / len(jd['required'])
+        label = int(overlap >= POSITIVE_OVERLAP and years >= jd['required_years'] - 1)
+        if label_noise and rng.random() < label_noise:
+            label = 1 - label
+        pdf_path = ""
+        if resume_id < pdf_count:
+            from benchmark import render_pdf
+            kind = pdf_kinds[resume_id % len(pdf_kinds)]
+            pdf_path = os.path.join(pdf_dir, f"resume_{resume_id:08d}_{kind}.pdf")
+            render_pdf(pdf_path, paragraphs, kind)
+        records.append({
+            "job_id": jd['job_id'], "job_description": jd['text'],
+            "resume_id": resume_id, "resume_text": "\n".join(paragraphs), "label": label,
+            "role": jd['role'], "years_experience": years, "required_years": jd['required_years'],
+            "skill_overlap": round(overlap, 3), "pdf_path": pdf_path
+        })
+    return records
+
+def _generate_chunk(args):
+    return generate_chunk(*args)
+
+class CsvSink:
+    def __init__(self, path):
+        self.file = gzip.open(path, 'wt', newline='', encoding='utf-8') if path.endswith('.gz') else open(path, 'w', newline='', encoding='utf-8')
+        self.writer = csv.DictWriter(self.file, fieldnames=COLUMNS)
+        self.writer.writeheader()
+
+    def write(self, records):
+        self.writer.writerows(records)
+
+    def close(self):
+        self.file.close()
+
+class ParquetSink:
+    """One row group per chunk. Needs pyarrow."""
+    def __init__(self, path):
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError:
+            raise RuntimeError("Parquet output needs pyarrow (pip install pyarrow), or write .csv / .csv.gz")
+        self.pa = pa
+        self.schema = pa.schema([
+            ('job_id', pa.int32()), ('job_description', pa.string()), ('resume_id', pa.int64()),
+            ('resume_text', pa.string()), ('label', pa.int8()), ('role', pa.string()),
+            ('years_experience', pa.int16()), ('required_years', pa.int16()),
+            ('skill_overlap', pa.float32()), ('pdf_path', pa.string())
+        ])
+        self.writer = pq.ParquetWriter(path, self.schema, compression='zstd')
+
+    def write(self, records):
+        self.writer.write_table(self.pa.Table.from_pylist(records, schema=self.schema))
+
+    def close(self):
+        self.writer.close()
+
+def open_sink(path):
+    return ParquetSink(path) if path.endswith('.parquet') else CsvSink(path)
+
+def generate(output, count, chunk_size=CHUNK_SIZE, workers=1, seed=0, jd_count=1000, positive_rate=0.5,
+             label_noise=0.0, pdf_count=0, pdf_dir=None, pdf_kinds=PDF_KINDS):
+    """Stream `count` records to `output`. Returns a summary dict."""
+    if pdf_count:
+        os.makedirs(pdf_dir, exist_ok=True)
+    tasks = (
+        (index, start, min(chunk_size, count - start), seed, positive_rate, label_noise, pdf_count, pdf_dir, pdf_kinds)
+        for index, start in enumerate(range(0, count, chunk_size))
+    )
+    started = time.perf_counter()
+    written = positives = 0
+    sink = open_sink(output)
+
+    def consume(records):
+        nonlocal written, positives
+        sink.write(records)
+        written += len(records)
+        positives += sum(r['label'] for r in records)
+        sys.stderr.write(f"Debug: {written}/{count} records\n")
+
+    try:
+        if workers <= 1:
+            _init_worker(jd_count, seed)
+            for task in tasks:
+                consume(generate_chunk(*task))
+        else:
+            with multiprocessing.Pool(workers, initializer=_init_worker, initargs=(jd_count, seed)) as pool:
+                # At most two chunks per worker in flight, written in order
+                pending = deque()
+                for task in tasks:
+                    pending.append(pool.apply_async(_generate_chunk, (task,)))
+                    if len(pending) >= workers * 2:
+                        consume(pending.popleft().get())
+                while pending:
+                    consume(pending.popleft().get())
+    finally:
+        sink.close()
+
+    seconds = time.perf_counter() - started
+    return {
+        "output": output,
+        "records": written,
+        "positives": positives,
+        "jds": jd_count,
+        "pdfs": min(pdf_count, written),
+        "seconds": round(seconds, 2),
+        "records_per_second": round(written / max(seconds, 1e-9), 1),
+        "bytes": os.path.getsize(output)
+    }
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Generate a large synthetic resume corpus")
+    parser.add_argument('--count', type=int, default=100000, help="Records to generate")
+    parser.add_argument('--output', required=True, help="Output .csv, .csv.gz or .parquet")
+    parser.add_argument('--chunk-size', type=int, default=CHUNK_SIZE, help="Records per chunk (and Parquet row group)")
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--jds', type=int, default=1000, help="Distinct job descriptions")
+    parser.add_argument('--positive-rate', type=float, default=0.5, help="Share of resumes written to match their JD")
+    parser.add_argument('--label-noise', type=float, default=0.0, help="Share of labels flipped")
+    parser.add_argument('--pdfs', type=int, default=0, help="Also render the first N resumes as PDFs")
+    parser.add_argument('--pdf-dir', default='synthetic_pdfs')
+    parser.add_argument('--pdf-kinds', default=','.join(PDF_KINDS), help="Comma-separated benchmark.KINDS layouts to cycle through")
+    args = parser.parse_args(argv)
+
+    from benchmark import KINDS
+    pdf_kinds = tuple(k.strip() for k in args.pdf_kinds.split(',') if k.strip())
+    unknown = set(pdf_kinds) - set(KINDS)
+    if unknown or not pdf_kinds:
+        parser.error(f"unknown PDF kinds: {', '.join(sorted(unknown)) or '(none given)'}")
+    if args.count < 1 or args.chunk_size < 1 or args.jds < 1:
+        parser.error("--count, --chunk-size and --jds must be positive")
+    if args.output.endswith('.parquet'):
+        try:
+            import pyarrow
+        except ImportError:
+            parser.error("Parquet output needs pyarrow (pip install pyarrow); use .csv or .csv.gz instead")
+
+    print(json.dumps(generate(
+        args.output, args.count, args.chunk_size, args.workers, args.seed, args.jds,
+        args.positive_rate, args.label_noise, args.pdfs, args.pdf_dir, pdf_kinds
+    )))
+
+if __name__ == "__main__":
+    main()
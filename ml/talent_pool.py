@@ -0,0 +1,410 @@
+"""
+Talent pool: a persistent, searchable index of every resume the matcher has seen.
+
+Each resume is stored once per content (keyed by the hash of its cleaned text)
+under .cache/talent_pool/<encoder>/:
+    vectors.npy     - memory-mapped (capacity x dim) float32, one normalized
+                      document embedding per resume
+    meta.jsonl      - append-only: a {"dim"} header, then one line per new row
+                      (key, file name, skills, experience) or metadata refresh
+    ivf.npz         - IVF index: k-means centroids and their generation
+    ivf_lists.N.i32 - append-only int32 list of every row, for generation N
+Adding resumes only appends, so it costs the same however large the pool is;
+each process reads meta.jsonl from where it last stopped. Pools smaller than IVF_MIN_ROWS are searched exactly. Larger pools are split
+into ~sqrt(n) lists by spherical k-means (numpy, no extra dependency) and a
+query only scans the `nprobe` lists whose centroids are nearest to it. New
+resumes join their nearest list straight away; the centroids are retrained
+once the pool has doubled since they were last trained.
+
+Usage (backfill and search from the command line; loads the model):
+    python talent_pool.py add ../backend/uploads
+    python talent_pool.py search "Senior Python developer with AWS" --top-k 10
+"""
+import os
+import re
+import sys
+import json
+import time
+import tempfile
+import threading
+from contextlib import contextmanager
+
+import numpy as np
+
+try:
+    import fcntl
+except ImportError:  # Windows: in-process locking only
+    fcntl = None
+
+from extract_cache import CACHE_DIR
+
+POOL_DIR = os.path.join(CACHE_DIR, 'talent_pool')
+# Below this many resumes an exact scan is as fast as the IVF lists
+IVF_MIN_ROWS = int(os.environ.get('MATCHER_POOL_IVF_MIN_ROWS', 4096))
+IVF_NPROBE = int(os.environ.get('MATCHER_POOL_NPROBE', 16))
+KMEANS_ITERATIONS = 10
+# Rows sampled per centroid when training, which bounds training time
+KMEANS_SAMPLE_PER_LIST = 64
+INITIAL_ROWS = 1024
+
+def train_ivf(vectors, n_lists, iterations=KMEANS_ITERATIONS, seed=0):
+    """Spherical k-means over normalized rows; returns (n_lists x dim) unit centroids."""
+    rng = np.random.default_rng(seed)
+    sample_size = min(len(vectors), n_lists * KMEANS_SAMPLE_PER_LIST)
+    sample = np.asarray(vectors[np.sort(rng.choice(len(vectors), sample_size, replace=False))], dtype=np.float32)
+    centroids = sample[rng.choice(len(sample), n_lists, replace=False)].copy()
+    for _ in range(iterations):
+        assignment = np.argmax(sample @ centroids.T, axis=1)
+        sums = np.zeros_like(centroids)
+        np.add.at(sums, assignment, sample)
+        norms = np.linalg.norm(sums, axis=1)
+        # Empty lists keep their old centroid
+        filled = norms > 0
+        centroids[filled] = sums[filled] / norms[filled, None]
+    return centroids
+
+def assign_lists(vectors, centroids, block=8192):
+    """Index of the nearest centroid for every row, computed in blocks."""
+    return np.concatenate([
+        np.argmax(np.asarray(vectors[i:i + block], dtype=np.float32) @ centroids.T, axis=1)
+        for i in range(0, len(vectors), block)
+    ]).astype(np.int32) if len(vectors) else np.zeros(0, dtype=np.int32)
+
+class TalentPool:
+    def __init__(self, name, dim, pool_dir=POOL_DIR):
+        self.dir = os.path.join(pool_dir, re.sub(r'[^A-Za-z0-9_.@-]+', '_', name))
+        self.dim = dim
+        self.vectors_path = os.path.join(self.dir, 'vectors.npy')
+        self.meta_path = os.path.join(self.dir, 'meta.jsonl')
+        self.ivf_path = os.path.join(self.dir, 'ivf.npz')
+        self.lock_path = os.path.join(self.dir, '.lock')
+        self._thread_lock = threading.Lock()
+        # Rows read from meta.jsonl so far, and where reading stopped
+        self._meta = self._empty_meta()
+        # Rows, vectors and IVF lists for searches, rebuilt when rows are added
+        self._snapshot = None
+        self._snapshot_stamp = None
+        os.makedirs(self.dir, exist_ok=True)
+
+    @contextmanager
+    def _locked(self):
+        with self._thread_lock:
+            with open(self.lock_path, 'a') as lock_file:
+                if fcntl:
+                    fcntl.flock(lock_file, fcntl.LOCK_EX)
+                try:
+                    yield
+                finally:
+                    if fcntl:
+                        fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    @staticmethod
+    def _empty_meta():
+        return {"rows": [], "by_key": {}, "offset": 0, "inode": None, "valid": False}
+
+    def _migrate_meta_json(self):
+        """Convert a pool written as one meta.json (before meta.jsonl) in place."""
+        legacy_path = os.path.join(self.dir, 'meta.json')
+        try:
+            with open(legacy_path, 'r', encoding='utf-8') as f:
+                legacy = json.load(f)
+        except (OSError, ValueError):
+            return
+        if legacy.get('dim') == self.dim:
+            lines = [{"dim": self.dim}] + [{"row": row, **record} for row, record in enumerate(legacy.get('rows', []))]
+            self._write_atomic(self.meta_path, lambda f: f.write(''.join(json.dumps(line) + '\n' for line in lines).encode('utf-8')))
+            # The old ivf.npz held the lists itself; the next add() retrains
+            try:
+                os.remove(self.ivf_path)
+            except OSError:
+                pass
+        os.remove(legacy_path)
+
+    def _refresh_meta(self):
+        """Apply the lines appended to meta.jsonl since the last call. Callers hold the lock."""
+        meta = self._meta
+        try:
+            st = os.stat(self.meta_path)
+        except FileNotFoundError:
+            if meta['inode'] is None and os.path.exists(os.path.join(self.dir, 'meta.json')):
+                self._migrate_meta_json()
+                return self._refresh_meta()
+            self._meta = self._empty_meta()
+            return self._meta
+        if st.st_ino != meta['inode'] or st.st_size < meta['offset']:
+            # Replaced or truncated by a reset: read it from the start
+            meta = self._meta = self._empty_meta()
+            meta['inode'] = st.st_ino
+        if st.st_size == meta['offset']:
+            return meta
+        with open(self.meta_path, 'rb') as f:
+            f.seek(meta['offset'])
+            data = f.read()
+        # A writer that died mid-line leaves an unfinished last line; it is ignored
+        # here and cut off by the next add()
+        end = data.rfind(b'\n') + 1
+        rows, by_key = meta['rows'], meta['by_key']
+        for line in data[:end].splitlines():
+            record = json.loads(line)
+            row = record.pop('row', None)
+            if row is None:
+                meta['valid'] = record.get('dim') == self.dim
+            elif not meta['valid']:
+                # Written for another encoder size; add() starts the pool over
+                continue
+            elif row == len(rows):
+                rows.append(record)
+                by_key[record['key']] = row
+            elif row < len(rows):
+                rows[row].update(record)
+        meta['offset'] += end
+        return meta
+
+    def _reset(self):
+        """Start an empty pool, e.g. after switching to an encoder of another size."""
+        for path in (self.ivf_path, self.vectors_path, *self._ivf_list_paths()):
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+        self._write_atomic(self.meta_path, lambda f: f.write(json.dumps({"dim": self.dim}).encode('utf-8') + b'\n'))
+        self._meta = self._empty_meta()
+        return self._refresh_meta()
+
+    def _write_atomic(self, path, write):
+        fd, tmp_path = tempfile.mkstemp(dir=self.dir, suffix='.tmp')
+        with os.fdopen(fd, 'wb') as f:
+            write(f)
+        os.replace(tmp_path, path)
+
+    def _ivf_lists_path(self, generation):
+        return os.path.join(self.dir, f'ivf_lists.{generation}.i32')
+
+    def _ivf_list_paths(self):
+        return [os.path.join(self.dir, name) for name in os.listdir(self.dir) if name.startswith('ivf_lists.')]
+
+    def _load_ivf(self):
+        """(centroids, assignment, trained_rows, generation) or None if there's no usable index."""
+        try:
+            with np.load(self.ivf_path) as ivf:
+                centroids = ivf['centroids']
+                trained_rows = int(ivf['trained_rows'])
+                generation = int(ivf['generation'])
+            assignment = np.fromfile(self._ivf_lists_path(generation), dtype=np.int32)
+        except (OSError, KeyError, ValueError):
+            return None
+        if centroids.shape[1] != self.dim:
+            return None
+        return centroids, assignment, trained_rows, generation
+
+    def _save_ivf(self, centroids, assignment, trained_rows, generation):
+        """Write a complete index as a new generation, then drop the old lists."""
+        lists_path = self._ivf_lists_path(generation)
+        self._write_atomic(lists_path, lambda f: f.write(np.asarray(assignment, dtype=np.int32).tobytes()))
+        self._write_atomic(self.ivf_path, lambda f: np.savez(
+            f, centroids=centroids, trained_rows=np.int64(trained_rows), generation=np.int64(generation)
+        ))
+        for path in self._ivf_list_paths():
+            if path != lists_path:
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+
+    def _open_vectors(self, min_rows=0):
+        try:
+            matrix = np.load(self.vectors_path, mmap_mode='r+')
+        except (OSError, ValueError):
+            matrix = None
+        capacity = len(matrix) if matrix is not None else 0
+        if min_rows > capacity:
+            new_capacity = max(INITIAL_ROWS, capacity * 2, min_rows)
+            tmp_path = self.vectors_path + '.grow'
+            grown = np.lib.format.open_memmap(tmp_path, mode='w+', dtype=np.float32, shape=(new_capacity, self.dim))
+            if capacity:
+                grown[:capacity] = matrix[:capacity]
+            grown.flush()
+            del grown, matrix
+            os.replace(tmp_path, self.vectors_path)
+            matrix = np.load(self.vectors_path, mmap_mode='r+')
+        return matrix
+
+    def __len__(self):
+        with self._locked():
+            return len(self._refresh_meta()['rows'])
+
+    def add(self, entries, vectors):
+        """
+        Insert resumes. `entries` are {"key", "file_name", "skills",
+        "experience_years"} dicts, `vectors` their normalized embeddings.
+        A key already in the pool only has its metadata refreshed.
+        Returns the number of new rows.
+        """
+        with self._locked():
+            meta = self._refresh_meta()
+            if not meta['valid'] or (meta['rows'] and not os.path.exists(self.vectors_path)):
+                meta = self._reset()
+            elif os.path.getsize(self.meta_path) > meta['offset']:
+                # Unfinished line from a writer that died
+                os.truncate(self.meta_path, meta['offset'])
+            by_key = meta['by_key']
+            start = len(meta['rows'])
+            new_rows = []
+            # key -> index in new_rows, for a resume given twice in this batch
+            batch = {}
+            updates = {}
+            for entry, vector in zip(entries, vectors):
+                record = {
+                    "key": entry['key'],
+                    "file_name": entry['file_name'],
+                    "skills": entry.get('skills', []),
+                    "experience_years": entry.get('experience_years', 0),
+                    "added_at": round(time.time())
+                }
+                row = by_key.get(entry['key'])
+                if row is not None:
+                    current = meta['rows'][row]
+                    if any(current.get(field) != record[field] for field in ('file_name', 'skills', 'experience_years')):
+                        updates[row] = record
+                elif entry['key'] in batch:
+                    # The later file name wins
+                    new_rows[batch[entry['key']]][0].update(record)
+                else:
+                    batch[entry['key']] = len(new_rows)
+                    new_rows.append((record, vector))
+
+            # Vectors and IVF lists first, so readers never see a row without them
+            if new_rows:
+                count = start + len(new_rows)
+                matrix = self._open_vectors(count)
+                matrix[start:count] = np.asarray([vector for _, vector in new_rows], dtype=np.float32)
+                matrix.flush()
+                self._update_ivf(matrix, start, count)
+                del matrix
+
+            lines = [{"row": start + i, **record} for i, (record, _) in enumerate(new_rows)]
+            lines.extend({"row": row, **record} for row, record in updates.items())
+            if lines:
+                with open(self.meta_path, 'ab') as f:
+                    f.write(''.join(json.dumps(line) + '\n' for line in lines).encode('utf-8'))
+                self._refresh_meta()
+        return len(new_rows)
+
+    def _update_ivf(self, matrix, start, count):
+        """Assign rows [start, count) to IVF lists, retraining when the pool has doubled."""
+        if count < IVF_MIN_ROWS:
+            return
+        ivf = self._load_ivf()
+        if ivf is None or count >= 2 * ivf[2]:
+            n_lists = max(1, int(np.sqrt(count)))
+            sys.stderr.write(f"Debug: Training talent pool IVF index ({n_lists} lists over {count} resumes)\n")
+            centroids = train_ivf(matrix[:count], n_lists)
+            generation = ivf[3] + 1 if ivf else 0
+            self._save_ivf(centroids, assign_lists(matrix[:count], centroids), count, generation)
+            return
+        centroids, assignment, trained_rows, generation = ivf
+        if len(assignment) == start:
+            with open(self._ivf_lists_path(generation), 'ab') as f:
+                f.write(assign_lists(matrix[start:count], centroids).tobytes())
+            return
+        # Out of step with meta.jsonl after a crash: rewrite this generation's lists
+        assignment = np.concatenate([assignment[:start], assign_lists(matrix[len(assignment):count], centroids)])
+        self._save_ivf(centroids, assignment[:count], trained_rows, generation + 1)
+
+    def _load_snapshot(self):
+        """
+        Rows, vectors and IVF lists for searching, rebuilt when rows have been
+        added. With an IVF index the vectors are copied into memory grouped by
+        list, so each probed list is one contiguous slice.
+        """
+        with self._locked():
+            meta = self._refresh_meta()
+            count = len(meta['rows'])
+            stamp = (meta['inode'], count)
+            if stamp != self._snapshot_stamp:
+                ivf = self._load_ivf() if count >= IVF_MIN_ROWS else None
+                matrix = np.load(self.vectors_path, mmap_mode='r') if count else None
+                lists = None
+                if ivf is not None and len(ivf[1]) >= count:
+                    centroids, assignment = ivf[0], ivf[1][:count]
+                    # List i holds rows order[bounds[i]:bounds[i + 1]], vectors packed[bounds[i]:bounds[i + 1]]
+                    order = np.argsort(assignment, kind='stable')
+                    bounds = np.searchsorted(assignment[order], np.arange(len(centroids) + 1))
+                    lists = (centroids, order, bounds, np.asarray(matrix[order]))
+                    matrix = None
+                self._snapshot = {"rows": meta['rows'][:count], "matrix": matrix, "lists": lists}
+                self._snapshot_stamp = stamp
+            return self._snapshot
+
+    def get(self, key):
+        """Metadata of the resume with this text key, or None."""
+        with self._locked():
+            meta = self._refresh_meta()
+            row = meta['by_key'].get(key)
+            return None if row is None else meta['rows'][row]
+
+    def search(self, query, top_k=10, nprobe=IVF_NPROBE):
+        """
+        Return up to top_k (row metadata, cosine similarity) pairs, best first,
+        for a normalized query vector.
+        """
+        snapshot = self._load_snapshot()
+        if not snapshot or not snapshot['rows']:
+            return []
+        count = len(snapshot['rows'])
+        query = np.asarray(query, dtype=np.float32)
+
+        if snapshot['lists'] is None:
+            candidates = np.arange(count)
+            similarities = np.asarray(snapshot['matrix'][:count]) @ query
+        else:
+            centroids, order, bounds, packed = snapshot['lists']
+            probe = np.argsort(-(centroids @ query))[:max(1, nprobe)]
+            candidates = np.concatenate([order[bounds[i]:bounds[i + 1]] for i in probe])
+            similarities = np.concatenate([packed[bounds[i]:bounds[i + 1]] @ query for i in probe])
+
+        top_k = min(top_k, len(candidates))
+        if top_k <= 0:
+            return []
+        best = np.argpartition(-similarities, top_k - 1)[:top_k]
+        best = best[np.argsort(-similarities[best], kind='stable')]
+        return [(snapshot['rows'][candidates[i]], float(similarities[i])) for i in best]
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+def get_pool(name, dim):
+    """Shared pool per encoder name."""
+    with _pools_lock:
+        if name not in _pools:
+            _pools[name] = TalentPool(name, dim)
+        return _pools[name]
+
+def _main(argv=None):
+    import argparse
+    parser = argparse.ArgumentParser(description="Talent pool index")
+    commands = parser.add_subparsers(dest='command', required=True)
+    add = commands.add_parser('add', help="Index PDFs (files or directories)")
+    add.add_argument('paths', nargs='+')
+    search = commands.add_parser('search', help="Top candidates for a job description")
+    search.add_argument('job_description')
+    search.add_argument('--top-k', type=int, default=10)
+    search.add_argument('--nprobe', type=int, default=IVF_NPROBE)
+    args = parser.parse_args(argv)
+
+    import matcher
+    if args.command == 'add':
+        file_paths = []
+        for path in args.paths:
+            if os.path.isdir(path):
+                file_paths.extend(os.path.join(path, name) for name in sorted(os.listdir(path)) if name.lower().endswith('.pdf'))
+            else:
+                file_paths.append(path)
+        print(json.dumps(matcher.pool_add({"file_paths": file_paths})))
+    else:
+        print(json.dumps(matcher.pool_search({
+            "job_description": args.job_description, "top_k": args.top_k, "nprobe": args.nprobe
+        }), indent=2))
+
+if __name__ == "__main__":
+    _main()
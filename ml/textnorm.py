@@ -0,0 +1,130 @@
+"""
+Text normalization shared by the skill, experience and embedding stages.
+
+clean_text gives the text that skills, TF-IDF and the embeddings work on:
+lowercased, emails and URLs removed, separators (| / •) turned into spaces,
+everything but a-z, digits, whitespace and + # . dropped (so node.js, .net,
+c++ and c# survive), and whitespace collapsed. The output is exactly what the
+old regex chain in utils.py produced, since cached embeddings and job state
+are keyed by it. Instead of a regex pass per rule, emails are found from
+their '@', and the character rules are one ASCII encode (non-ASCII
+whitespace and bullets become spaces, other non-ASCII characters are dropped)
+plus one bytes.translate.
+
+extract_experience finds "5+ years of experience"-style phrases. Each pattern
+starts with a literal word, so the regex engine jumps between occurrences
+instead of trying every position; phrases that start with the number are
+matched backwards on the reversed text. NormalizedText holds a resume's raw
+text and works out the lowercased text, cleaned text and experience once.
+"""
+import re
+import codecs
+
+_EMAIL_PART = re.compile(r'[\w.-]+')
+_URL = re.compile(r'http\S+')
+
+_KEEP = r'a-z0-9\s+#.'
+# ASCII characters clean_text keeps; | and / become spaces, and so do the
+# separators bytes.split() doesn't know are whitespace (str.split does)
+_ASCII_TABLE = bytes.maketrans(b'|/\x1c\x1d\x1e\x1f', b'      ')
+_ASCII_DROP = bytes(c for c in range(128) if not re.match(f'[{_KEEP}|/]', chr(c)))
+
+def _non_ascii(error):
+    # Codec error handler: of the non-ASCII characters, whitespace and bullets separate words, the rest go
+    chunk = error.object[error.start:error.end]
+    return ''.join(' ' if c.isspace() or c == '•' else '' for c in chunk), error.end
+
+codecs.register_error('textnorm', _non_ascii)
+
+_EXPERIENCE_FORWARD = (
+    re.compile(r'experience\s+(?:of\s+)?(\d+)\+?\s*(?:years?|yrs?)'),
+    re.compile(r'worked\s+for\s+(\d+)\+?\s*(?:years?|yrs?)'),
+)
+# "(\d+)\+?\s*(?:years?|yrs?)\s+(?:of\s+)?experience" and "...\s+in", reversed
+_EXPERIENCE_REVERSED = (
+    re.compile(r'ecneirepxe(?:\s+fo)?\s+(?:s?raey|s?ry)\s*\+?(\d+)'),
+    re.compile(r'ni\s+(?:s?raey|s?ry)\s*\+?(\d+)'),
+)
+
+def _is_email_char(c):
+    # Same definition as [\w.-] on str
+    return c.isalnum() or c in '_.-'
+
+def _remove_emails(text):
+    """re.sub(r'[\\w\\.-]+@[\\w\\.-]+', '', text), looking only around each '@'."""
+    parts = []
+    cursor = 0
+    at = text.find('@')
+    while at != -1:
+        start = at
+        while start > cursor and _is_email_char(text[start - 1]):
+            start -= 1
+        domain = _EMAIL_PART.match(text, at + 1)
+        if start < at and domain:
+            parts.append(text[cursor:start])
+            cursor = domain.end()
+            at = text.find('@', cursor)
+        else:
+            at = text.find('@', at + 1)
+    if not parts:
+        return text
+    parts.append(text[cursor:])
+    return ''.join(parts)
+
+def _clean_lower(text):
+    if '@' in text:
+        text = _remove_emails(text)
+    if 'http' in text:
+        text = _URL.sub('', text)
+    data = text.encode('ascii', 'textnorm').translate(_ASCII_TABLE, _ASCII_DROP)
+    return b' '.join(data.split()).decode('ascii')
+
+def _experience_lower(text):
+    years = [int(n) for pattern in _EXPERIENCE_FORWARD for n in pattern.findall(text)]
+    if 'y' in text:
+        reversed_text = text[::-1]
+        years.extend(int(n[::-1]) for pattern in _EXPERIENCE_REVERSED for n in pattern.findall(reversed_text))
+    return max(years) if years else 0
+
+def clean_text(text):
+    if not text:
+        return ""
+    return _clean_lower(text.lower())
+
+def extract_experience(text):
+    """
+    Extract years of experience from resume text.
+    Returns the maximum years found, or 0 if none detected.
+    """
+    if not text:
+        return 0
+    return _experience_lower(text.lower())
+
+class NormalizedText:
+    """A resume's raw text and its normalized forms, each computed once."""
+    __slots__ = ('raw', '_lower', '_cleaned', '_experience_years')
+
+    def __init__(self, raw):
+        self.raw = raw or ""
+        self._lower = None
+        self._cleaned = None
+        self._experience_years = None
+
+    @property
+    def lower(self):
+        if self._lower is None:
+            self._lower = self.raw.lower()
+        return self._lower
+
+    @property
+    def cleaned(self):
+        if self._cleaned is None:
+            self._cleaned = _clean_lower(self.lower) if self.raw else ""
+        return self._cleaned
+
+    @property
+    def experience_years(self):
+        # Matched on the raw text, where cleaning hasn't joined or split phrases
+        if self._experience_years is None:
+            self._experience_years = _experience_lower(self.lower) if self.raw else 0
+        return self._experience_years
@@ -0,0 +1,157 @@
+"""
+Stable TF-IDF model for resume_matcher.py and the cascade prefilter.
+
+Fitting a TfidfVectorizer on [JD] + resumes for every request made a resume's
+score depend on the rest of its upload, and the fit cost grew with the batch.
+Here terms are hashed (HashingVectorizer, no vocabulary to store) and the
+document frequencies come from an offline fit over the historical corpus,
+saved as a sparse artifact (nonzero buckets and their counts). Requests only
+transform, so cost is linear in the new text and scores are batch independent.
+
+Usage (fit over past uploads and/or the training CSV's resume_text column):
+    python tfidf_model.py fit ../backend/uploads --csv dataset/synthetic_data.csv
+"""
+import os
+import sys
+import json
+import tempfile
+import threading
+
+import numpy as np
+
+from extract_cache import CACHE_DIR
+
+TFIDF_MODEL_PATH = os.environ.get('MATCHER_TFIDF_MODEL', os.path.join(CACHE_DIR, 'tfidf_model.npz'))
+# Hash buckets; 2**18 keeps collisions rare for resume vocabularies
+N_FEATURES = 2 ** 18
+
+class TfidfModel:
+    def __init__(self, doc_freq=None, n_docs=0, n_features=N_FEATURES):
+        from sklearn.feature_extraction.text import HashingVectorizer
+        self.n_features = n_features
+        self.doc_freq = np.zeros(n_features, dtype=np.int64) if doc_freq is None else doc_freq
+        self.n_docs = n_docs
+        # Same tokens as TfidfVectorizer(stop_words='english'); raw counts, normalised after weighting
+        self.vectorizer = HashingVectorizer(
+            n_features=n_features, stop_words='english', alternate_sign=False, norm=None
+        )
+        self._idf = None
+
+    def partial_fit(self, texts):
+        """Add `texts` to the document frequencies."""
+        counts = self.vectorizer.transform(texts)
+        # Each (row, bucket) pair appears once, so counting buckets counts documents
+        self.doc_freq += np.bincount(counts.indices, minlength=self.n_features)
+        self.n_docs += counts.shape[0]
+        self._idf = None
+        return self
+
+    @property
+    def idf(self):
+        # Smoothed like TfidfVectorizer: as if one extra document held every term
+        if self._idf is None:
+            self._idf = np.log((1 + self.n_docs) / (1 + self.doc_freq)) + 1
+        return self._idf
+
+    def transform(self, texts):
+        """L2-normalised TF-IDF rows (scipy CSR), one per text."""
+        from sklearn.preprocessing import normalize
+        matrix = self.vectorizer.transform(texts).astype(np.float64)
+        matrix.data *= self.idf[matrix.indices]
+        return normalize(matrix, copy=False)
+
+    def save(self, path=TFIDF_MODEL_PATH):
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        buckets = np.flatnonzero(self.doc_freq)
+        fd, tmp_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+        with os.fdopen(fd, 'wb') as f:
+            np.savez_compressed(
+                f, buckets=buckets.astype(np.int32), counts=self.doc_freq[buckets],
+                n_docs=np.int64(self.n_docs), n_features=np.int64(self.n_features)
+            )
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path=TFIDF_MODEL_PATH):
+        with np.load(path) as saved:
+            n_features = int(saved['n_features'])
+            doc_freq = np.zeros(n_features, dtype=np.int64)
+            doc_freq[saved['buckets']] = saved['counts']
+            return cls(doc_freq, int(saved['n_docs']), n_features)
+
+_model = None
+_model_stamp = None
+_model_lock = threading.Lock()
+_warned = False
+
+def get_model(path=TFIDF_MODEL_PATH):
+    """The fitted model, reloaded when the artifact changes; None until one is fitted."""
+    global _model, _model_stamp, _warned
+    with _model_lock:
+        try:
+            stat = os.stat(path)
+        except OSError:
+            if not _warned:
+                sys.stderr.write(f"Warning: No TF-IDF model at {path}, fitting per request (run tfidf_model.py fit)\n")
+                _warned = True
+            return None
+        stamp = (stat.st_mtime_ns, stat.st_size)
+        if stamp != _model_stamp:
+            _model = TfidfModel.load(path)
+            _model_stamp = stamp
+        return _model
+
+def similarities(cleaned_jd, texts):
+    """Cosine similarity (0-1) of each text to the JD."""
+    model = get_model()
+    if model is None:
+        # Not fitted yet: the old per-request fit on the JD and texts
+        model = TfidfModel().partial_fit([cleaned_jd] + list(texts))
+    matrix = model.transform([cleaned_jd] + list(texts))
+    # Rows are L2-normalised, so cosine similarity is a sparse dot product
+    return (matrix[1:] @ matrix[0].T).toarray().ravel()
+
+def _main(argv=None):
+    import argparse
+    parser = argparse.ArgumentParser(description="Stable TF-IDF model")
+    commands = parser.add_subparsers(dest='command', required=True)
+    fit = commands.add_parser('fit', help="Fit document frequencies over resumes")
+    fit.add_argument('paths', nargs='*', help="PDF files or directories")
+    fit.add_argument('--csv', action='append', default=[], help="CSV with a resume_text column")
+    fit.add_argument('--output', default=TFIDF_MODEL_PATH)
+    args = parser.parse_args(argv)
+
+    from utils import clean_text
+    from extract_pool import iter_extracted
+    model = TfidfModel()
+
+    file_paths = []
+    for path in args.paths:
+        if os.path.isdir(path):
+            file_paths.extend(os.path.join(path, name) for name in sorted(os.listdir(path)) if name.lower().endswith('.pdf'))
+        else:
+            file_paths.append(path)
+    texts = []
+    for _, extraction, _ in iter_extracted(file_paths):
+        text = clean_text(extraction['text']) if extraction else ""
+        if text:
+            texts.append(text)
+        if len(texts) >= 1000:
+            model.partial_fit(texts)
+            texts = []
+    if texts:
+        model.partial_fit(texts)
+
+    for csv_path in args.csv:
+        import pandas as pd
+        for frame in pd.read_csv(csv_path, usecols=['resume_text'], chunksize=10000):
+            model.partial_fit([clean_text(str(text)) for text in frame['resume_text'].fillna('')])
+
+    if not model.n_docs:
+        parser.error("no resume text found")
+    model.save(args.output)
+    print(json.dumps({"documents": model.n_docs, "terms": int(np.count_nonzero(model.doc_freq)), "path": args.output}))
+
+if __name__ == "__main__":
+    _main()
@@ -0,0 +1,173 @@
+"""
+Structured timings for the matcher pipeline.
+
+Every request handled by matcher.main or server.py runs inside request_trace(),
+which collects per-stage seconds for the job and, when detailed, for each
+resume (extraction per extractor and the method that won, clean_text,
+extract_skills, extract_experience, embedding share, scoring), plus cache
+hit/miss counts. Process-wide totals of the same stages back the server's
+"metrics" op and its Prometheus text endpoint (server.py --metrics-port).
+
+    MATCHER_TRACE_FILE=path - append one JSON trace record per request
+    MATCHER_PROFILE=dir     - cProfile each request into dir/<time>-<op>.prof
+A request with "trace": true is traced per resume and, when streamed, gets
+its trace record in the summary.
+"""
+import os
+import sys
+import json
+import time
+import threading
+from contextlib import contextmanager
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+TRACE_FILE = os.environ.get('MATCHER_TRACE_FILE', '')
+PROFILE_DIR = os.environ.get('MATCHER_PROFILE', '')
+
+_local = threading.local()
+_lock = threading.Lock()
+_stages = {}
+_counters = {}
+_gauges = {}
+
+def _reset_after_fork():
+    # Another thread may have held the lock at fork time (server.py --fork)
+    global _lock
+    _lock = threading.Lock()
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_reset_after_fork)
+
+class Trace:
+    def __init__(self, op, detailed=False):
+        self.op = op
+        self.detailed = detailed
+        self.started_at = time.time()
+        self.start = time.perf_counter()
+        self.stages = {}
+        self.counters = {}
+        self.resumes = {}
+
+    def record(self):
+        record = {
+            "type": "trace",
+            "op": self.op,
+            "startedAt": round(self.started_at, 3),
+            "totalSeconds": round(time.perf_counter() - self.start, 4),
+            "stages": {name: round(seconds, 4) for name, seconds in self.stages.items()},
+            "counters": dict(self.counters),
+            "peakRssMb": peak_rss_mb()
+        }
+        if self.detailed:
+            record["resumes"] = [dict(entry, file=os.path.basename(path)) for path, entry in self.resumes.items()]
+        return record
+
+def current():
+    return getattr(_local, 'trace', None)
+
+def peak_rss_mb():
+    if resource is None:
+        return None
+    # ru_maxrss is KiB on Linux, bytes on macOS
+    scale = 1 / (1024 * 1024) if sys.platform == 'darwin' else 1 / 1024
+    return round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * scale, 1)
+
+def observe(stage, seconds, file_path=None):
+    """Add `seconds` to a stage, process-wide and on this thread's trace (per resume if given)."""
+    with _lock:
+        stats = _stages.setdefault(stage, {"count": 0, "seconds": 0.0, "max": 0.0})
+        stats["count"] += 1
+        stats["seconds"] += seconds
+        stats["max"] = max(stats["max"], seconds)
+    trace = current()
+    if trace is not None:
+        trace.stages[stage] = trace.stages.get(stage, 0.0) + seconds
+        if file_path and trace.detailed:
+            entry = trace.resumes.setdefault(file_path, {})
+            entry[stage] = round(entry.get(stage, 0.0) + seconds, 6)
+
+@contextmanager
+def timed(stage, file_path=None):
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        observe(stage, time.perf_counter() - start, file_path)
+
+def count(name, value=1):
+    with _lock:
+        _counters[name] = _counters.get(name, 0) + value
+    trace = current()
+    if trace is not None:
+        trace.counters[name] = trace.counters.get(name, 0) + value
+
+def annotate(file_path, **fields):
+    """Attach fields (e.g. the extraction method) to a resume's trace entry."""
+    trace = current()
+    if trace is not None and trace.detailed:
+        trace.resumes.setdefault(file_path, {}).update(fields)
+
+def set_gauge(name, value):
+    with _lock:
+        _gauges[name] = value
+
+@contextmanager
+def request_trace(request, op):
+    """Trace one request on this thread (and cProfile it with MATCHER_PROFILE); yields the Trace."""
+    trace = Trace(op, detailed=bool(request.get('trace') or TRACE_FILE))
+    _local.trace = trace
+    profiler = None
+    if PROFILE_DIR:
+        import cProfile
+        profiler = cProfile.Profile()
+        profiler.enable()
+    try:
+        yield trace
+    finally:
+        _local.trace = None
+        if profiler is not None:
+            profiler.disable()
+            os.makedirs(PROFILE_DIR, exist_ok=True)
+            path = os.path.join(PROFILE_DIR, f"{time.strftime('%Y%m%d-%H%M%S')}-{os.getpid()}-{threading.get_ident()}-{op}.prof")
+            profiler.dump_stats(path)
+            sys.stderr.write(f"Debug: Profile written to {path}\n")
+        count(f"requests_{op}")
+        observe(f"request_{op}", time.perf_counter() - trace.start)
+        if TRACE_FILE:
+            try:
+                with _lock, open(TRACE_FILE, 'a', encoding='utf-8') as f:
+                    f.write(json.dumps(trace.record()) + "\n")
+            except OSError as e:
+                sys.stderr.write(f"Warning: Could not write trace: {e}\n")
+
+def metrics():
+    """Process-wide stage totals, counters and gauges."""
+    with _lock:
+        return {
+            "stages": {name: dict(stats) for name, stats in _stages.items()},
+            "counters": dict(_counters),
+            "gauges": dict(_gauges, peak_rss_mb=peak_rss_mb())
+        }
+
+def prometheus_text():
+    """metrics() in the Prometheus text exposition format."""
+    snapshot = metrics()
+    lines = [
+        "# HELP matcher_stage_seconds Time spent per pipeline stage.",
+        "# TYPE matcher_stage_seconds summary"
+    ]
+    for name, stats in sorted(snapshot["stages"].items()):
+        lines.append(f'matcher_stage_seconds_sum{{stage="{name}"}} {stats["seconds"]:.6f}')
+        lines.append(f'matcher_stage_seconds_count{{stage="{name}"}} {stats["count"]}')
+    lines += ["# HELP matcher_stage_seconds_max Slowest single observation per stage.", "# TYPE matcher_stage_seconds_max gauge"]
+    lines += [f'matcher_stage_seconds_max{{stage="{name}"}} {stats["max"]:.6f}' for name, stats in sorted(snapshot["stages"].items())]
+    lines += ["# HELP matcher_events_total Cache hits/misses, extractor fallbacks and requests.", "# TYPE matcher_events_total counter"]
+    lines += [f'matcher_events_total{{event="{name}"}} {value}' for name, value in sorted(snapshot["counters"].items())]
+    for name, value in sorted(snapshot["gauges"].items()):
+        if value is not None:
+            lines += [f"# TYPE matcher_{name} gauge", f"matcher_{name} {value}"]
+    return "\n".join(lines) + "\n"
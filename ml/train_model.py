@@ -1,22 +1,22 @@
 import os
+import sys
 import json
+import time
 import random
+import argparse
 import numpy as np
 import pandas as pd
-from sklearn.model_selection import train_test_split
-from sklearn.metrics import classification_report, accuracy_score, confusion_matrix
-try:
-    from sentence_transformers import SentenceTransformer, util
-except ImportError:
-    print("Installing sentence-transformers...")
-    import subprocess
-    subprocess.check_call(["pip", "install", "sentence-transformers", "scikit-learn", "pandas"])
-    from sentence_transformers import SentenceTransformer, util
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from encoder import load_encoder, parity_report, BACKENDS, ENCODER_BACKEND
 
 # Configuration
 MODEL_NAME = 'all-MiniLM-L6-v2'
 DATASET_PATH = 'ml/dataset/'
 METRICS_PATH = 'ml/metrics.json'
+EVAL_BATCH_SIZE = 64
+# Pairs scored per block when gathering embedding rows
+SCORE_BLOCK = 8192
 
 def generate_synthetic_data(num_samples=100):
     """
@@ -64,88 +64,202 @@ def generate_synthetic_data(num_samples=100):
         
     return pd.DataFrame(data)
 
-def train_and_evaluate():
+def metrics_path(backend):
+    """fp32 torch writes metrics.json; other backends get metrics_<backend>.json next to it."""
+    if backend == 'torch':
+        return METRICS_PATH
+    root, ext = os.path.splitext(METRICS_PATH)
+    return f"{root}_{backend}{ext}"
+
+def pair_similarities(model, job_descriptions, resumes, batch_size=EVAL_BATCH_SIZE):
+    """
+    Cosine similarity of each (JD, resume) pair. Every distinct text is
+    encoded once, in batches, and pairs are scored as row-wise dot products
+    of the normalized embeddings. Returns (scores, number of texts encoded).
+    """
+    n = len(job_descriptions)
+    codes, texts = pd.factorize(pd.concat([pd.Series(job_descriptions), pd.Series(resumes)], ignore_index=True))
+    embeddings = model.encode(list(texts), batch_size=batch_size, convert_to_numpy=True, normalize_embeddings=True)
+    embeddings = np.asarray(embeddings, dtype=np.float32)
+    jd_rows, resume_rows = codes[:n], codes[n:]
+
+    scores = np.empty(n, dtype=np.float32)
+    # Blocks keep the gathered (block x dim) copies small on large sets
+    for start in range(0, n, SCORE_BLOCK):
+        block = slice(start, start + SCORE_BLOCK)
+        scores[block] = np.einsum('ij,ij->i', embeddings[jd_rows[block]], embeddings[resume_rows[block]])
+    return scores, len(texts)
+
+def threshold_sweep(scores, labels):
+    """
+    Evaluate every cut point of `scores` (predict 1 when score > threshold)
+    with one sort and cumulative sums. Returns the accuracy-optimal threshold
+    (midway between the scores either side of the cut), its accuracy, and the
+    ROC AUC and average precision over the same sweep.
+    """
+    scores = np.asarray(scores, dtype=np.float64)
+    labels = np.asarray(labels).astype(bool)
+    order = np.argsort(-scores, kind='stable')
+    scores, labels = scores[order], labels[order]
+    positives = int(labels.sum())
+    negatives = len(labels) - positives
+
+    # Cut j predicts the top last[j-1] + 1 scores positive; cut 0 predicts none
+    last = np.r_[np.flatnonzero(np.diff(scores)), len(scores) - 1]
+    tp = np.r_[0, np.cumsum(labels)[last]]
+    fp = np.r_[0, last + 1] - tp
+    accuracy = (tp + negatives - fp) / len(labels)
+    best = int(np.argmax(accuracy))
+
+    if best == 0:
+        threshold = scores[0]
+    else:
+        included = scores[last[best - 1]]
+        following = scores[last[best - 1] + 1] if last[best - 1] + 1 < len(scores) else np.nextafter(included, -np.inf)
+        threshold = (included + following) / 2
+        if not threshold < included:  # adjacent floats
+            threshold = following
+
+    report = {"threshold": float(threshold), "accuracy": float(accuracy[best]), "roc_auc": None, "average_precision": None}
+    if positives and negatives:
+        tpr, fpr = tp / positives, fp / negatives
+        report["roc_auc"] = float(np.sum(np.diff(fpr) * (tpr[1:] + tpr[:-1]) / 2))
+        # Precision at each cut, weighted by the recall it adds
+        report["average_precision"] = float(np.sum(np.diff(tpr) * tp[1:] / (tp[1:] + fp[1:])))
+    return report
+
+def train_and_evaluate(backend='torch', data_path=None, batch_size=EVAL_BATCH_SIZE, test_size=0.2):
+    # Imported here so generate_synthetic_data (used by benchmark.py) doesn't pull in torch
+    try:
+        import sentence_transformers  # load_encoder needs it
+    except ImportError:
+        print("Installing sentence-transformers...")
+        import subprocess
+        subprocess.check_call(["pip", "install", "sentence-transformers", "scikit-learn", "pandas"])
+    from sklearn.model_selection import train_test_split
+    from sklearn.metrics import classification_report, confusion_matrix
+
+    timings = {}
+    started = time.perf_counter()
+
     # 1. Load or Generate Data
-    if not os.path.exists(DATASET_PATH):
-        os.makedirs(DATASET_PATH, exist_ok=True)
-        
-    csv_file = os.path.join(DATASET_PATH, 'synthetic_data.csv')
-    
-    if os.path.exists(csv_file):
-        print(f"Loading data from {csv_file}")
-        df = pd.read_csv(csv_file)
+    if data_path:
+        print(f"Loading data from {data_path}")
+        columns = ['job_description', 'resume_text', 'label']
+        if data_path.endswith('.parquet'):
+            df = pd.read_parquet(data_path, columns=columns)
+        else:
+            df = pd.read_csv(data_path, usecols=columns)
     else:
-        df = generate_synthetic_data(num_samples=200)
-        df.to_csv(csv_file, index=False)
-        print(f"Saved synthetic data to {csv_file}")
-
-    # 2. Split Data
-    print("Splitting data into Train and Test sets...")
-    X_train, X_test, y_train, y_test = train_test_split(
-        df[['job_description', 'resume_text']], 
-        df['label'], 
-        test_size=0.2, 
-        random_state=42
-    )
-    
+        if not os.path.exists(DATASET_PATH):
+            os.makedirs(DATASET_PATH, exist_ok=True)
+
+        csv_file = os.path.join(DATASET_PATH, 'synthetic_data.csv')
+
+        if os.path.exists(csv_file):
+            print(f"Loading data from {csv_file}")
+            df = pd.read_csv(csv_file)
+        else:
+            df = generate_synthetic_data(num_samples=200)
+            df.to_csv(csv_file, index=False)
+            print(f"Saved synthetic data to {csv_file}")
+    df = df.dropna(subset=['job_description', 'resume_text', 'label'])
+    df['job_description'] = df['job_description'].astype(str)
+    df['resume_text'] = df['resume_text'].astype(str)
+
+    # 2. Split Data (test_size 1.0 evaluates every pair, e.g. to retune on history)
+    if test_size >= 1.0:
+        X_test, y_test = df[['job_description', 'resume_text']], df['label'].astype(int)
+    else:
+        print("Splitting data into Train and Test sets...")
+        X_train, X_test, y_train, y_test = train_test_split(
+            df[['job_description', 'resume_text']],
+            df['label'].astype(int),
+            test_size=test_size,
+            random_state=42
+        )
+    timings["load_seconds"] = time.perf_counter() - started
+
     # 3. Load Model
-    print(f"Loading model: {MODEL_NAME}")
-    model = SentenceTransformer(MODEL_NAME)
-    
-    # 4. Compute Embeddings & Similarity
-    print("Computing embeddings...")
-    
-    def get_similarity(row):
-        jd_emb = model.encode(row['job_description'], convert_to_tensor=True)
-        res_emb = model.encode(row['resume_text'], convert_to_tensor=True)
-        return util.cos_sim(jd_emb, res_emb).item()
+    print(f"Loading model: {MODEL_NAME} ({backend})")
+    start = time.perf_counter()
+    model = load_encoder(MODEL_NAME, backend)
+    timings["model_load_seconds"] = time.perf_counter() - start
 
+    # 4. Compute Embeddings & Similarity
     # We evaluate on the TEST set to see how well cosine similarity predicts the label
-    print("Evaluating on Test set...")
-    X_test['similarity'] = X_test.apply(get_similarity, axis=1)
-    
+    print(f"Encoding {len(X_test)} test pairs (batch_size={batch_size})...")
+    start = time.perf_counter()
+    similarity, encoded = pair_similarities(model, X_test['job_description'], X_test['resume_text'], batch_size)
+    timings["encode_and_score_seconds"] = time.perf_counter() - start
+
     # 5. Determine Optimal Threshold (Simple Training)
     # in a real fine-tuning, we'd update weights. Here we find the best 'cut-off'.
-    best_threshold = 0.5
-    best_acc = 0
-    
-    thresholds = np.arange(0.1, 0.9, 0.05)
-    for thresh in thresholds:
-        preds = (X_test['similarity'] > thresh).astype(int)
-        acc = accuracy_score(y_test, preds)
-        if acc > best_acc:
-            best_acc = acc
-            best_threshold = thresh
-            
-    print(f"Optimal Similarity Threshold found: {best_threshold:.2f}")
-    
+    start = time.perf_counter()
+    sweep = threshold_sweep(similarity, y_test)
+    timings["threshold_search_seconds"] = time.perf_counter() - start
+    best_threshold, best_acc = sweep["threshold"], sweep["accuracy"]
+
+    print(f"Optimal Similarity Threshold found: {best_threshold:.4f}")
+
     # 6. Final Metrics
-    final_preds = (X_test['similarity'] > best_threshold).astype(int)
-    report = classification_report(y_test, final_preds, output_dict=True)
+    final_preds = (similarity > best_threshold).astype(int)
+    report = classification_report(y_test, final_preds, output_dict=True, zero_division=0)
     cm = confusion_matrix(y_test, final_preds)
-    
+
     print("\n--- Model Performance Report ---")
     print(f"Accuracy: {best_acc:.2%}")
+    print(f"ROC AUC: {sweep['roc_auc']}, average precision: {sweep['average_precision']}")
     print("Confusion Matrix:")
     print(cm)
     print("\nClassification Report:")
-    print(classification_report(y_test, final_preds))
-    
+    print(classification_report(y_test, final_preds, zero_division=0))
+
     # Save Metrics
     metrics = {
         "model_name": MODEL_NAME,
+        "encoder_backend": backend,
         "optimal_threshold": float(best_threshold),
         "accuracy": best_acc,
         "precision": report['weighted avg']['precision'],
         "recall": report['weighted avg']['recall'],
-        "f1_score": report['weighted avg']['f1-score']
+        "f1_score": report['weighted avg']['f1-score'],
+        "roc_auc": sweep["roc_auc"],
+        "average_precision": sweep["average_precision"]
     }
-    
-    with open(METRICS_PATH, 'w') as f:
+
+    # 7. Parity with fp32 (quantized / exported backends only)
+    if backend != 'torch':
+        print("Checking parity against fp32 torch...")
+        reference = load_encoder(MODEL_NAME, 'torch')
+        pairs = list(zip(X_test['job_description'], X_test['resume_text']))
+        metrics["parity"] = parity_report(reference, model, pairs, batch_size=batch_size, threshold=best_threshold)
+        print(json.dumps(metrics["parity"], indent=4))
+
+    timings["total_seconds"] = time.perf_counter() - started
+    metrics["evaluation"] = dict(
+        {name: round(seconds, 3) for name, seconds in timings.items()},
+        pairs=len(X_test),
+        texts_encoded=encoded,
+        batch_size=batch_size,
+        pairs_per_second=round(len(X_test) / max(timings["encode_and_score_seconds"], 1e-9), 1)
+    )
+    print(f"Timings: {json.dumps(metrics['evaluation'])}")
+
+    output_path = metrics_path(backend)
+    with open(output_path, 'w') as f:
         json.dump(metrics, f, indent=4)
-        
-    print(f"\nMetrics saved to {METRICS_PATH}")
+
+    print(f"\nMetrics saved to {output_path}")
     return metrics
 
 if __name__ == "__main__":
-    train_and_evaluate()
+    parser = argparse.ArgumentParser(description="Evaluate the matcher's sentence encoder")
+    parser.add_argument('--backend', choices=BACKENDS, default=ENCODER_BACKEND,
+                        help="Encoder backend to evaluate; non-torch backends also get a parity check")
+    parser.add_argument('--data', help="Labelled CSV (job_description, resume_text, label); default: the synthetic set")
+    parser.add_argument('--batch-size', type=int, default=EVAL_BATCH_SIZE, help="Texts per forward pass")
+    parser.add_argument('--test-size', type=float, default=0.2,
+                        help="Share of pairs held out for evaluation; 1.0 evaluates (and tunes the threshold on) all of them")
+    args = parser.parse_args()
+    train_and_evaluate(args.backend, args.data, args.batch_size, args.test_size)
@@ -1,153 +1,239 @@
-import re
 import sys
-import pdfplumber
-import pypdf
-import fitz  # pymupdf
+import time
+import threading
 
-def extract_text_from_pdf(pdf_path):
+import extract_cache
+import ocr
+# Text cleaning lives in textnorm; callers import it from here
+from textnorm import clean_text, extract_experience
+
+# Bump whenever extraction behaviour changes so cached text is re-extracted
+EXTRACTOR_VERSION = "3"
+
+# A page needs at least this much text before we trust an extractor's output
+PAGE_MIN_CHARS = 20
+
+# Per-extractor cost counters: {name: {"calls", "pages", "seconds"}}
+EXTRACTOR_STATS = {}
+_stats_lock = threading.Lock()
+
+def record_extractor_timings(timings):
+    """Add one extraction's per-extractor timings to the process-wide counters."""
+    with _stats_lock:
+        for name, timing in timings.items():
+            stats = EXTRACTOR_STATS.setdefault(name, {"calls": 0, "pages": 0, "seconds": 0.0})
+            stats["calls"] += 1
+            stats["pages"] += timing["pages"]
+            stats["seconds"] += timing["seconds"]
+
+def get_extractor_stats():
+    with _stats_lock:
+        return {name: dict(stats) for name, stats in EXTRACTOR_STATS.items()}
+
+def load_fitz():
+    """
+    PyMuPDF, imported on first use. The PDF libraries (pymupdf, pdfplumber,
+    pypdf) are only imported when a file actually has to be extracted, so
+    requests served from the extraction cache never load them.
+    """
+    try:
+        import pymupdf as fitz
+    except ImportError:  # pymupdf < 1.24 only ships the legacy name
+        import fitz
+    return fitz
+
+def extract_text_from_pdf(pdf_path, use_cache=True):
+    return extract_pdf(pdf_path, use_cache)["text"]
+
+def extract_pdf(pdf_path, use_cache=True):
+    """
+    Extract text from a PDF, reusing the on-disk extraction cache when the same
+    file content has been seen before.
+    Returns {"text", "method", "pages", "timings"} where method names the
+    extractor(s) that produced the text and timings maps each extractor that
+    ran to {"pages", "seconds"}.
+    """
+    if not use_cache:
+        result = _extract_pdf_uncached(pdf_path)
+        result.pop("failed")
+        return result
+
+    start = time.perf_counter()
+    try:
+        content_hash = extract_cache.file_hash(pdf_path)
+    except OSError as e:
+        sys.stderr.write(f"Warning: Could not hash {pdf_path}: {e}\n")
+        result = _extract_pdf_uncached(pdf_path)
+        result.pop("failed")
+        return result
+
+    cached = extract_cache.get(content_hash, EXTRACTOR_VERSION)
+    if cached is not None:
+        cached["timings"] = {"cache": {"pages": 0, "seconds": time.perf_counter() - start}}
+        return cached
+
+    result = _extract_pdf_uncached(pdf_path)
+    if not result.pop("failed"):
+        extract_cache.put(content_hash, EXTRACTOR_VERSION, result)
+    return result
+
+class _Timings(dict):
+    """{extractor: {"pages", "seconds"}} accumulated while extracting one PDF."""
+    def add(self, name, seconds, pages=1):
+        timing = self.setdefault(name, {"pages": 0, "seconds": 0.0})
+        timing["pages"] += pages
+        timing["seconds"] += seconds
+
+def _extract_pdf_uncached(pdf_path):
+    """
+    Probe the document once with pymupdf and send each page to the cheapest
+    extractor that works for it:
+      - page has a usable text layer        -> pymupdf text (already read by the probe)
+      - fonts but pymupdf text is too short -> pdfplumber, then pypdf, for that page
+      - still no text but images/drawings   -> OCR for that page only
+    Falls back to the whole-document pdfplumber/pypdf chain if pymupdf can't open it.
+    """
+    timings = _Timings()
+    try:
+        fitz = load_fitz()
+        start = time.perf_counter()
+        doc = fitz.open(pdf_path)
+    except Exception as e:
+        sys.stderr.write(f"pymupdf failed: {e}\n")
+        return _extract_pdf_fallback(pdf_path, timings)
+
+    page_texts = []
+    page_methods = []
+    needs_text_layer = []
+    needs_ocr = []
+    # Set when an extractor errored, so a possibly incomplete result isn't cached
+    failed = False
+
+    with doc:
+        for i, page in enumerate(doc):
+            text = page.get_text()
+            page_texts.append(text)
+            page_methods.append("pymupdf")
+            if len(text.strip()) >= PAGE_MIN_CHARS:
+                continue
+            if page.get_fonts():
+                needs_text_layer.append(i)
+            elif page.get_images() or page.get_drawings():
+                needs_ocr.append(i)
+        pages = doc.page_count
+        timings.add("pymupdf", time.perf_counter() - start, pages)
+
+        # Text layer present but pymupdf couldn't decode enough of it
+        if needs_text_layer:
+            failed |= _extract_pages_with_text_extractors(pdf_path, needs_text_layer, page_texts, page_methods, timings)
+            needs_ocr.extend(i for i in needs_text_layer if len(page_texts[i].strip()) < PAGE_MIN_CHARS)
+
+        # Only pages with no usable text layer go to OCR
+        if needs_ocr:
+            failed |= _ocr_pages(doc, sorted(needs_ocr), page_texts, page_methods, timings)
+
+    text = "".join(t + "\n" for t in page_texts if t)
+    used = [m for t, m in zip(page_texts, page_methods) if t.strip()]
+    method = "+".join(dict.fromkeys(used)) if used else "pymupdf"
+    return {"text": text, "method": method, "pages": pages, "timings": dict(timings), "failed": failed}
+
+def _extract_pages_with_text_extractors(pdf_path, page_indices, page_texts, page_methods, timings):
+    """Re-read specific pages with pdfplumber, then pypdf; keeps the longest text per page."""
+    failed = False
+    try:
+        import pdfplumber
+        start = time.perf_counter()
+        with pdfplumber.open(pdf_path) as pdf:
+            for i in page_indices:
+                extracted = pdf.pages[i].extract_text() or ""
+                if len(extracted.strip()) > len(page_texts[i].strip()):
+                    page_texts[i] = extracted
+                    page_methods[i] = "pdfplumber"
+        timings.add("pdfplumber", time.perf_counter() - start, len(page_indices))
+    except Exception as e:
+        failed = True
+        sys.stderr.write(f"pdfplumber failed: {e}\n")
+
+    remaining = [i for i in page_indices if len(page_texts[i].strip()) < PAGE_MIN_CHARS]
+    if not remaining:
+        return failed
+    try:
+        import pypdf
+        start = time.perf_counter()
+        reader = pypdf.PdfReader(pdf_path)
+        for i in remaining:
+            extracted = reader.pages[i].extract_text() or ""
+            if len(extracted.strip()) > len(page_texts[i].strip()):
+                page_texts[i] = extracted
+                page_methods[i] = "pypdf"
+        timings.add("pypdf", time.perf_counter() - start, len(remaining))
+    except Exception as e:
+        failed = True
+        sys.stderr.write(f"pypdf failed: {e}\n")
+    return failed
+
+def _extract_pdf_fallback(pdf_path, timings):
+    """Whole-document pdfplumber -> pypdf chain for files pymupdf can't open."""
     text = ""
-    Method = "pdfplumber"
-    
-    # Method 1: pdfplumber
+    method = "pdfplumber"
+    pages = 0
+    failed = True
+
     try:
+        import pdfplumber
+        start = time.perf_counter()
         with pdfplumber.open(pdf_path) as pdf:
+            pages = len(pdf.pages)
             for page in pdf.pages:
                 page_text = page.extract_text()
                 if page_text:
                     text += page_text + "\n"
+        timings.add("pdfplumber", time.perf_counter() - start, pages)
     except Exception as e:
-        print(f"pdfplumber failed: {e}")
+        sys.stderr.write(f"pdfplumber failed: {e}\n")
 
-    # Method 2: pypdf Fallback
     if len(text.strip()) < 50:
-        Method = "pypdf"
         try:
+            import pypdf
+            start = time.perf_counter()
             reader = pypdf.PdfReader(pdf_path)
+            pages = pages or len(reader.pages)
             pypdf_text = ""
             for page in reader.pages:
                 extracted = page.extract_text()
                 if extracted:
                     pypdf_text += extracted + "\n"
-            
+            timings.add("pypdf", time.perf_counter() - start, len(reader.pages))
+
             if len(pypdf_text) > len(text):
                 text = pypdf_text
+                method = "pypdf"
         except Exception as e:
-            print(f"pypdf failed: {e}")
+            sys.stderr.write(f"pypdf failed: {e}\n")
 
-    # Method 3: pymupdf (fitz) Fallback - Strongest for layout issues
-    if len(text.strip()) < 50:
-        Method = "pymupdf"
-        try:
-            doc = fitz.open(pdf_path)
-            fitz_text = ""
-            for page in doc:
-                fitz_text += page.get_text() + "\n"
-            
-            if len(fitz_text) > len(text):
-                text = fitz_text
-        except Exception as e:
-             print(f"pymupdf failed: {e}")
+    return {"text": text, "method": method, "pages": pages, "timings": dict(timings), "failed": failed}
 
-    # Method 4: OCR (EasyOCR) - The "Nuclear Option" for Images
-    # Only run if text is still empty (Font Count 0 scenario)
-    if len(text.strip()) < 50:
-        sys.stderr.write("Debug: Triggering OCR Fallback...\n")
-        try:
-            import easyocr
-            import numpy as np
-            # Use fitz to get image from page
-            doc = fitz.open(pdf_path)
-            ocr_text = ""
-            # Initialize Reader (this might take time)
-            reader = easyocr.Reader(['en'], gpu=False, verbose=False)
-            
-            for i, page in enumerate(doc):
-                sys.stderr.write(f"Debug: OCR Scanning page {i+1}...\n")
-                # Increase resolution (3x = ~216 DPI, good for OCR)
-                mat = fitz.Matrix(3, 3)
-                pix = page.get_pixmap(matrix=mat)
-                
-                # Convert to numpy for easyocr
-                img = np.frombuffer(pix.samples, dtype=np.uint8).reshape((pix.h, pix.w, pix.n))
-                if pix.n == 4: # RGBA -> RGB
-                    img = np.ascontiguousarray(img[..., :3])
-                elif pix.n == 3: # RGB
-                    pass
-                else: 
-                     # Grayscale or other, convert to RGB for safety
-                     import cv2
-                     img = cv2.cvtColor(img, cv2.COLOR_GRAY2RGB)
-
-                result = reader.readtext(img, detail=0)
-                page_content = " ".join(result)
-                sys.stderr.write(f"Debug: Page {i+1} OCR found {len(page_content)} chars\n")
-                ocr_text += page_content + "\n"
-            
-            if len(ocr_text) > len(text):
-                text = ocr_text
-                sys.stderr.write(f"Debug: OCR Final Success! Extracted {len(text)} chars\n")
-            else:
-                sys.stderr.write(f"Debug: OCR finished but found low text ({len(ocr_text)})\n")
-                
-        except ImportError:
-             sys.stderr.write("OCR failed: easyocr module not found. Please pip install easyocr.\n")
-        except Exception as e:
-            sys.stderr.write(f"OCR failed calling easyocr: {e}\n")
-            import traceback
-            traceback.print_exc(file=sys.stderr)
-            
-    return text
-
-def clean_text(text):
-    if not text:
-        return ""
-    # Lowercase
-    text = text.lower()
-    # Remove email addresses
-    text = re.sub(r'[\w\.-]+@[\w\.-]+', '', text)
-    # Remove URLs
-    text = re.sub(r'http\S+', '', text)
-    
-    # Fix common PDF extraction issues where words are joined (e.g. "JavaDeveloper")
-    # This is risky but helps with bad columns. 
-    # Try to split CamelCase if possible? No, too risky.
-    # Instead, ensure spacing around known delimiters
-    text = re.sub(r'([a-z])([A-Z])', r'\1 \2', text) # CamelCase split attempt (weak but helper)
-    text = text.replace('|', ' ') # Replace pipes with space
-    text = text.replace('/', ' ') # Replace slashes with space
-    text = text.replace('•', ' ') # Replace bullets with space
-    
-    # Remove special characters but keep letters, numbers, spaces, +, #, and . (for node.js, .net, c++, c#)
-    text = re.sub(r'[^a-z0-9\s+#\.]', '', text)
-    # Remove multiple spaces
-    text = re.sub(r'\s+', ' ', text).strip()
-    return text
-
-def extract_experience(text):
+def _ocr_pages(doc, page_indices, page_texts, page_methods, timings):
     """
-    Extract years of experience from resume text.
-    Returns the maximum years found, or 0 if none detected.
+    OCR (EasyOCR) - The "Nuclear Option" for pages without a text layer.
+    Returns True if OCR could not run.
     """
-    if not text:
-        return 0
-    
-    # Common patterns for experience
-    patterns = [
-        r'(\d+)\+?\s*(?:years?|yrs?)\s+(?:of\s+)?experience',
-        r'experience\s+(?:of\s+)?(\d+)\+?\s*(?:years?|yrs?)',
-        r'(\d+)\+?\s*(?:years?|yrs?)\s+in',
-        r'worked\s+for\s+(\d+)\+?\s*(?:years?|yrs?)',
-    ]
-    
-    years_found = []
-    text_lower = text.lower()
-    
-    for pattern in patterns:
-        matches = re.findall(pattern, text_lower)
-        for match in matches:
-            try:
-                years_found.append(int(match))
-            except ValueError:
-                continue
-    
-    return max(years_found) if years_found else 0
+    sys.stderr.write(f"Debug: Triggering OCR Fallback for {len(page_indices)} page(s)...\n")
+    start = time.perf_counter()
+    try:
+        ocr_texts = ocr.ocr_pages(doc, page_indices)
+    except ImportError:
+        sys.stderr.write("OCR failed: easyocr module not found. Please pip install easyocr.\n")
+        return True
+    except Exception as e:
+        sys.stderr.write(f"OCR failed calling easyocr: {e}\n")
+        import traceback
+        traceback.print_exc(file=sys.stderr)
+        return True
+
+    for i, page_content in ocr_texts.items():
+        if len(page_content.strip()) > len(page_texts[i].strip()):
+            page_texts[i] = page_content
+            page_methods[i] = "ocr"
+    timings.add("ocr", time.perf_counter() - start, len(ocr_texts))
+    return False